@@ -0,0 +1,33 @@
+"""add document listing indexes
+
+Revision ID: a9b0c1d2e3f4
+Revises: f8a9b0c1d2e3
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a9b0c1d2e3f4"
+down_revision: Union[str, Sequence[str], None] = "f8a9b0c1d2e3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ix_documents_owner_created_id", "documents", ["owner_id", "created_at", "id"], unique=False
+    )
+    op.create_index(
+        "ix_documents_owner_status_created_id", "documents", ["owner_id", "status", "created_at", "id"], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_documents_owner_status_created_id", table_name="documents")
+    op.drop_index("ix_documents_owner_created_id", table_name="documents")
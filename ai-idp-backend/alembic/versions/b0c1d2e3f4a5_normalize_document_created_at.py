@@ -0,0 +1,35 @@
+"""normalize document created_at on SQLite
+
+Revision ID: b0c1d2e3f4a5
+Revises: a9b0c1d2e3f4
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b0c1d2e3f4a5"
+down_revision: Union[str, Sequence[str], None] = "a9b0c1d2e3f4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # SQLite compares datetimes as text. Rows from the server default have no
+    # fractional seconds, unlike the values bound by keyset pagination, so
+    # they are brought to the same format.
+    if op.get_bind().dialect.name == "sqlite":
+        op.execute(
+            "UPDATE documents SET created_at = created_at || '.000000' "
+            "WHERE created_at IS NOT NULL AND created_at NOT LIKE '%.%'"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # The normalized values are still valid timestamps
+    pass
@@ -0,0 +1,50 @@
+"""add stage checkpoints
+
+Revision ID: e6f7a8b9c0d1
+Revises: d5e6f7a8b9c0
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e6f7a8b9c0d1"
+down_revision: Union[str, Sequence[str], None] = "d5e6f7a8b9c0"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("documents", sa.Column("stages", sa.JSON(), nullable=True))
+    op.create_table(
+        "document_pages",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("document_id", sa.Integer(), nullable=False),
+        sa.Column("page_number", sa.Integer(), nullable=False),
+        sa.Column("text", sa.Text(), nullable=False),
+        sa.Column("method", sa.String(), nullable=False),
+        sa.ForeignKeyConstraint(["document_id"], ["documents.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("document_id", "page_number", name="uq_document_pages_page"),
+    )
+    op.create_index(op.f("ix_document_pages_id"), "document_pages", ["id"], unique=False)
+    op.create_index(op.f("ix_document_pages_document_id"), "document_pages", ["document_id"], unique=False)
+    op.add_column("jobs", sa.Column("stages", sa.JSON(), nullable=True))
+    op.add_column("jobs", sa.Column("batch_id", sa.String(length=36), nullable=True))
+    op.create_index(op.f("ix_jobs_batch_id"), "jobs", ["batch_id"], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_jobs_batch_id"), table_name="jobs")
+    op.drop_column("jobs", "batch_id")
+    op.drop_column("jobs", "stages")
+    op.drop_index(op.f("ix_document_pages_document_id"), table_name="document_pages")
+    op.drop_index(op.f("ix_document_pages_id"), table_name="document_pages")
+    op.drop_table("document_pages")
+    op.drop_column("documents", "stages")
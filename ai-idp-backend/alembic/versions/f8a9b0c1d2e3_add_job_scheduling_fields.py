@@ -0,0 +1,35 @@
+"""add job scheduling fields
+
+Revision ID: f8a9b0c1d2e3
+Revises: e6f7a8b9c0d1
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f8a9b0c1d2e3"
+down_revision: Union[str, Sequence[str], None] = "e6f7a8b9c0d1"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("documents", sa.Column("size_bytes", sa.BigInteger(), nullable=True))
+    op.add_column("documents", sa.Column("page_count", sa.Integer(), nullable=True))
+    op.add_column(
+        "jobs",
+        sa.Column("priority", sa.String(), nullable=False, server_default="interactive"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("jobs", "priority")
+    op.drop_column("documents", "page_count")
+    op.drop_column("documents", "size_bytes")
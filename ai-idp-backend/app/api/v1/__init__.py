@@ -1,7 +1,8 @@
 from fastapi import APIRouter
-from app.api.v1 import auth, health, search
+from app.api.v1 import admin, auth, health, search
 
 api_router = APIRouter()
 api_router.include_router(health.router, tags=["Health"])
 api_router.include_router(auth.router, prefix="/auth", tags=["Auth"])
-api_router.include_router(search.router)
\ No newline at end of file
+api_router.include_router(search.router)
+api_router.include_router(admin.router)
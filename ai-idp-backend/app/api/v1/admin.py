@@ -0,0 +1,33 @@
+# Admin endpoints
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from app.db.session import get_db
+from app.api.v1.auth import require_role
+from app.schemas.admin import ReprocessRequest, ReprocessResponse
+from app.schemas.document import BatchProgress
+from app.services.reprocess_service import start_reprocessing
+from app.workers.job_queue import batch_progress
+
+router = APIRouter(prefix="/admin", tags=["Admin"], dependencies=[Depends(require_role("admin"))])
+
+
+@router.post("/reprocess", response_model=ReprocessResponse, status_code=202)
+def reprocess(payload: ReprocessRequest, db: Session = Depends(get_db)):
+    """Queue the chosen stages for every matching document; the workers run them in parallel"""
+    return start_reprocessing(
+        db,
+        payload.stages,
+        document_ids=payload.document_ids,
+        status=payload.status,
+        owner_id=payload.owner_id,
+        stale_only=payload.stale_only,
+        limit=payload.limit,
+    )
+
+
+@router.get("/reprocess/{batch_id}", response_model=BatchProgress)
+def reprocess_progress(batch_id: str, db: Session = Depends(get_db)):
+    progress = batch_progress(db, batch_id)
+    if progress is None:
+        raise HTTPException(status_code=404, detail="Reprocessing batch not found")
+    return progress
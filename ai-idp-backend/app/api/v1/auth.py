@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from jose import jwt, JWTError
 
-from app.db.session import get_db
+from app.db.session import get_async_db, get_db
 from app.db.models import User
 from app.schemas.auth import UserCreate, Token, UserOut
 from app.core.security import (
@@ -16,10 +18,28 @@ from app.core.config import settings
 router = APIRouter()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
-def get_current_user(
+# Scope of the short-lived tokens that open a status stream (POST /documents/events/token)
+STREAM_SCOPE = "document_events"
+
+async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ) -> User:
+    return await user_from_token(token, db)
+
+async def get_stream_user(
+    token: str = Query(..., description="Stream token from POST /documents/events/token"),
+    db: AsyncSession = Depends(get_async_db),
+) -> User:
+    """
+    get_current_user() for streaming endpoints. EventSource cannot send
+    headers, so the token is in the query string, and it ends up in access
+    logs: only a short-lived stream-scoped token is accepted here.
+    """
+    return await user_from_token(token, db, scope=STREAM_SCOPE)
+
+async def user_from_token(token: str, db: AsyncSession, scope: str = None) -> User:
+    """The active user a token belongs to; scoped tokens only pass where their scope is required"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -32,12 +52,12 @@ def get_current_user(
             algorithms=[settings.JWT_ALGORITHM],
         )
         email: str = payload.get("sub")
-        if email is None:
+        if email is None or payload.get("scope") != scope:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
 
-    user = db.query(User).filter(User.email == email).first()
+    user = await db.scalar(select(User).where(User.email == email))
     if not user:
         raise credentials_exception
     if not user.is_active:
@@ -1,13 +1,27 @@
 # Documents endpoints
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Request
-from sqlalchemy.orm import Session
-from app.db.session import get_db
-from app.services.document_service import upload_document
-from app.schemas.document import DocumentResponse
-from app.api.v1.auth import get_current_user
-from fastapi import BackgroundTasks
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from app.db.models import Document
+from app.db.session import get_async_db
+from app.services.document_service import (
+    TERMINAL_STATUSES, bulk_upload_documents, document_states, upload_document,
+    list_documents as list_owner_documents,
+)
+from app.schemas.document import (
+    BatchProgress, BulkUploadResponse, DocumentListResponse, DocumentResponse, StreamToken,
+)
+from app.api.v1.auth import STREAM_SCOPE, get_current_user, get_stream_user
+from app.core.security import create_access_token
+from app.core.events import status_broker
 from app.core.rate_limiter import RateLimitDependency
 from app.core.config import settings
+from app.core.storage import FileTooLargeError
+from app.workers.job_queue import batch_progress
+from datetime import timedelta
+import json
 import logging
 
 logger = logging.getLogger(__name__)
@@ -28,9 +42,8 @@ async def upload(
 @router.post("/upload", response_model=DocumentResponse)
 async def upload(
     request: Request,
-    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user=Depends(get_current_user),
     rate_limit_headers: dict = Depends(
         RateLimitDependency(
@@ -40,46 +53,177 @@ async def upload(
     ),
 ):
     logger.info("Document upload request received")
-    from app.workers.tasks import process_document
-    
-    doc = await upload_document(db, current_user.id, file)
 
-    background_tasks.add_task(
-        process_document,
-        document_id=doc.id
-    )
+    try:
+        doc = await upload_document(db, current_user.id, file)
+    except FileTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Processed by the worker processes (python -m app.workers), not the API
     logger.info(f"Document {doc.id} queued for processing")
 
     return doc
 
 
-@router.get("", response_model=list[DocumentResponse])
+@router.post("/bulk", response_model=BulkUploadResponse, status_code=202)
+async def bulk_upload(
+    request: Request,
+    files: list[UploadFile] = File(...),
+    db: AsyncSession = Depends(get_async_db),
+    current_user=Depends(get_current_user),
+    rate_limit_headers: dict = Depends(
+        RateLimitDependency(
+            max_requests=settings.BULK_RATE_LIMIT,
+            window=settings.BULK_RATE_WINDOW
+        )
+    ),
+):
+    """
+    Upload many documents at once: several files in one multipart request,
+    zip/tar archives (.tar.gz, .tar.bz2, .tar.xz), or both; at most 1000
+    parts per request, so large migrations should send archives. Entries that
+    are not supported documents are listed as rejected; the rest are queued
+    under one batch id (see GET /documents/batches/{batch_id}).
+    """
+    logger.info(f"Bulk upload request received ({len(files)} files)")
+    result = await bulk_upload_documents(db, current_user.id, files)
+    if not result["document_ids"]:
+        raise HTTPException(status_code=400, detail={"message": "No supported documents", "rejected": result["rejected"]})
+    return result
+
+
+@router.get("/batches/{batch_id}", response_model=BatchProgress)
+async def get_batch_progress(
+    batch_id: str,
+    db: AsyncSession = Depends(get_async_db),
+    current_user=Depends(get_current_user),
+):
+    """Aggregate processing progress of a bulk upload"""
+    progress = await db.run_sync(batch_progress, batch_id, owner_id=current_user.id)
+    if progress is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return progress
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def _status_events(request: Request, states: dict[int, dict]):
+    """Current states, then every change until all documents are completed or failed"""
+    for state in states.values():
+        yield _sse("status", state)
+    pending = {document_id for document_id, state in states.items() if state["status"] not in TERMINAL_STATUSES}
+    if not pending:
+        yield _sse("done", {})
+        return
+
+    subscription = status_broker.subscribe(pending, known=states)
+    try:
+        while pending:
+            if await request.is_disconnected():
+                return
+            changes = await subscription.next(timeout=settings.STATUS_STREAM_KEEPALIVE_SECONDS)
+            if not changes:
+                yield ": keep-alive\n\n"
+                continue
+            for state in changes:
+                yield _sse("status", state)
+                if state["status"] in TERMINAL_STATUSES:
+                    pending.discard(state["document_id"])
+        yield _sse("done", {})
+    finally:
+        status_broker.unsubscribe(subscription)
+
+
+@router.post("/events/token", response_model=StreamToken)
+async def document_events_token(current_user=Depends(get_current_user)):
+    """
+    Short-lived token for GET /documents/events. EventSource cannot send
+    an Authorization header, and a token in the URL lands in access and
+    proxy logs, so the stream takes this one instead of the access token.
+    It only opens status streams, and only for STATUS_STREAM_TOKEN_SECONDS.
+    """
+    return {
+        "token": create_access_token(
+            current_user.email,
+            expires_delta=timedelta(seconds=settings.STATUS_STREAM_TOKEN_SECONDS),
+            scope=STREAM_SCOPE,
+        ),
+        "expires_in": settings.STATUS_STREAM_TOKEN_SECONDS,
+    }
+
+
+@router.get("/events")
+async def document_events(
+    request: Request,
+    ids: str = Query(..., description="Comma-separated document ids"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user=Depends(get_stream_user),
+):
+    """
+    Server-Sent Events stream of the processing status of several documents.
+
+    Sends a status event per document right away and on every change, and
+    a done event once all of them are completed or failed. Replaces
+    polling GET /documents/{id} for each document being processed.
+    Authenticated by ?token= from POST /documents/events/token.
+    """
+    try:
+        document_ids = {int(part) for part in ids.split(",") if part.strip()}
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be comma-separated integers")
+    if not document_ids:
+        raise HTTPException(status_code=400, detail="No document ids given")
+    if len(document_ids) > settings.STATUS_STREAM_MAX_DOCUMENTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.STATUS_STREAM_MAX_DOCUMENTS} documents per stream",
+        )
+
+    states = await db.run_sync(document_states, document_ids, owner_id=current_user.id)
+    if not states:
+        raise HTTPException(status_code=404, detail="Document not found")
+    return StreamingResponse(
+        _status_events(request, states),
+        media_type="text/event-stream",
+        # X-Accel-Buffering: nginx would otherwise hold events back
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("", response_model=DocumentListResponse)
 async def list_documents(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user=Depends(get_current_user),
-    skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    status: Optional[str] = Query(None, description="e.g. processing, completed, failed"),
+    classification: Optional[str] = Query(None, description="classification label"),
 ):
-    """Get all documents for the current user"""
-    from app.db.models import Document
-    documents = db.query(Document).filter(
-        Document.owner_id == current_user.id
-    ).offset(skip).limit(limit).all()
-    return documents
+    """Get the current user's documents, newest first, one page at a time"""
+    try:
+        documents, next_cursor = await db.run_sync(
+            list_owner_documents, current_user.id, limit, cursor=cursor, status=status, classification=classification
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"documents": documents, "next_cursor": next_cursor}
 
 
 @router.get("/{document_id}", response_model=DocumentResponse)
 async def get_document(
     document_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user=Depends(get_current_user),
 ):
     """Get a specific document by ID"""
-    from app.db.models import Document
-    document = db.query(Document).filter(
+    document = await db.scalar(select(Document).where(
         Document.id == document_id,
         Document.owner_id == current_user.id
-    ).first()
+    ))
     
     if not document:
         raise HTTPException(status_code=404, detail="Document not found")
@@ -5,8 +5,8 @@ from typing import Dict
 import logging
 import os
 
-from app.db.session import SessionLocal
-from app.core.vector_store import faiss_index, INDEX_PATH
+from app.db.session import async_engine
+from app.core.vector_store import vector_store, INDEX_PATH
 
 logger = logging.getLogger(__name__)
 
@@ -23,7 +23,7 @@ async def readiness_check() -> JSONResponse:
     Readiness check endpoint to verify if all services are ready.
     Checks:
     - Database connection
-    - Embedding model loaded
+    - Embedding model loaded and warmed up
     - FAISS vector store ready
     
     Returns:
@@ -39,9 +39,8 @@ async def readiness_check() -> JSONResponse:
     
     # Check database connection
     try:
-        db = SessionLocal()
-        db.execute(text("SELECT 1"))
-        db.close()
+        async with async_engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
         checks["database"] = True
     except Exception as e:
         logger.error(f"Database check failed: {str(e)}")
@@ -49,11 +48,13 @@ async def readiness_check() -> JSONResponse:
     
     # Check embedding model
     try:
-        from app.core.ai_models import embedding_model
-        if embedding_model is not None:
+        from app.core import ai_models
+        if ai_models.models_ready.is_set():
             checks["embedding_model"] = True
+        elif ai_models.model_load_error() is not None:
+            errors.append(f"Embedding model: {ai_models.model_load_error()}")
         else:
-            errors.append("Embedding model: Not loaded")
+            errors.append("Embedding model: Loading")
     except Exception as e:
         logger.error(f"Embedding model check failed: {str(e)}")
         errors.append(f"Embedding model: {str(e)}")
@@ -61,7 +62,7 @@ async def readiness_check() -> JSONResponse:
     # Check FAISS vector store
     try:
         # Check if index is initialized and either has data or index file exists
-        if faiss_index is not None and (faiss_index.ntotal > 0 or os.path.exists(INDEX_PATH)):
+        if vector_store.ntotal > 0 or os.path.exists(INDEX_PATH):
             checks["vector_store"] = True
         else:
             errors.append("Vector store: Not ready or empty")
@@ -20,5 +20,5 @@ def search(
     ),
 ):
     return SearchResponse(
-        results=semantic_search(payload.query, payload.limit)
+        results=semantic_search(payload.query, payload.limit, nprobe=payload.nprobe)
     )
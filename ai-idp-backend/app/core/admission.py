@@ -0,0 +1,124 @@
+"""
+Upload admission control
+"""
+from collections import deque
+from typing import Callable, Iterable, Optional
+import logging
+import math
+import threading
+import time
+
+from app.metrics import UPLOAD_INFLIGHT_BYTES
+
+logger = logging.getLogger(__name__)
+
+
+def _database_queue_stats(window_seconds: int) -> dict[str, tuple[int, int]]:
+    from app.db.session import SessionLocal
+    from app.workers.job_queue import queue_stats
+
+    db = SessionLocal()
+    try:
+        return queue_stats(db, window_seconds)
+    finally:
+        db.close()
+
+
+class AdmissionController:
+    """
+    Decides whether an upload may start, and when to retry if not.
+
+    Two limits apply:
+
+    - Backlog: queued ingestion jobs of the given priority classes, read
+      from the database at most every stats_ttl seconds. Over the limit,
+      the retry delay is the time the workers need to drain the excess at
+      the completion rate of those classes measured over drain_window
+      seconds.
+    - In-flight bytes: upload bodies this process is receiving at once.
+      Each upload reserves its Content-Length up front. Over budget, the
+      retry delay is the time to receive the excess at the upload
+      throughput measured over the last minute.
+
+    Retry delays are clamped to [1, max_retry_after] seconds.
+    """
+
+    THROUGHPUT_WINDOW = 60  # seconds of finished uploads used for the byte rate
+
+    def __init__(
+        self,
+        budget_bytes: int,
+        drain_window: int,
+        stats_ttl: float,
+        max_retry_after: int,
+        queue_stats: Callable[[int], dict[str, tuple[int, int]]] = _database_queue_stats,
+    ):
+        self.budget_bytes = budget_bytes
+        self.drain_window = drain_window
+        self.stats_ttl = stats_ttl
+        self.max_retry_after = max_retry_after
+        self.queue_stats = queue_stats
+
+        self.inflight_bytes = 0
+        self._uploads: deque[tuple[float, int]] = deque()  # (finished at, bytes received)
+        self._stats = None
+        self._stats_at = 0.0
+        self._lock = threading.Lock()
+
+    def _retry_after(self, excess: float, rate: float) -> int:
+        if rate <= 0:
+            return self.max_retry_after
+        return max(1, min(self.max_retry_after, math.ceil(excess / rate)))
+
+    def backlog(self, priorities: Iterable[str] = None) -> tuple[int, float]:
+        """
+        (queued jobs, jobs finished per second) of the priority classes, all
+        when None; blocking, cached for stats_ttl
+        """
+        now = time.monotonic()
+        if self._stats is None or now - self._stats_at >= self.stats_ttl:
+            self._stats = self.queue_stats(self.drain_window)
+            self._stats_at = now
+        counts = [
+            counts for priority, counts in self._stats.items() if priorities is None or priority in priorities
+        ]
+        return sum(queued for queued, _ in counts), sum(finished for _, finished in counts) / self.drain_window
+
+    def check_backlog(self, max_queued: int, priorities: Iterable[str] = None) -> Optional[int]:
+        """None if the backlog of the priority classes is under max_queued, else seconds until it should be"""
+        if max_queued <= 0:
+            return None
+        try:
+            queued, drain_rate = self.backlog(priorities)
+        except Exception as e:
+            # Fail open: the upload itself reports a database outage
+            logger.warning(f"Could not read the job backlog for admission control: {e}")
+            return None
+        if queued < max_queued:
+            return None
+        return self._retry_after(queued - max_queued + 1, drain_rate)
+
+    def reserve(self, nbytes: int) -> Optional[int]:
+        """Reserve nbytes of the in-flight budget; None on success, else seconds to wait"""
+        with self._lock:
+            # A single upload larger than the whole budget still runs when nothing else does
+            if self.budget_bytes <= 0 or self.inflight_bytes == 0 or self.inflight_bytes + nbytes <= self.budget_bytes:
+                self.inflight_bytes += nbytes
+                UPLOAD_INFLIGHT_BYTES.set(self.inflight_bytes)
+                return None
+            excess = self.inflight_bytes + nbytes - self.budget_bytes
+            return self._retry_after(excess, self._throughput())
+
+    def release(self, nbytes: int, received: int) -> None:
+        """Return a reservation once its request is done; received bytes feed the throughput"""
+        with self._lock:
+            self.inflight_bytes -= nbytes
+            UPLOAD_INFLIGHT_BYTES.set(self.inflight_bytes)
+            self._uploads.append((time.monotonic(), received))
+
+    def _throughput(self) -> float:
+        """Upload bytes received per second over the last minute"""
+        cutoff = time.monotonic() - self.THROUGHPUT_WINDOW
+        while self._uploads and self._uploads[0][0] < cutoff:
+            self._uploads.popleft()
+        return sum(received for _, received in self._uploads) / self.THROUGHPUT_WINDOW
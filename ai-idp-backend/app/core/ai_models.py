@@ -1,6 +1,9 @@
-from sentence_transformers import SentenceTransformer
+from app.core.config import settings
 import logging
+import os
+import re
 import threading
+import time
 
 logger = logging.getLogger(__name__)
 
@@ -9,33 +12,194 @@ classifier = None
 _model_lock = threading.Lock()
 _models_loaded = False
 
+# Set once the models are loaded and warmed up
+models_ready = threading.Event()
+_loader = None
+_loader_lock = threading.Lock()
+_load_error = None
+
+def _onnx_model_dir(base_dir: str, model_name: str) -> str:
+    """Export directory of one model, so changing the configured model triggers a new export"""
+    return os.path.join(base_dir, re.sub(r"[^A-Za-z0-9._-]+", "--", model_name).strip("-."))
+
+def _load_sentence_transformer(model_name: str, **kwargs):
+    """Load from the local artifact cache, downloading only when it is missing"""
+    from sentence_transformers import SentenceTransformer
+
+    try:
+        return SentenceTransformer(
+            model_name, cache_folder=settings.MODEL_CACHE_DIR, local_files_only=True, **kwargs
+        )
+    except Exception:
+        logger.info(f"{model_name} not in {settings.MODEL_CACHE_DIR}, downloading...")
+        return SentenceTransformer(model_name, cache_folder=settings.MODEL_CACHE_DIR, **kwargs)
+
+def _load_pretrained(cls, model_name: str, **kwargs):
+    """from_pretrained() through the local artifact cache, downloading only when missing"""
+    try:
+        return cls.from_pretrained(
+            model_name, cache_dir=settings.MODEL_CACHE_DIR, local_files_only=True, **kwargs
+        )
+    except Exception:
+        logger.info(f"{model_name} not in {settings.MODEL_CACHE_DIR}, downloading...")
+        return cls.from_pretrained(model_name, cache_dir=settings.MODEL_CACHE_DIR, **kwargs)
+
+def _load_onnx_embedding_model(
+    model_name: str = settings.EMBEDDING_MODEL,
+    quantize: bool = settings.ONNX_QUANTIZE,
+    base_dir: str = settings.ONNX_MODEL_DIR,
+):
+    """
+    SentenceTransformer running on ONNX Runtime.
+
+    The model is exported (and optionally int8-quantized) into its own
+    directory under base_dir on first use; later loads read the exported
+    files directly.
+    """
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+
+    path = _onnx_model_dir(base_dir, model_name)
+    file_name = "onnx/model.onnx"
+    if quantize:
+        file_name = f"onnx/model_qint8_{settings.ONNX_QUANTIZATION_CONFIG}.onnx"
+
+    if not os.path.exists(os.path.join(path, "onnx", "model.onnx")):
+        logger.info(f"Exporting {model_name} to ONNX in {path}...")
+        _load_sentence_transformer(model_name, backend="onnx").save(path)
+    if not os.path.exists(os.path.join(path, file_name)):
+        logger.info(f"Quantizing ONNX embedding model ({settings.ONNX_QUANTIZATION_CONFIG})...")
+        export_dynamic_quantized_onnx_model(
+            SentenceTransformer(path, backend="onnx"),
+            quantization_config=settings.ONNX_QUANTIZATION_CONFIG,
+            model_name_or_path=path,
+        )
+
+    return SentenceTransformer(path, backend="onnx", model_kwargs={"file_name": file_name})
+
+def _load_onnx_classifier(
+    model_name: str = settings.CLASSIFIER_MODEL,
+    quantize: bool = settings.ONNX_QUANTIZE,
+    base_dir: str = settings.ONNX_MODEL_DIR,
+):
+    """text-classification pipeline running on ONNX Runtime, exported on first use"""
+    from optimum.onnxruntime import ORTModelForSequenceClassification, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    from transformers import AutoTokenizer, pipeline
+
+    path = _onnx_model_dir(base_dir, model_name)
+    quantized_suffix = f"quantized_{settings.ONNX_QUANTIZATION_CONFIG}"
+    file_name = f"model_{quantized_suffix}.onnx" if quantize else "model.onnx"
+
+    if not os.path.exists(os.path.join(path, "model.onnx")):
+        logger.info(f"Exporting {model_name} to ONNX in {path}...")
+        _load_pretrained(ORTModelForSequenceClassification, model_name, export=True).save_pretrained(path)
+        _load_pretrained(AutoTokenizer, model_name).save_pretrained(path)
+    if not os.path.exists(os.path.join(path, file_name)):
+        logger.info(f"Quantizing ONNX classifier ({settings.ONNX_QUANTIZATION_CONFIG})...")
+        quantization_config = getattr(AutoQuantizationConfig, settings.ONNX_QUANTIZATION_CONFIG)(
+            is_static=False, per_channel=False
+        )
+        ORTQuantizer.from_pretrained(path, file_name="model.onnx").quantize(
+            save_dir=path, quantization_config=quantization_config, file_suffix=quantized_suffix
+        )
+
+    model = ORTModelForSequenceClassification.from_pretrained(path, file_name=file_name)
+    return pipeline("text-classification", model=model, tokenizer=AutoTokenizer.from_pretrained(path))
+
 def load_models():
     """Load AI models with thread-safe initialization"""
     global embedding_model, classifier, _models_loaded
-    
+
     if _models_loaded:
         return
-    
+
     with _model_lock:
         # Double-check pattern to avoid redundant loads
         if _models_loaded:
             return
-        
+
+        onnx = settings.INFERENCE_BACKEND == "onnx"
+        backend = f"onnx{' int8' if settings.ONNX_QUANTIZE else ''}" if onnx else "torch"
         try:
-            logger.info("Loading embedding model (all-MiniLM-L6-v2)...")
-            embedding_model = SentenceTransformer("all-MiniLM-L6-v2")
+            logger.info(f"Loading embedding model ({settings.EMBEDDING_MODEL}, {backend})...")
+            if onnx:
+                embedding_model = _load_onnx_embedding_model()
+            else:
+                embedding_model = _load_sentence_transformer(settings.EMBEDDING_MODEL)
             logger.info("Embedding model loaded successfully")
-            
-            logger.info("Loading classifier model...")
+
+            logger.info(f"Loading classifier model ({settings.CLASSIFIER_MODEL}, {backend})...")
             try:
-                from transformers import pipeline
-                classifier = pipeline("text-classification", model="distilbert-base-uncased")
+                if onnx:
+                    classifier = _load_onnx_classifier()
+                else:
+                    from transformers import (
+                        AutoModelForSequenceClassification, AutoTokenizer, pipeline
+                    )
+                    classifier = pipeline(
+                        "text-classification",
+                        model=_load_pretrained(AutoModelForSequenceClassification, settings.CLASSIFIER_MODEL),
+                        tokenizer=_load_pretrained(AutoTokenizer, settings.CLASSIFIER_MODEL),
+                    )
                 logger.info("Classifier model loaded successfully")
             except Exception as e:
                 logger.warning(f"Could not load classifier: {e}")
                 classifier = None
-            
+
             _models_loaded = True
         except Exception as e:
             logger.error(f"Failed to load models: {e}")
             raise
+
+def warm_up():
+    """Run one small inference per model so the first request skips JIT and allocator warm-up"""
+    start = time.time()
+    embedding_model.encode(["warm up", "warm up the embedding model"])
+    if classifier is not None:
+        classifier("warm up")
+    logger.info(f"AI models warmed up in {time.time() - start:.2f}s")
+
+def _load_and_warm_up():
+    global _loader, _load_error
+    try:
+        load_models()
+        warm_up()
+        _load_error = None
+        models_ready.set()
+    except Exception as e:
+        _load_error = e
+        logger.error(f"Background model loading failed: {e}", exc_info=True)
+        # Let the next caller start a fresh attempt
+        with _loader_lock:
+            _loader = None
+
+def start_model_loading() -> threading.Thread:
+    """Load and warm up the models on a background thread (at most one at a time)"""
+    global _loader
+    with _loader_lock:
+        if _loader is None:
+            _loader = threading.Thread(target=_load_and_warm_up, name="model-loader", daemon=True)
+            _loader.start()
+        return _loader
+
+def wait_for_models(timeout: float = settings.MODEL_READY_TIMEOUT) -> None:
+    """Block until the models are ready, starting the load if nobody has"""
+    if models_ready.is_set():
+        return
+    start_model_loading().join(timeout)
+    if not models_ready.is_set():
+        reason = f": {_load_error}" if _load_error else f" after {timeout}s"
+        raise RuntimeError(f"AI models are not ready{reason}")
+
+def model_load_error():
+    """The error of the last failed background load, if any"""
+    return _load_error
+
+def get_embedding_model():
+    wait_for_models()
+    return embedding_model
+
+def get_classifier():
+    """The classifier, or None when it could not be loaded"""
+    wait_for_models()
+    return classifier
@@ -0,0 +1,104 @@
+"""
+Dynamic micro-batching for model inference
+"""
+from concurrent.futures import Future
+from typing import Callable, Sequence
+import logging
+import queue
+import threading
+import time
+
+from app.metrics import INFERENCE_BATCH_SIZE, INFERENCE_QUEUE_WAIT
+
+logger = logging.getLogger(__name__)
+
+
+class BatchingExecutor:
+    """
+    Groups concurrent inference requests into batches.
+
+    Callers submit a list of inputs and get a Future for the list of
+    outputs. A single worker thread waits up to max_wait_ms after the first
+    request for more to arrive, until max_batch_size inputs are queued.
+    It then sorts the inputs by length, to keep padding low, and runs
+    process_batch on slices of at most max_batch_size. Requests larger than
+    one batch are split across batches.
+    """
+
+    def __init__(
+        self,
+        process_batch: Callable[[list], Sequence],
+        max_batch_size: int,
+        max_wait_ms: int,
+        name: str,
+        sort_key: Callable = len,
+    ):
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.name = name
+        self.sort_key = sort_key
+
+        self._requests: queue.Queue = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+
+    def submit(self, items: list) -> Future:
+        """Queue items for inference; the Future resolves to their outputs in order"""
+        future = Future()
+        if not items:
+            future.set_result([])
+            return future
+
+        self._ensure_worker()
+        self._requests.put((list(items), future, time.monotonic()))
+        return future
+
+    def _ensure_worker(self) -> None:
+        with self._worker_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._run, name=f"{self.name}-batcher", daemon=True
+                )
+                self._worker.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._requests.get()]
+            size = len(batch[0][0])
+            deadline = time.monotonic() + self.max_wait
+            while size < self.max_batch_size:
+                try:
+                    request = self._requests.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                batch.append(request)
+                size += len(request[0])
+            self._process(batch)
+
+    def _process(self, batch: list) -> None:
+        now = time.monotonic()
+        items = []
+        for request_items, _, submitted in batch:
+            items.extend(request_items)
+            INFERENCE_QUEUE_WAIT.labels(self.name).observe(now - submitted)
+
+        try:
+            order = sorted(range(len(items)), key=lambda i: self.sort_key(items[i]))
+            outputs = [None] * len(items)
+            for first in range(0, len(order), self.max_batch_size):
+                positions = order[first:first + self.max_batch_size]
+                INFERENCE_BATCH_SIZE.labels(self.name).observe(len(positions))
+                results = self.process_batch([items[i] for i in positions])
+                for position, result in zip(positions, results):
+                    outputs[position] = result
+        except Exception as e:
+            logger.error(f"{self.name} batch of {len(items)} failed: {e}")
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+
+        offset = 0
+        for request_items, future, _ in batch:
+            future.set_result(outputs[offset:offset + len(request_items)])
+            offset += len(request_items)
@@ -0,0 +1,64 @@
+"""
+Bounded in-memory caches
+"""
+from collections import OrderedDict
+from typing import Any, Hashable
+import threading
+import time
+
+from app.metrics import CACHE_EVICTIONS, CACHE_HITS, CACHE_MISSES, CACHE_SIZE
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    Thread-safe least-recently-used cache with a fixed number of entries.
+
+    Entries optionally expire ttl seconds after they are stored. Hits,
+    misses, evictions and size are exported as Prometheus metrics labelled
+    with the cache name.
+    """
+
+    def __init__(self, name: str, max_size: int, ttl: float = None):
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self.lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING and self.ttl is not None and time.monotonic() - entry[0] > self.ttl:
+                del self._entries[key]
+                CACHE_SIZE.labels(self.name).set(len(self._entries))
+                entry = _MISSING
+
+            if entry is _MISSING:
+                CACHE_MISSES.labels(self.name).inc()
+                return default
+
+            self._entries.move_to_end(key)
+            CACHE_HITS.labels(self.name).inc()
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.max_size <= 0:
+            return
+
+        with self.lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                CACHE_EVICTIONS.labels(self.name).inc()
+            CACHE_SIZE.labels(self.name).set(len(self._entries))
+
+    def clear(self) -> None:
+        with self.lock:
+            self._entries.clear()
+            CACHE_SIZE.labels(self.name).set(0)
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -19,14 +19,133 @@ class Settings(BaseSettings):
         f"sqlite:///{_sqlite_path.as_posix()}"  # SQLite for local development
     )
 
+    # Used by the async endpoints; empty derives it from DATABASE_URL (asyncpg / aiosqlite)
+    ASYNC_DATABASE_URL: str = os.getenv("ASYNC_DATABASE_URL", "")
+    ASYNC_DB_POOL_SIZE: int = int(os.getenv("ASYNC_DB_POOL_SIZE", "10"))  # connections per API process
+    ASYNC_DB_MAX_OVERFLOW: int = int(os.getenv("ASYNC_DB_MAX_OVERFLOW", "20"))
+
     REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 
     # Rate limiting settings
     UPLOAD_RATE_LIMIT: int = int(os.getenv("UPLOAD_RATE_LIMIT", "10"))  # requests
     UPLOAD_RATE_WINDOW: int = int(os.getenv("UPLOAD_RATE_WINDOW", "60"))  # seconds
+    BULK_RATE_LIMIT: int = int(os.getenv("BULK_RATE_LIMIT", "5"))  # bulk ingestion requests
+    BULK_RATE_WINDOW: int = int(os.getenv("BULK_RATE_WINDOW", "60"))  # seconds
     SEARCH_RATE_LIMIT: int = int(os.getenv("SEARCH_RATE_LIMIT", "30"))  # requests
     SEARCH_RATE_WINDOW: int = int(os.getenv("SEARCH_RATE_WINDOW", "60"))  # seconds
 
+    # Uploads
+    UPLOAD_MAX_SIZE_MB: int = int(os.getenv("UPLOAD_MAX_SIZE_MB", "10"))
+    UPLOAD_CHUNK_SIZE: int = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))  # bytes copied per read
+    BULK_MAX_SIZE_MB: int = int(os.getenv("BULK_MAX_SIZE_MB", "2048"))  # whole bulk request (archives included)
+    BULK_MAX_DOCUMENTS: int = int(os.getenv("BULK_MAX_DOCUMENTS", "10000"))  # documents per bulk request
+
+    # Upload admission control (per API process); 0 disables a check
+    ADMISSION_MAX_QUEUED_JOBS: int = int(os.getenv("ADMISSION_MAX_QUEUED_JOBS", "5000"))  # single uploads get 503 above this interactive backlog
+    ADMISSION_MAX_QUEUED_BULK_JOBS: int = int(os.getenv("ADMISSION_MAX_QUEUED_BULK_JOBS", "1000"))  # bulk uploads: limit on all queued jobs
+    UPLOAD_INFLIGHT_BUDGET_MB: int = int(os.getenv("UPLOAD_INFLIGHT_BUDGET_MB", "512"))  # upload bodies being received at once; 429 above
+    ADMISSION_DRAIN_WINDOW_SECONDS: int = int(os.getenv("ADMISSION_DRAIN_WINDOW_SECONDS", "300"))  # window for the measured job drain rate
+    ADMISSION_STATS_TTL_SECONDS: float = float(os.getenv("ADMISSION_STATS_TTL_SECONDS", "2"))  # backlog is re-read from the DB this often
+    ADMISSION_MAX_RETRY_AFTER: int = int(os.getenv("ADMISSION_MAX_RETRY_AFTER", "600"))  # seconds
+
+    # Document status stream (GET /documents/events)
+    STATUS_POLL_INTERVAL_MS: int = int(os.getenv("STATUS_POLL_INTERVAL_MS", "1000"))  # one status query per API process per interval
+    STATUS_STREAM_KEEPALIVE_SECONDS: int = int(os.getenv("STATUS_STREAM_KEEPALIVE_SECONDS", "15"))  # keeps proxies from closing idle streams
+    STATUS_STREAM_MAX_DOCUMENTS: int = int(os.getenv("STATUS_STREAM_MAX_DOCUMENTS", "200"))  # documents per connection
+    STATUS_STREAM_TOKEN_SECONDS: int = int(os.getenv("STATUS_STREAM_TOKEN_SECONDS", "60"))  # time to open a stream with its token
+
+    # Ingestion job queue and workers (python -m app.workers)
+    WORKER_PROCESSES: int = int(os.getenv("WORKER_PROCESSES", "2"))
+    WORKER_POLL_INTERVAL_MS: int = int(os.getenv("WORKER_POLL_INTERVAL_MS", "1000"))  # idle wait between claims
+    JOB_LEASE_SECONDS: int = int(os.getenv("JOB_LEASE_SECONDS", "120"))  # a job is reclaimed once its lease lapses
+    JOB_HEARTBEAT_SECONDS: int = int(os.getenv("JOB_HEARTBEAT_SECONDS", "30"))  # lease renewal interval
+    JOB_MAX_ATTEMPTS: int = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+    JOB_RETRY_BACKOFF_SECONDS: int = int(os.getenv("JOB_RETRY_BACKOFF_SECONDS", "30"))  # doubled per attempt
+    JOB_RETRY_BACKOFF_MAX_SECONDS: int = int(os.getenv("JOB_RETRY_BACKOFF_MAX_SECONDS", "900"))
+    SCHEDULER_SHORTEST_JOB_FIRST: bool = os.getenv("SCHEDULER_SHORTEST_JOB_FIRST", "false").lower() == "true"  # per owner, by page count
+    SCHEDULER_REFRESH_SECONDS: float = float(os.getenv("SCHEDULER_REFRESH_SECONDS", "1"))  # reuse of the queue summary between claims
+    SCHEDULER_BYTES_PER_PAGE: int = int(os.getenv("SCHEDULER_BYTES_PER_PAGE", "200000"))  # page estimate when the count is unknown
+    WORKER_METRICS_PORT: int = int(os.getenv("WORKER_METRICS_PORT", "0"))  # worker N serves /metrics on port + N; 0 = off
+
+    # Staged ingestion pipeline inside each worker (threads per stage)
+    PIPELINE_EXTRACT_WORKERS: int = int(os.getenv("PIPELINE_EXTRACT_WORKERS", "2"))  # documents OCR'd at once (pages share the OCR pool)
+    PIPELINE_EMBED_WORKERS: int = int(os.getenv("PIPELINE_EMBED_WORKERS", "4"))  # concurrent documents fill the embedding batches
+    PIPELINE_CLASSIFY_WORKERS: int = int(os.getenv("PIPELINE_CLASSIFY_WORKERS", "4"))
+    PIPELINE_QUEUE_SIZE: int = int(os.getenv("PIPELINE_QUEUE_SIZE", "4"))  # documents waiting per stage before upstream blocks
+    PIPELINE_MAX_IN_FLIGHT: int = int(os.getenv("PIPELINE_MAX_IN_FLIGHT", "16"))  # claimed jobs per worker process
+
+    # Vector store settings
+    VECTOR_STORE_PATH: str = os.getenv("VECTOR_STORE_PATH", "app/storage/vector_store")
+    VECTOR_COMMIT_INTERVAL_MS: int = int(os.getenv("VECTOR_COMMIT_INTERVAL_MS", "500"))  # max wait before a group commit
+    VECTOR_COMMIT_MAX_VECTORS: int = int(os.getenv("VECTOR_COMMIT_MAX_VECTORS", "256"))  # commit early once this many are pending
+    VECTOR_MERGE_SEGMENTS: int = int(os.getenv("VECTOR_MERGE_SEGMENTS", "32"))  # merge into the base index after this many segments
+    VECTOR_REFRESH_INTERVAL_MS: int = int(os.getenv("VECTOR_REFRESH_INTERVAL_MS", "1000"))  # API picks up worker segments this often
+
+    # Approximate nearest-neighbour tier: "flat" (exact), "ivf_flat" or "ivf_pq"
+    VECTOR_INDEX_TYPE: str = os.getenv("VECTOR_INDEX_TYPE", "flat")
+    VECTOR_ANN_PROMOTE_AT: int = int(os.getenv("VECTOR_ANN_PROMOTE_AT", "50000"))  # vectors before leaving flat search
+    VECTOR_IVF_NLIST: int = int(os.getenv("VECTOR_IVF_NLIST", "0"))  # 0 = 4 * sqrt(vector count)
+    VECTOR_IVF_NPROBE: int = int(os.getenv("VECTOR_IVF_NPROBE", "16"))  # default lists scanned per query
+    VECTOR_PQ_M: int = int(os.getenv("VECTOR_PQ_M", "48"))  # PQ sub-quantizers (must divide the dimension)
+
+    # AI models
+    EMBEDDING_MODEL: str = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+    CLASSIFIER_MODEL: str = os.getenv("CLASSIFIER_MODEL", "distilbert-base-uncased")
+    MODEL_CACHE_DIR: str = os.getenv("MODEL_CACHE_DIR", "app/storage/models")  # local Hugging Face artifact cache
+    MODEL_READY_TIMEOUT: int = int(os.getenv("MODEL_READY_TIMEOUT", "300"))  # seconds a request waits for models to load
+    # "torch" (PyTorch) or "onnx" (ONNX Runtime, exported on first load)
+    INFERENCE_BACKEND: str = os.getenv("INFERENCE_BACKEND", "torch")
+    ONNX_MODEL_DIR: str = os.getenv("ONNX_MODEL_DIR", "app/storage/onnx")
+    ONNX_QUANTIZE: bool = os.getenv("ONNX_QUANTIZE", "false").lower() == "true"  # dynamic int8 quantization
+    ONNX_QUANTIZATION_CONFIG: str = os.getenv("ONNX_QUANTIZATION_CONFIG", "avx2")  # avx2, avx512, avx512_vnni or arm64
+
+    # Chunked embeddings (all-MiniLM-L6-v2 truncates input at 256 tokens)
+    EMBEDDING_CHUNK_TOKENS: int = int(os.getenv("EMBEDDING_CHUNK_TOKENS", "200"))
+    EMBEDDING_CHUNK_OVERLAP: int = int(os.getenv("EMBEDDING_CHUNK_OVERLAP", "40"))  # tokens shared by neighbouring chunks
+    EMBEDDING_BATCH_SIZE: int = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))  # max texts per model call
+    EMBEDDING_MAX_WAIT_MS: int = int(os.getenv("EMBEDDING_MAX_WAIT_MS", "5"))  # time to gather concurrent requests into a batch
+    CLASSIFIER_BATCH_SIZE: int = int(os.getenv("CLASSIFIER_BATCH_SIZE", "16"))
+    CLASSIFIER_MAX_WAIT_MS: int = int(os.getenv("CLASSIFIER_MAX_WAIT_MS", "5"))
+
+    # Chunk hits are grouped per document: "max" or "mean_top_n"
+    SEARCH_AGGREGATION: str = os.getenv("SEARCH_AGGREGATION", "max")
+    SEARCH_AGGREGATION_TOP_N: int = int(os.getenv("SEARCH_AGGREGATION_TOP_N", "3"))
+    SEARCH_CHUNK_CANDIDATES: int = int(os.getenv("SEARCH_CHUNK_CANDIDATES", "10"))  # chunks fetched per requested result
+
+    # Search caches (entries; 0 disables a cache)
+    QUERY_EMBEDDING_CACHE_SIZE: int = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "1024"))
+    SEARCH_RESULT_CACHE_SIZE: int = int(os.getenv("SEARCH_RESULT_CACHE_SIZE", "512"))
+    SEARCH_RESULT_CACHE_TTL: int = int(os.getenv("SEARCH_RESULT_CACHE_TTL", "60"))  # seconds; bounds staleness of non-vector fields
+
+    # PDF text layer: pages whose embedded text passes these checks skip OCR
+    PDF_TEXT_LAYER: bool = os.getenv("PDF_TEXT_LAYER", "true").lower() == "true"
+    TEXT_LAYER_MIN_CHARS: int = int(os.getenv("TEXT_LAYER_MIN_CHARS", "20"))  # non-whitespace characters per page
+    TEXT_LAYER_MIN_PRINTABLE: float = float(os.getenv("TEXT_LAYER_MIN_PRINTABLE", "0.9"))  # share of printable characters
+
+    # OCR engine: "auto" (tesserocr when installed), "tesserocr" or "pytesseract"
+    OCR_ENGINE: str = os.getenv("OCR_ENGINE", "auto")
+    OCR_LANG: str = os.getenv("OCR_LANG", "eng")
+
+    # PDF OCR: pages are rendered in windows and OCR'd in a process pool
+    OCR_WORKERS: int = int(os.getenv("OCR_WORKERS", "0"))  # 0 = one per available core
+    OCR_PAGE_WINDOW: int = int(os.getenv("OCR_PAGE_WINDOW", "8"))  # pages rendered per pdftoppm call
+    OCR_RENDER_THREADS: int = int(os.getenv("OCR_RENDER_THREADS", "2"))  # pdftoppm processes per window
+    OCR_DPI: int = int(os.getenv("OCR_DPI", "200"))  # render DPI when the text height cannot be estimated
+
+    # OCR image preprocessing
+    OCR_PREPROCESS: str = os.getenv("OCR_PREPROCESS", "grayscale,downscale,binarize")  # stages, in order
+    OCR_BINARIZE: str = os.getenv("OCR_BINARIZE", "otsu")  # "otsu" or "adaptive"
+    OCR_TARGET_TEXT_PX: int = int(os.getenv("OCR_TARGET_TEXT_PX", "25"))  # glyph height Tesseract reads reliably
+    OCR_MIN_DPI: int = int(os.getenv("OCR_MIN_DPI", "150"))
+    OCR_MAX_DPI: int = int(os.getenv("OCR_MAX_DPI", "300"))
+    OCR_PROBE_DPI: int = int(os.getenv("OCR_PROBE_DPI", "100"))  # low-resolution render used to estimate text height
+    OCR_MAX_PIXELS: int = int(os.getenv("OCR_MAX_PIXELS", "10000000"))  # cap on pixels handed to Tesseract
+
+    # On-disk result caches (content-addressed; 0 MB disables a cache)
+    RESULT_CACHE_DIR: str = os.getenv("RESULT_CACHE_DIR", "app/storage/cache")
+    OCR_CACHE_MAX_MB: int = int(os.getenv("OCR_CACHE_MAX_MB", "512"))
+    EMBEDDING_CACHE_MAX_MB: int = int(os.getenv("EMBEDDING_CACHE_MAX_MB", "1024"))
+
     class Config:
         env_file = ".env"
         extra = "ignore"  # Ignore extra fields from .env file
@@ -0,0 +1,131 @@
+"""
+Content-addressed on-disk result cache
+"""
+from typing import Optional
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+
+from app.metrics import CACHE_EVICTIONS, CACHE_HITS, CACHE_MISSES, CACHE_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+def content_key(*parts) -> str:
+    """sha256 over the parts; str parts are UTF-8 encoded, others must be bytes-like"""
+    digest = hashlib.sha256()
+    for part in parts:
+        data = part.encode("utf-8") if isinstance(part, str) else memoryview(part)
+        digest.update(len(data).to_bytes(8, "little"))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+class DiskCache:
+    """
+    Bytes stored in one file per key under directory, with least-recently-
+    used eviction once the files exceed max_bytes.
+
+    A hit touches the file's mtime, and eviction deletes the oldest mtimes
+    first until the cache is back under low_water of max_bytes. Writes are
+    atomic (temp file + rename), so several processes can share a directory.
+    Each process tracks only its own estimate of the total size, and
+    eviction rescans the directory to correct it.
+    """
+
+    def __init__(self, name: str, directory: str, max_bytes: int, low_water: float = 0.9):
+        self.name = name
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.low_water = low_water
+        self.lock = threading.Lock()
+        self._size = None  # bytes, scanned on first write
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, key: str) -> Optional[bytes]:
+        if self.max_bytes <= 0:
+            return None
+
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except FileNotFoundError:
+            CACHE_MISSES.labels(self.name).inc()
+            return None
+        except OSError as e:
+            logger.warning(f"{self.name} cache read failed for {key}: {e}")
+            CACHE_MISSES.labels(self.name).inc()
+            return None
+
+        CACHE_HITS.labels(self.name).inc()
+        return data
+
+    def set(self, key: str, data: bytes) -> None:
+        if self.max_bytes <= 0 or len(data) > self.max_bytes:
+            return
+
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                try:
+                    replaced = os.stat(path).st_size
+                except FileNotFoundError:
+                    replaced = 0
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError as e:
+            logger.warning(f"{self.name} cache write failed for {key}: {e}")
+            return
+
+        with self.lock:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._scan())
+            else:
+                self._size += len(data) - replaced
+            if self._size > self.max_bytes:
+                self._evict()
+            CACHE_SIZE.labels(self.name).set(self._size)
+
+    def _scan(self):
+        """(mtime, size, path) of every cached file"""
+        for shard in os.scandir(self.directory) if os.path.isdir(self.directory) else ():
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.startswith(".tmp-"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                yield stat.st_mtime, stat.st_size, entry.path
+
+    def _evict(self) -> None:
+        files = sorted(self._scan())
+        size = sum(file_size for _, file_size, _ in files)
+        target = self.max_bytes * self.low_water
+        evicted = 0
+        for _, file_size, path in files:
+            if size <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            size -= file_size
+            evicted += 1
+        self._size = size
+        CACHE_EVICTIONS.labels(self.name).inc(evicted)
+        logger.info(f"Evicted {evicted} entries from the {self.name} cache")
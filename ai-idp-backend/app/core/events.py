@@ -0,0 +1,116 @@
+"""
+Document status fan-out for streaming clients
+"""
+from typing import Callable, Iterable, Optional
+import asyncio
+import logging
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.metrics import STATUS_STREAM_SUBSCRIBERS
+
+logger = logging.getLogger(__name__)
+
+
+def _database_states(document_ids: list[int]) -> dict[int, dict]:
+    from app.db.session import SessionLocal
+    from app.services.document_service import document_states
+
+    db = SessionLocal()
+    try:
+        return document_states(db, document_ids)
+    finally:
+        db.close()
+
+
+class Subscription:
+    """Status updates for a set of documents; only the latest state per document is kept"""
+
+    def __init__(self, document_ids: Iterable[int]):
+        self.document_ids = set(document_ids)
+        self._pending: dict[int, dict] = {}
+        self._ready = asyncio.Event()
+
+    def push(self, state: dict) -> None:
+        self._pending[state["document_id"]] = state
+        self._ready.set()
+
+    async def next(self, timeout: float) -> list[dict]:
+        """States changed since the last call; [] if nothing changed within timeout seconds"""
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return []
+        self._ready.clear()
+        states = list(self._pending.values())
+        self._pending.clear()
+        return states
+
+
+class StatusBroker:
+    """
+    Pushes document status changes to every subscription watching them.
+
+    The workers run in other processes, so changes are found by polling:
+    while anyone is subscribed, a single task per API process reads the
+    state of every watched document with one query each interval and
+    publishes the ones that changed. The cost is one query per interval
+    however many clients are connected, instead of one request per client.
+    A slow client never holds up the others: it only sees the latest
+    state of each document when it catches up.
+
+    Used from the event loop only; fetch runs in the threadpool.
+    """
+
+    def __init__(self, interval: float, fetch: Callable[[list[int]], dict[int, dict]] = _database_states):
+        self.interval = interval
+        self.fetch = fetch
+        self._subscriptions: set[Subscription] = set()
+        self._last: dict[int, dict] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self, document_ids: Iterable[int], known: dict[int, dict] = None) -> Subscription:
+        """Watch document_ids; known holds the states the client already has"""
+        subscription = Subscription(document_ids)
+        for document_id, state in (known or {}).items():
+            self._last.setdefault(document_id, state)
+        self._subscriptions.add(subscription)
+        STATUS_STREAM_SUBSCRIBERS.set(len(self._subscriptions))
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._poll())
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscriptions.discard(subscription)
+        STATUS_STREAM_SUBSCRIBERS.set(len(self._subscriptions))
+
+    def publish(self, states: dict[int, dict]) -> None:
+        """Hand the states that changed to the subscriptions watching them"""
+        changed = {}
+        for document_id, state in states.items():
+            if self._last.get(document_id) != state:
+                self._last[document_id] = state
+                changed[document_id] = state
+        if not changed:
+            return
+        for subscription in self._subscriptions:
+            for document_id in subscription.document_ids & changed.keys():
+                subscription.push(changed[document_id])
+
+    async def _poll(self) -> None:
+        while self._subscriptions:
+            watched = set().union(*(subscription.document_ids for subscription in self._subscriptions))
+            # Forget documents nobody watches any more
+            for document_id in self._last.keys() - watched:
+                del self._last[document_id]
+            try:
+                self.publish(await run_in_threadpool(self.fetch, sorted(watched)))
+            except Exception as e:
+                logger.warning(f"Could not read document statuses for {len(watched)} watched documents: {e}")
+            await asyncio.sleep(self.interval)
+        self._last.clear()
+
+
+# One per API process
+status_broker = StatusBroker(settings.STATUS_POLL_INTERVAL_MS / 1000)
@@ -1,5 +1,10 @@
 import uuid
 from fastapi import Request
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+
+from app.metrics import ADMISSION_REJECTIONS
 
 import time
 import logging
@@ -28,4 +33,108 @@ async def add_timing(request: Request, call_next):
         f"took {duration:.3f}s"
     )
 
-    return response
\ No newline at end of file
+    return response
+
+
+class BodySizeLimitMiddleware:
+    """
+    Reject request bodies over max_bytes with 413 on the given path prefixes.
+
+    A Content-Length over the limit is refused before any body is read.
+    Otherwise (chunked transfer, or a lying header) the body is counted as
+    it arrives, and the read that crosses the limit raises a 413
+    HTTPException. FastAPI re-raises it from body parsing, so the request
+    is cut off right there.
+    """
+
+    def __init__(self, app, max_bytes: int, paths: tuple):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.paths = tuple(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.paths):
+            return await self.app(scope, receive, send)
+
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length and content_length.isdigit() and int(content_length) > self.max_bytes:
+            response = JSONResponse({"detail": "Request body too large"}, status_code=413)
+            return await response(scope, receive, send)
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    logger.warning(f"{scope['path']}: request body over {self.max_bytes} bytes, aborted")
+                    raise HTTPException(status_code=413, detail="Request body too large")
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+class AdmissionControlMiddleware:
+    """
+    Turn uploads away before their body is read when the node is saturated.
+
+    limits maps a path prefix to (max queued jobs, bytes reserved when the
+    request has no Content-Length, job priority classes counted towards the
+    backlog or None for all). A backlog over the limit gets 503, an
+    exhausted in-flight byte budget gets 429; both carry a Retry-After
+    computed by the AdmissionController from measured drain rates.
+    """
+
+    def __init__(self, app, controller, limits: dict):
+        self.app = app
+        self.controller = controller
+        self.limits = limits
+
+    def _limits_for(self, path: str):
+        for prefix, limits in self.limits.items():
+            if path.startswith(prefix):
+                return limits
+        return None
+
+    async def _reject(self, scope, receive, send, status_code: int, reason: str, retry_after: int):
+        ADMISSION_REJECTIONS.labels(reason).inc()
+        logger.warning(f"{scope['path']}: upload rejected ({reason}), retry after {retry_after}s")
+        response = JSONResponse(
+            {"detail": "Server is busy, retry later", "reason": reason, "retry_after": retry_after},
+            status_code=status_code,
+            headers={"Retry-After": str(retry_after)},
+        )
+        await response(scope, receive, send)
+
+    async def __call__(self, scope, receive, send):
+        limits = self._limits_for(scope["path"]) if scope["type"] == "http" and scope["method"] == "POST" else None
+        if limits is None:
+            return await self.app(scope, receive, send)
+        max_queued, default_bytes, priorities = limits
+
+        # The backlog query is cached, but may hit the database: keep it off the event loop
+        retry_after = await run_in_threadpool(self.controller.check_backlog, max_queued, priorities)
+        if retry_after is not None:
+            return await self._reject(scope, receive, send, 503, "backlog", retry_after)
+
+        content_length = dict(scope["headers"]).get(b"content-length")
+        reserved = int(content_length) if content_length and content_length.isdigit() else default_bytes
+        retry_after = self.controller.reserve(reserved)
+        if retry_after is not None:
+            return await self._reject(scope, receive, send, 429, "upload_bytes", retry_after)
+
+        received = 0
+
+        async def counted_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+            return message
+
+        try:
+            await self.app(scope, counted_receive, send)
+        finally:
+            self.controller.release(reserved, received)
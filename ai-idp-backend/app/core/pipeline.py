@@ -0,0 +1,118 @@
+"""
+Staged processing with bounded queues between the stages
+"""
+from typing import Any, Callable, NamedTuple
+import logging
+import queue
+import threading
+import time
+
+from app.metrics import PIPELINE_BUSY_WORKERS, PIPELINE_ITEMS, PIPELINE_QUEUE_DEPTH, PIPELINE_STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class Stage(NamedTuple):
+    name: str
+    handler: Callable[[Any], None]
+    workers: int  # threads running the handler
+
+
+class Pipeline:
+    """
+    Runs items through a fixed sequence of stages.
+
+    Every stage has its own worker threads and an input queue holding at
+    most queue_size items. A stage that falls behind therefore blocks the
+    stage in front of it, and finally submit(), instead of letting work
+    pile up in memory. Handlers update the item in place. When a handler
+    raises, on_error(item, exc) is called and the item still moves on, so
+    later stages can record the failure; on_done(item) is called after the
+    last stage.
+
+    Queue depth, busy workers, time per item and processed items are
+    exported per stage.
+    """
+
+    def __init__(
+        self,
+        stages: list[Stage],
+        queue_size: int,
+        on_done: Callable[[Any], None] = None,
+        on_error: Callable[[Any, Exception], None] = None,
+    ):
+        self.stages = stages
+        self.on_done = on_done
+        self.on_error = on_error
+        self._queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+        self._threads: list[list[threading.Thread]] = []
+
+    def start(self) -> None:
+        for index, stage in enumerate(self.stages):
+            self._threads.append([
+                threading.Thread(
+                    target=self._run_stage, args=(index,), name=f"{stage.name}-{n}", daemon=True
+                )
+                for n in range(stage.workers)
+            ])
+            for thread in self._threads[-1]:
+                thread.start()
+
+    def submit(self, item: Any, timeout: float = None) -> bool:
+        """Queue an item for the first stage; False if it stayed full for timeout seconds"""
+        try:
+            self._put(0, item, timeout)
+        except queue.Full:
+            return False
+        return True
+
+    def close(self) -> None:
+        """Let every queued item finish, then stop the stage threads"""
+        for index, threads in enumerate(self._threads):
+            # Earlier stages are drained first, so the stop markers trail every item
+            for _ in threads:
+                self._queues[index].put(_STOP)
+            for thread in threads:
+                thread.join()
+        self._threads = []
+
+    def _put(self, index: int, item: Any, timeout: float = None) -> None:
+        self._queues[index].put(item, timeout=timeout)
+        PIPELINE_QUEUE_DEPTH.labels(self.stages[index].name).set(self._queues[index].qsize())
+
+    def _run_stage(self, index: int) -> None:
+        stage = self.stages[index]
+        while True:
+            item = self._queues[index].get()
+            PIPELINE_QUEUE_DEPTH.labels(stage.name).set(self._queues[index].qsize())
+            if item is _STOP:
+                return
+
+            PIPELINE_BUSY_WORKERS.labels(stage.name).inc()
+            start = time.perf_counter()
+            outcome = "ok"
+            try:
+                stage.handler(item)
+            except Exception as e:
+                outcome = "error"
+                logger.exception(f"Stage {stage.name} failed: {e}")
+                self._call(self.on_error, item, e)
+            finally:
+                PIPELINE_STAGE_SECONDS.labels(stage.name).observe(time.perf_counter() - start)
+                PIPELINE_ITEMS.labels(stage.name, outcome).inc()
+                PIPELINE_BUSY_WORKERS.labels(stage.name).dec()
+
+            if index + 1 < len(self.stages):
+                self._put(index + 1, item)
+            else:
+                self._call(self.on_done, item)
+
+    def _call(self, callback: Callable, *args) -> None:
+        if callback is None:
+            return
+        try:
+            callback(*args)
+        except Exception as e:
+            logger.exception(f"Pipeline callback {callback.__name__} failed: {e}")
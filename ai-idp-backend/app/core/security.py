@@ -17,7 +17,8 @@ def hash_password(password: str) -> str:
 def verify_password(password: str, hashed: str) -> bool:
     return pwd_context.verify(password, hashed)
 
-def create_access_token(subject: str, expires_delta: timedelta = None) -> str:
+def create_access_token(subject: str, expires_delta: timedelta = None, scope: str = None) -> str:
+    """JWT for subject; a scoped token is only accepted where that scope is required"""
     if expires_delta:
         expire = datetime.now(timezone.utc) + expires_delta
     else:
@@ -28,6 +29,8 @@ def create_access_token(subject: str, expires_delta: timedelta = None) -> str:
         "sub": subject,
         "exp": expire,
     }
+    if scope:
+        payload["scope"] = scope
     return jwt.encode(
         payload,
         settings.JWT_SECRET_KEY,
@@ -1,15 +1,156 @@
-from pathlib import Path
+from pathlib import Path, PurePosixPath
+from typing import BinaryIO, Iterator, NamedTuple, Optional
+import hashlib
+import mmap
+import os
+import re
+import tarfile
 import uuid
+import zipfile
 
 UPLOAD_DIR = Path("uploads")
 UPLOAD_DIR.mkdir(exist_ok=True)
 
-def save_file(file_bytes: bytes, filename: str) -> str:
-    ext = filename.split(".")[-1]
-    unique_name = f"{uuid.uuid4()}.{ext}"
-    path = UPLOAD_DIR / unique_name
+CHUNK_SIZE = 1024 * 1024
 
-    with open(path, "wb") as f:
-        f.write(file_bytes)
+# Leading bytes of each accepted file type
+MAGIC_BYTES = {
+    b"%PDF-": "application/pdf",
+    b"\x89PNG\r\n\x1a\n": "image/png",
+    b"\xff\xd8\xff": "image/jpeg",
+}
+EXTENSIONS = {"application/pdf": "pdf", "image/png": "png", "image/jpeg": "jpg"}
 
-    return str(path)
+
+ZIP = "zip"
+TAR = "tar"
+# Leading bytes of accepted archives; compressed tars are recognised by their compression
+ARCHIVE_MAGIC_BYTES = {
+    b"PK\x03\x04": ZIP,
+    b"\x1f\x8b": TAR,  # gzip
+    b"BZh": TAR,
+    b"\xfd7zXZ\x00": TAR,  # xz
+}
+TAR_MAGIC_OFFSET = 257  # "ustar" in the first header block
+
+# Page objects of a PDF (not the /Pages tree nodes)
+PDF_PAGE_PATTERN = re.compile(rb"/Type\s*/Page(?![A-Za-z])")
+
+
+class FileTooLargeError(ValueError):
+    pass
+
+
+class StoredFile(NamedTuple):
+    path: str
+    content_hash: str  # sha256 hex digest
+    size: int
+    content_type: str  # from the magic bytes, not the client
+    page_count: Optional[int] = None  # estimate; None when unknown
+
+
+def sniff_content_type(head: bytes) -> Optional[str]:
+    for magic, content_type in MAGIC_BYTES.items():
+        if head.startswith(magic):
+            return content_type
+    return None
+
+
+def save_stream(stream: BinaryIO, max_bytes: int, chunk_size: int = CHUNK_SIZE) -> StoredFile:
+    """
+    Copy an upload into storage in fixed-size chunks.
+
+    The type is sniffed from the first chunk, the sha256 is computed on the
+    way, and the copy stops as soon as max_bytes is crossed. The file is
+    written to a temp file and renamed to uploads/<hash[:2]>/<hash>.<ext>,
+    so identical uploads share one file and readers never see a partial one.
+    Blocking: call it off the event loop.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    content_type = None
+    tmp_path = UPLOAD_DIR / f".{uuid.uuid4()}.tmp"
+    try:
+        with open(tmp_path, "wb") as out:
+            while chunk := stream.read(chunk_size):
+                if content_type is None:
+                    content_type = sniff_content_type(chunk)
+                    if content_type is None:
+                        raise ValueError("Unsupported file type")
+                size += len(chunk)
+                if size > max_bytes:
+                    raise FileTooLargeError("File too large")
+                digest.update(chunk)
+                out.write(chunk)
+        if content_type is None:
+            raise ValueError("Empty file")
+
+        content_hash = digest.hexdigest()
+        path = UPLOAD_DIR / content_hash[:2] / f"{content_hash}.{EXTENSIONS[content_type]}"
+        if path.exists():
+            tmp_path.unlink()
+        else:
+            path.parent.mkdir(exist_ok=True)
+            os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+    return StoredFile(str(path), content_hash, size, content_type, count_pages(path, content_type))
+
+
+def count_pages(path, content_type: str) -> Optional[int]:
+    """
+    Cheap page count for scheduling: page objects in a PDF, scanned from a
+    memory map. PDFs that keep their pages in compressed object streams
+    show none, so those return None.
+    """
+    if content_type != "application/pdf":
+        return 1
+    try:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return sum(1 for _ in PDF_PAGE_PATTERN.finditer(data)) or None
+    except (OSError, ValueError):
+        return None
+
+
+def sniff_archive_type(stream: BinaryIO) -> Optional[str]:
+    """ZIP, TAR or None for a seekable stream, which is left at its start"""
+    head = stream.read(TAR_MAGIC_OFFSET + 8)
+    stream.seek(0)
+    for magic, kind in ARCHIVE_MAGIC_BYTES.items():
+        if head.startswith(magic):
+            return kind
+    if head[TAR_MAGIC_OFFSET:TAR_MAGIC_OFFSET + 5] == b"ustar":
+        return TAR
+    return None
+
+
+def _skip_entry(name: str) -> bool:
+    # Directories are skipped by the callers; this drops OS metadata such as __MACOSX/ and ._files
+    path = PurePosixPath(name)
+    return any(part.startswith(".") or part == "__MACOSX" for part in path.parts)
+
+
+def iter_archive(stream: BinaryIO, kind: str) -> Iterator[tuple[str, BinaryIO]]:
+    """
+    (name, file object) for every regular file in a zip or tar archive.
+
+    Entries are decompressed while they are read, so pass them to
+    save_stream() to keep memory flat and stop oversized entries early
+    (decompression bombs included). Tars are read sequentially, so each
+    file object is only valid until the next entry is requested.
+    """
+    if kind == ZIP:
+        with zipfile.ZipFile(stream) as archive:
+            for info in archive.infolist():
+                if info.is_dir() or _skip_entry(info.filename):
+                    continue
+                with archive.open(info) as entry:
+                    yield info.filename, entry
+    else:
+        with tarfile.open(fileobj=stream, mode="r|*") as archive:
+            for member in archive:
+                if not member.isfile() or _skip_entry(member.name):
+                    continue
+                yield member.name, archive.extractfile(member)
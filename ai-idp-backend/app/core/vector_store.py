@@ -1,30 +1,721 @@
 import faiss
+import fcntl
+import json
+import logging
 import os
-import pickle
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import NamedTuple
+
+import numpy as np
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
 
 DIMENSION = 384
-BASE_PATH = "app/storage/vector_store"
+BASE_PATH = settings.VECTOR_STORE_PATH
 
 INDEX_PATH = f"{BASE_PATH}/faiss.index"
-MAP_PATH = f"{BASE_PATH}/index_to_doc.pkl"
 
-faiss_index = faiss.IndexFlatIP(DIMENSION)
-index_to_doc_id: list[str] = []
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq")
 
+# Vector ids are (document_id << CHUNK_ID_BITS) | chunk_index, so all chunks
+# of a document form one contiguous id range.
+CHUNK_ID_BITS = 20
+MAX_CHUNKS = 1 << CHUNK_ID_BITS
 
-def save_vector_store():
-    os.makedirs(BASE_PATH, exist_ok=True)
-    faiss.write_index(faiss_index, INDEX_PATH)
+# Bumped when the meaning of stored vector ids changes
+FORMAT_VERSION = 2
+
+SEGMENT_PREFIX = "seg-"
+SEGMENT_SUFFIX = ".npz"
+
+
+class ChunkHit(NamedTuple):
+    document_id: int
+    score: float
+    start: int  # character offsets of the chunk in Document.cleaned_text
+    end: int
+
+
+def chunk_ids(document_id: int, count: int) -> np.ndarray:
+    return (np.int64(document_id) << CHUNK_ID_BITS) + np.arange(count, dtype="int64")
+
+
+def normalize_vectors(vectors) -> np.ndarray:
+    """Return a float32 (n, DIMENSION) copy of vectors scaled to unit length"""
+    vectors = np.array(vectors, dtype="float32").reshape(-1, DIMENSION)
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def _write_atomic(path: str, write) -> None:
+    """Write a file through a temp file + fsync + rename"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def build_index(
+    index_type: str,
+    vectors: np.ndarray,
+    ids: np.ndarray,
+    nlist: int = settings.VECTOR_IVF_NLIST,
+    nprobe: int = settings.VECTOR_IVF_NPROBE,
+    pq_m: int = settings.VECTOR_PQ_M,
+):
+    """
+    Build an ID-mapped inner-product index of the given type over vectors.
+
+    IVF indexes are trained on the vectors themselves; nlist defaults to
+    4 * sqrt(n), capped so every list gets enough training points.
+    """
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown vector index type: {index_type}")
+
+    dimension = vectors.shape[1]
+    if index_type == "flat":
+        index = faiss.IndexFlatIP(dimension)
+    else:
+        n = len(vectors)
+        nlist = nlist or int(4 * np.sqrt(n))
+        nlist = max(1, min(nlist, n // 39))
+        quantizer = faiss.IndexFlatIP(dimension)
+        if index_type == "ivf_flat":
+            index = faiss.IndexIVFFlat(quantizer, dimension, nlist, faiss.METRIC_INNER_PRODUCT)
+        else:
+            index = faiss.IndexIVFPQ(quantizer, dimension, nlist, pq_m, 8, faiss.METRIC_INNER_PRODUCT)
+        index.train(vectors)
+        index.nprobe = nprobe
+
+    id_index = faiss.IndexIDMap2(index)
+    id_index.add_with_ids(vectors, ids)
+    return id_index
+
+
+class VectorStore:
+    """
+    Single FAISS index shared by ingestion and search.
+
+    Vectors are L2-normalized and scored by inner product, so scores are
+    cosine similarities (higher is better). A document is stored as one
+    vector per text chunk, keyed by chunk_ids(document_id, n) together with
+    the chunk's character offsets. Search results are therefore
+    self-describing, and a document can be replaced or removed without
+    touching the rest of the index.
+
+    Persistence is append-only. All mutations go through one writer thread,
+    which applies them to the in-memory index and group-commits them to small
+    delta segment files once VECTOR_COMMIT_INTERVAL_MS has passed or
+    VECTOR_COMMIT_MAX_VECTORS are pending. Every VECTOR_MERGE_SEGMENTS
+    segments, a background thread folds them into the base index file. On
+    load, the base index is read and any newer segments are replayed.
+
+    Several processes (the API and the ingestion workers) can share one
+    store. Segment names are unique per process and sorted by commit time.
+    refresh() applies segments committed by other processes; the API runs it
+    periodically (start_refresh) so searches see new documents. Merges are
+    serialized across processes by a file lock. The manifest lists the
+    segments each merge folded in, so a process that missed one of them
+    reloads the base instead.
+
+    The store starts as an exact flat index. When VECTOR_INDEX_TYPE selects
+    an IVF tier, it promotes itself once it holds VECTOR_ANN_PROMOTE_AT
+    vectors, training the new index on the stored vectors. Promotion runs on
+    the writer thread, so searches keep using the flat index meanwhile.
+
+    Layout under path:
+        faiss.index      base index
+        spans.npz        chunk offsets for the base index
+        manifest.json    {"generation": <merge count>, "merged": [<segments in base>], "format": ...}
+        merge.lock       cross-process merge lock
+        segments/        seg-<time_ns>-<pid>-<n>.npz delta segments
+    """
+
+    def __init__(
+        self,
+        dimension: int = DIMENSION,
+        path: str = BASE_PATH,
+        commit_interval_ms: int = settings.VECTOR_COMMIT_INTERVAL_MS,
+        commit_max_vectors: int = settings.VECTOR_COMMIT_MAX_VECTORS,
+        merge_segments: int = settings.VECTOR_MERGE_SEGMENTS,
+        index_type: str = settings.VECTOR_INDEX_TYPE,
+        promote_at: int = settings.VECTOR_ANN_PROMOTE_AT,
+    ):
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown vector index type: {index_type}")
+
+        self.dimension = dimension
+        self.path = path
+        self.index_path = os.path.join(path, "faiss.index")
+        self.spans_path = os.path.join(path, "spans.npz")
+        self.manifest_path = os.path.join(path, "manifest.json")
+        self.merge_lock_path = os.path.join(path, "merge.lock")
+        self.segment_dir = os.path.join(path, "segments")
+
+        self.commit_interval = commit_interval_ms / 1000
+        self.commit_max_vectors = commit_max_vectors
+        self.merge_segments = merge_segments
+        self.index_type = index_type
+        self.promote_at = promote_at
+
+        self.lock = threading.RLock()
+        self.index = self._new_index()
+        self._spans: dict[int, np.ndarray] = {}  # document_id -> (n, 2) chunk offsets
+        # Moves forward whenever search results may change; keys result caches
+        self.version = 0
+
+        self._ops: queue.Queue = queue.Queue()
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        self._merge_lock = threading.Lock()
+        self._segment_counter = 0
+        self._generation = 0  # manifest generation the in-memory base matches
+        self._segments: set[str] = set()  # segments applied in memory but not in the base
+        self._applied_through = ""  # newest segment name reflected in memory
+        self._refresher = None
+
+    def _new_index(self):
+        return faiss.IndexIDMap2(faiss.IndexFlatIP(self.dimension))
+
+    @property
+    def ntotal(self) -> int:
+        return self.index.ntotal
+
+    @property
+    def is_ann(self) -> bool:
+        return isinstance(faiss.downcast_index(self.index.index), faiss.IndexIVF)
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def add(self, document_id: int, vectors, spans=None, wait: bool = True) -> Future:
+        """
+        Store a document's chunk vectors, replacing any previous ones.
+
+        spans holds the (start, end) character offsets of each chunk.
+        With wait=True, returns once the change is durable on disk.
+        """
+        vectors = normalize_vectors(vectors)
+        if len(vectors) > MAX_CHUNKS:
+            raise ValueError(f"Document {document_id} has more than {MAX_CHUNKS} chunks")
+        if spans is None:
+            spans = np.zeros((len(vectors), 2), dtype="int64")
+        spans = np.asarray(spans, dtype="int64").reshape(len(vectors), 2)
+        return self._submit("add", document_id, (vectors, spans), wait)
+
+    def remove(self, document_id: int, wait: bool = True) -> Future:
+        """Remove a document's vectors"""
+        return self._submit("remove", document_id, None, wait)
+
+    def flush(self) -> None:
+        """Commit everything pending to a segment now"""
+        self._submit("flush", None, None, wait=True)
+
+    def close(self) -> None:
+        """Commit pending changes and stop the writer and refresh threads"""
+        with self._writer_lock:
+            refresher, self._refresher = self._refresher, None
+            writer = self._writer
+            self._writer = None
+        if refresher is not None:
+            refresher.set()
+        if writer is None:
+            return
+        future = Future()
+        self._ops.put(("stop", None, None, future))
+        future.result()
+        writer.join()
+
+    def get(self, document_id: int):
+        """
+        A document's stored (vectors, spans), or (None, None).
+
+        Only the flat index can return exact vectors; an IVF index returns
+        (None, None) and callers re-embed instead.
+        """
+        with self.lock:
+            spans = self._spans.get(document_id)
+            if spans is None or self.is_ann:
+                return None, None
+            ids = chunk_ids(document_id, len(spans))
+            vectors = np.vstack([self.index.reconstruct(int(vector_id)) for vector_id in ids])
+            return vectors, spans.copy()
+
+    def search(self, query_vector, k: int, nprobe: int = None) -> list[ChunkHit]:
+        """
+        Return up to k best-matching chunks, best match first.
+
+        nprobe overrides how many IVF lists are scanned for this query; it is
+        ignored while the store is still flat.
+        """
+        query = normalize_vectors(query_vector)[:1]
+
+        with self.lock:
+            if self.index.ntotal == 0:
+                return []
+            params = None
+            if nprobe and self.is_ann:
+                params = faiss.SearchParametersIVF(nprobe=nprobe)
+            scores, ids = self.index.search(query, min(k, self.index.ntotal), params=params)
+
+            hits = []
+            for score, vector_id in zip(scores[0], ids[0]):
+                if vector_id == -1:
+                    continue
+                document_id = int(vector_id) >> CHUNK_ID_BITS
+                spans = self._spans.get(document_id)
+                chunk = int(vector_id) & (MAX_CHUNKS - 1)
+                start, end = spans[chunk] if spans is not None and chunk < len(spans) else (0, 0)
+                hits.append(ChunkHit(document_id, float(score), int(start), int(end)))
+        return hits
+
+    def load(self) -> None:
+        """Load the base index and replay segments committed after it"""
+        self._load_state()
+        if self._maybe_promote():
+            self._start_merge()
 
-    with open(MAP_PATH, "wb") as f:
-        pickle.dump(index_to_doc_id, f)
+    def refresh(self) -> int:
+        """Apply segments committed by other processes; returns how many were applied"""
+        applied = self._refresh()
+        if applied is None:
+            # A merge folded in segments this process never saw
+            self._submit("reload", None, None, wait=True)
+            return 0
+        return applied
 
-def load_vector_store():
-    global faiss_index, index_to_doc_id
+    def start_refresh(self, interval_ms: int = settings.VECTOR_REFRESH_INTERVAL_MS) -> None:
+        """Run refresh() every interval_ms on a background thread"""
+        if interval_ms <= 0:
+            return
+        with self._writer_lock:
+            if self._refresher is not None:
+                return
+            stop = self._refresher = threading.Event()
+
+        def run():
+            while not stop.wait(interval_ms / 1000):
+                try:
+                    self.refresh()
+                except Exception as e:
+                    logger.error(f"Vector store refresh failed: {e}", exc_info=True)
+
+        threading.Thread(target=run, name="vector-store-refresh", daemon=True).start()
+
+    # ------------------------------------------------------------------
+    # Loading and tailing
+    # ------------------------------------------------------------------
+
+    def _read_manifest(self) -> dict:
+        if not os.path.exists(self.manifest_path):
+            return {}
+        with open(self.manifest_path) as f:
+            return json.load(f)
+
+    def _load_state(self) -> None:
+        manifest = self._read_manifest()
+        merged = set(manifest.get("merged", ()))
+        # Stores written before segments were named per process
+        legacy_merged_through = manifest.get("merged_through", 0)
+
+        index = self._new_index()
+        spans = {}
+        if os.path.exists(self.index_path):
+            base = faiss.read_index(self.index_path)
+            if not isinstance(base, faiss.IndexIDMap) or base.d != self.dimension:
+                logger.warning(
+                    "Ignoring vector store at %s: not an ID-mapped %d-d index",
+                    self.index_path, self.dimension
+                )
+            elif base.ntotal and manifest.get("format") != FORMAT_VERSION:
+                # Older stores keyed vectors by Document.id instead of chunk id;
+                # those documents need to be re-embedded.
+                logger.warning(f"Ignoring vector store at {self.index_path}: outdated id format")
+            else:
+                index = base
+                spans = self._read_spans()
+
+        replayed = set()
+        for name in self._list_segments():
+            legacy_seq = name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]
+            if name in merged or (legacy_seq.isdigit() and int(legacy_seq) <= legacy_merged_through):
+                # Already folded into the base; left over from an interrupted merge
+                self._remove_segment(name)
+                continue
+            segment = self._read_segment(name)
+            if segment is None:
+                continue
+            self._apply_segment(index, spans, segment)
+            replayed.add(name)
+
+        with self.lock:
+            self.index = index
+            self._spans = spans
+            self._segments = replayed
+            self._applied_through = max([*replayed, *merged], default="")
+            self._generation = manifest.get("generation", 0)
+            self.version += 1
+
+        logger.info(
+            f"Vector store loaded with {index.ntotal} vectors "
+            f"({len(replayed)} segments replayed)"
+        )
+
+    def _refresh(self):
+        """
+        Apply new segments from other processes. Returns the number applied,
+        or None when the in-memory state is out of date and needs a reload.
+
+        Segment names sort in commit order, so a new segment older than one
+        already applied cannot go on top of the live index: replaying it would
+        let its stale vectors win. That also needs a reload, which replays the
+        base and every segment in order.
+        """
+        manifest = self._read_manifest()
+        generation = manifest.get("generation", 0)
+        merged = set(manifest.get("merged", ()))
+        with self.lock:
+            if generation != self._generation:
+                if generation != self._generation + 1 or not merged <= self._segments:
+                    return None
+                # The merge only folded in segments already applied here
+                self._segments -= merged
+                self._generation = generation
+
+        new = [name for name in self._list_segments() if name not in self._segments and name not in merged]
+        with self.lock:
+            if new and new[0] < self._applied_through:
+                return None
+
+        applied = 0
+        for name in new:
+            segment = self._read_segment(name)
+            if segment is None:
+                continue  # merged and deleted meanwhile; the next refresh reloads
+            with self.lock:
+                if name in self._segments:
+                    continue
+                self._apply_segment(self.index, self._spans, segment)
+                self._segments.add(name)
+                self._applied_through = max(self._applied_through, name)
+                self.version += 1
+            applied += 1
+        if applied:
+            logger.debug(f"Applied {applied} vector segments from other processes")
+        return applied
+
+    # ------------------------------------------------------------------
+    # Writer thread
+    # ------------------------------------------------------------------
+
+    def _submit(self, kind: str, document_id, payload, wait: bool) -> Future:
+        self._ensure_writer()
+        future = Future()
+        self._ops.put((kind, document_id, payload, future))
+        if wait:
+            future.result()
+        return future
+
+    def _ensure_writer(self) -> None:
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(
+                    target=self._run_writer, name="vector-store-writer", daemon=True
+                )
+                self._writer.start()
+
+    def _run_writer(self) -> None:
+        pending: dict[int, tuple | None] = {}
+        # Changes to stored documents, applied together at commit time
+        replacements: dict[int, tuple | None] = {}
+        pending_count = 0
+        waiters: list[Future] = []
+        deadline = None
+
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                kind, document_id, payload, future = self._ops.get(timeout=timeout)
+            except queue.Empty:
+                kind, future = "flush", None
+
+            if kind in ("add", "remove"):
+                try:
+                    with self.lock:
+                        if document_id in self._spans:
+                            # Removing vectors compacts the whole index, so replacements
+                            # and removals wait for the commit and share one pass
+                            replacements[document_id] = payload
+                        elif payload is not None:
+                            # First ingest, the common case: nothing to remove
+                            vectors, spans = payload
+                            self.index.add_with_ids(vectors, chunk_ids(document_id, len(vectors)))
+                            self._spans[document_id] = spans
+                            self.version += 1
+                except Exception as e:
+                    logger.error(f"Vector store update failed for document {document_id}: {e}")
+                    future.set_exception(e)
+                    continue
+                # Every op replaces the document, so only its latest state matters
+                pending[document_id] = payload
+                pending_count += len(payload[0]) if payload is not None else 1
+                waiters.append(future)
+                if deadline is None:
+                    deadline = time.monotonic() + self.commit_interval
+                if pending_count < self.commit_max_vectors and time.monotonic() < deadline:
+                    continue
+
+            error = None
+            if replacements:
+                try:
+                    self._apply_replacements(replacements)
+                except Exception as e:
+                    logger.error(f"Vector store update failed for documents {sorted(replacements)}: {e}")
+                    error = e
+            if pending and error is None:
+                try:
+                    self._commit_segment(pending)
+                except Exception as e:
+                    logger.error(f"Vector store segment commit failed: {e}", exc_info=True)
+                    error = e
+            if kind == "reload" and error is None:
+                # Pending changes are committed, so nothing in memory is lost
+                try:
+                    self._load_state()
+                except Exception as e:
+                    logger.error(f"Vector store reload failed: {e}", exc_info=True)
+                    error = e
+            if future is not None and kind not in ("add", "remove"):
+                waiters.append(future)
+            for waiter in waiters:
+                if error is None:
+                    waiter.set_result(None)
+                else:
+                    waiter.set_exception(error)
+
+            pending, replacements, pending_count, waiters, deadline = {}, {}, 0, [], None
+
+            promoted = error is None and self._maybe_promote()
+            if promoted or (error is None and len(self._segments) >= self.merge_segments):
+                self._start_merge()
+            if kind == "stop":
+                return
+
+    def _apply_replacements(self, replacements: dict) -> None:
+        """Replace or remove stored documents with a single removal pass"""
+        with self.lock:
+            self._remove_documents(self.index, self._spans, replacements)
+            added = [(doc_id, payload) for doc_id, payload in replacements.items() if payload is not None]
+            if added:
+                self.index.add_with_ids(
+                    np.concatenate([vectors for _, (vectors, _) in added]),
+                    np.concatenate([chunk_ids(doc_id, len(vectors)) for doc_id, (vectors, _) in added]),
+                )
+                for doc_id, (_, spans) in added:
+                    self._spans[doc_id] = spans
+            self.version += 1
+
+    @staticmethod
+    def _remove_documents(index, spans: dict, document_ids) -> None:
+        """Drop the stored vectors of several documents; one compaction of the index"""
+        stored = [int(doc_id) for doc_id in document_ids if int(doc_id) in spans]
+        if not stored:
+            return
+        index.remove_ids(np.concatenate([chunk_ids(doc_id, len(spans[doc_id])) for doc_id in stored]))
+        for doc_id in stored:
+            del spans[doc_id]
+
+    def _commit_segment(self, pending: dict) -> None:
+        remove_docs = np.fromiter(pending.keys(), dtype="int64", count=len(pending))
+        added = [(doc_id, payload) for doc_id, payload in pending.items() if payload is not None]
+        if added:
+            add_ids = np.concatenate([chunk_ids(doc_id, len(v)) for doc_id, (v, _) in added])
+            vectors = np.concatenate([v for _, (v, _) in added])
+            spans = np.concatenate([s for _, (_, s) in added])
+        else:
+            add_ids = np.empty(0, dtype="int64")
+            vectors = np.empty((0, self.dimension), dtype="float32")
+            spans = np.empty((0, 2), dtype="int64")
+
+        os.makedirs(self.segment_dir, exist_ok=True)
+        self._segment_counter += 1
+        name = f"{SEGMENT_PREFIX}{time.time_ns():020d}-{os.getpid()}-{self._segment_counter}{SEGMENT_SUFFIX}"
+        with self.lock:
+            # Claimed before the file exists, so refresh() never replays our own write
+            self._segments.add(name)
+            self._applied_through = max(self._applied_through, name)
+        try:
+            _write_atomic(
+                os.path.join(self.segment_dir, name),
+                lambda f: np.savez(f, remove_docs=remove_docs, add_ids=add_ids, vectors=vectors, spans=spans),
+            )
+        except BaseException:
+            with self.lock:
+                self._segments.discard(name)
+            raise
+        logger.debug(f"Committed vector segment {name} ({len(pending)} documents)")
+
+    @staticmethod
+    def _apply_segment(index, spans: dict, segment) -> None:
+        VectorStore._remove_documents(index, spans, segment["remove_docs"])
+
+        add_ids = segment["add_ids"]
+        if not len(add_ids):
+            return
+        index.add_with_ids(segment["vectors"], add_ids)
+        doc_ids = add_ids >> CHUNK_ID_BITS
+        boundaries = np.flatnonzero(np.diff(doc_ids)) + 1
+        for ids, doc_spans in zip(np.split(doc_ids, boundaries), np.split(segment["spans"], boundaries)):
+            spans[int(ids[0])] = doc_spans
+
+    def _read_segment(self, name: str):
+        """A segment's arrays, or None if it is gone or outdated"""
+        try:
+            with np.load(os.path.join(self.segment_dir, name)) as data:
+                if "spans" not in data.files:
+                    logger.warning(f"Skipping vector segment {name}: outdated id format")
+                    return None
+                return {key: data[key] for key in data.files}
+        except FileNotFoundError:
+            return None
+
+    def _read_spans(self) -> dict[int, np.ndarray]:
+        if not os.path.exists(self.spans_path):
+            return {}
+        with np.load(self.spans_path) as data:
+            split = np.split(data["spans"], np.cumsum(data["counts"])[:-1])
+            return dict(zip(data["doc_ids"].tolist(), split))
+
+    def _maybe_promote(self) -> bool:
+        """Swap the flat index for the configured ANN index once it is big enough"""
+        if self.index_type == "flat" or self.is_ann or self.ntotal < self.promote_at:
+            return False
+
+        start = time.time()
+        with self.lock:
+            flat = faiss.downcast_index(self.index.index)
+            vectors = flat.reconstruct_n(0, self.index.ntotal)
+            ids = faiss.vector_to_array(self.index.id_map).copy()
+
+        # Only the writer thread mutates the index, so nothing changes while
+        # the new index trains; searches keep hitting the flat index.
+        ann_index = build_index(self.index_type, vectors, ids)
+
+        with self.lock:
+            self.index = ann_index
+            self.version += 1
+        logger.info(
+            f"Promoted vector store to {self.index_type} with {len(ids)} vectors "
+            f"in {time.time() - start:.2f}s"
+        )
+        return True
+
+    # ------------------------------------------------------------------
+    # Background merge
+    # ------------------------------------------------------------------
+
+    def _start_merge(self) -> None:
+        if not self._merge_lock.acquire(blocking=False):
+            return  # a merge is already running in this process
+        os.makedirs(self.path, exist_ok=True)
+        lock_file = open(self.merge_lock_path, "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            # Another process is merging; its manifest is picked up on refresh
+            lock_file.close()
+            self._merge_lock.release()
+            return
+
+        try:
+            # The merged base must hold every segment it claims, including
+            # those committed by other processes. Older ones cannot be stacked
+            # on our newer writes, so those force a replay in commit order.
+            if self._refresh() is None:
+                self._load_state()
+                self._maybe_promote()
+            # Called from the writer right after a commit, so the snapshot holds
+            # exactly the segments listed in self._segments
+            with self.lock:
+                data = faiss.serialize_index(self.index)
+                spans = dict(self._spans)
+                merged = sorted(self._segments)
+                generation = self._generation
+        except BaseException:
+            lock_file.close()
+            self._merge_lock.release()
+            raise
+        threading.Thread(
+            target=self._merge,
+            args=(data, spans, merged, generation, lock_file),
+            name="vector-store-merge",
+            daemon=True,
+        ).start()
+
+    def _merge(self, data: np.ndarray, spans: dict, merged: list[str], generation: int, lock_file) -> None:
+        manifest = {"generation": generation + 1, "merged": merged, "format": FORMAT_VERSION}
+        try:
+            # Segments of the previous merge that an interrupted run left behind
+            leftovers = set(self._read_manifest().get("merged", ())) - set(merged)
+            _write_atomic(self.index_path, lambda f: f.write(data.tobytes()))
+            _write_atomic(
+                self.spans_path,
+                lambda f: np.savez(
+                    f,
+                    doc_ids=np.fromiter(spans.keys(), dtype="int64", count=len(spans)),
+                    counts=np.array([len(s) for s in spans.values()], dtype="int64"),
+                    spans=np.concatenate([*spans.values(), np.empty((0, 2), dtype="int64")]),
+                ),
+            )
+            _write_atomic(self.manifest_path, lambda f: f.write(json.dumps(manifest).encode()))
+            for name in [*merged, *leftovers]:
+                self._remove_segment(name)
+            with self.lock:
+                if self._generation == generation:
+                    self._generation = generation + 1
+                self._segments -= set(merged)
+            logger.info(f"Merged {len(merged)} vector segments into the base index")
+        except Exception as e:
+            logger.error(f"Vector store merge failed: {e}", exc_info=True)
+        finally:
+            lock_file.close()  # releases the flock
+            self._merge_lock.release()
+
+    def _remove_segment(self, name: str) -> None:
+        try:
+            os.remove(os.path.join(self.segment_dir, name))
+        except FileNotFoundError:
+            pass
+
+    def _list_segments(self) -> list[str]:
+        if not os.path.isdir(self.segment_dir):
+            return []
+        return sorted(
+            name
+            for name in os.listdir(self.segment_dir)
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX)
+        )
+
+
+# Global vector store instance
+vector_store = VectorStore()
+
+
+def save_vector_store():
+    """Commit pending vectors and stop the writer (call on shutdown)"""
+    vector_store.close()
 
-    if os.path.exists(INDEX_PATH):
-        faiss_index = faiss.read_index(INDEX_PATH)
 
-    if os.path.exists(MAP_PATH):
-        with open(MAP_PATH, "rb") as f:
-            index_to_doc_id = pickle.load(f)
+def load_vector_store(refresh: bool = True):
+    """Load the store; with refresh, keep applying segments written by worker processes"""
+    vector_store.load()
+    if refresh:
+        vector_store.start_refresh()
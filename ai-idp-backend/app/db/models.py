@@ -1,7 +1,13 @@
-from sqlalchemy import JSON, Column, Integer, String, Boolean , DateTime, ForeignKey ,Text
+from datetime import datetime, timezone
+
+from sqlalchemy import JSON, BigInteger, Column, Integer, String, Boolean , DateTime, ForeignKey ,Text, Index, UniqueConstraint
+from sqlalchemy.orm import deferred
 from sqlalchemy.sql import func
 from app.db.base import Base
 
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
 class User(Base):
     __tablename__ = "users"
 
@@ -20,10 +26,60 @@ class Document(Base):
     filename = Column(String, nullable=False)
     content_type = Column(String, nullable=False)
     storage_path = Column(String, nullable=False)
+    content_hash = Column(String(64), nullable=True, index=True)  # sha256 of the uploaded bytes
+    size_bytes = Column(BigInteger, nullable=True)
+    page_count = Column(Integer, nullable=True)  # estimated at upload, exact after extraction
 
     status = Column(String, default="uploaded")
-    raw_text = Column(Text, nullable=True)
-    cleaned_text = Column(Text, nullable=True)
+    # Loaded together on first access only: listings and status reads never need them
+    raw_text = deferred(Column(Text, nullable=True), group="text")
+    cleaned_text = deferred(Column(Text, nullable=True), group="text")
     embedding_status = Column(String, default="pending")
     classification = Column(JSON, nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
+    extraction_stats = Column(JSON, nullable=True)  # pages per extraction path (text layer / OCR)
+    stages = Column(JSON, nullable=True)  # checkpoint per ingestion stage: status, model, finished_at
+    # Set in Python so SQLite stores it in the same text format as bound
+    # cursor values ('... HH:MM:SS.ffffff'); its server default has no fraction
+    created_at = Column(DateTime(timezone=True), default=_utcnow, server_default=func.now())
+
+    __table_args__ = (
+        # Keyset pagination of an owner's documents, newest first, optionally by status
+        Index("ix_documents_owner_created_id", "owner_id", "created_at", "id"),
+        Index("ix_documents_owner_status_created_id", "owner_id", "status", "created_at", "id"),
+    )
+
+class DocumentPage(Base):
+    """Extracted text of one page, kept so later stages can re-run without OCR"""
+    __tablename__ = "document_pages"
+
+    id = Column(Integer, primary_key=True, index=True)
+    document_id = Column(Integer, ForeignKey("documents.id"), nullable=False, index=True)
+    page_number = Column(Integer, nullable=False)  # 1-based
+    text = Column(Text, nullable=False)
+    method = Column(String, nullable=False)  # text_layer or ocr
+
+    __table_args__ = (UniqueConstraint("document_id", "page_number", name="uq_document_pages_page"),)
+
+class Job(Base):
+    """Durable unit of background work, claimed by one worker at a time under a lease"""
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    document_id = Column(Integer, ForeignKey("documents.id"), nullable=False, index=True)
+    kind = Column(String, nullable=False, default="process_document")
+    priority = Column(String, nullable=False, default="interactive")  # interactive or bulk
+    stages = Column(JSON, nullable=True)  # stages to re-run even if checkpointed; null resumes
+    batch_id = Column(String(36), nullable=True, index=True)  # reprocessing run the job belongs to
+
+    status = Column(String, nullable=False, default="queued")  # queued, running, succeeded, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    run_after = Column(DateTime(timezone=True), nullable=False)  # not claimable before (retry backoff)
+    locked_by = Column(String, nullable=True)  # worker holding the lease
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True)
+    last_error = Column(Text, nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (Index("ix_jobs_status_run_after", "status", "run_after"),)
@@ -1,4 +1,5 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
 
@@ -7,12 +8,42 @@ engine_kwargs = {}
 if settings.DATABASE_URL.startswith("sqlite"):
     engine_kwargs["connect_args"] = {"check_same_thread": False}
 
+# Sync engine: workers, scripts, migrations and sync (threadpool) endpoints
 engine = create_engine(settings.DATABASE_URL, **engine_kwargs)
 SessionLocal = sessionmaker(bind=engine, autoflush=False)
 
+def async_database_url(url: str) -> str:
+    """DATABASE_URL with an asyncio driver: asyncpg for PostgreSQL, aiosqlite for SQLite"""
+    scheme, sep, rest = url.partition("://")
+    dialect = scheme.split("+")[0]
+    if dialect in ("postgresql", "postgres"):
+        return f"postgresql+asyncpg://{rest}"
+    if dialect == "sqlite":
+        return f"sqlite+aiosqlite://{rest}"
+    return url
+
+# Async engine: async def endpoints, so database round trips never block the event loop
+async_engine_kwargs = {}
+if not settings.DATABASE_URL.startswith("sqlite"):
+    async_engine_kwargs.update(
+        pool_size=settings.ASYNC_DB_POOL_SIZE,
+        max_overflow=settings.ASYNC_DB_MAX_OVERFLOW,
+        pool_pre_ping=True,
+    )
+
+async_engine = create_async_engine(
+    settings.ASYNC_DATABASE_URL or async_database_url(settings.DATABASE_URL), **async_engine_kwargs
+)
+# expire_on_commit=False: returned objects are serialized after the commit, without lazy loads
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -5,16 +5,18 @@ from app.core.logging import setup_logging
 from app.api.v1 import api_router
 from app.api.v1 import documents
 
-from app.core.middleware import add_timing, add_trace_id
+from app.core.admission import AdmissionController
+from app.core.middleware import AdmissionControlMiddleware, BodySizeLimitMiddleware, add_timing, add_trace_id
 from app.core.metrics_middleware import metrics_middleware
 from app.db.base import Base
-from app.db.session import engine
+from app.db.session import async_engine, engine
 from app.db import models  # noqa: F401 - Import models to register them
+from app.workers.job_queue import INTERACTIVE
 from fastapi import Response
 from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 import logging
 import threading
-from app.core.vector_store import load_vector_store
+from app.core.vector_store import load_vector_store, save_vector_store
 
 setup_logging()
 logger = logging.getLogger(__name__)
@@ -39,22 +41,29 @@ app.add_middleware(
 
 @app.on_event("startup")
 def startup():
-    """Startup event - pre-load AI models and vector store"""
+    """Startup event - load the vector store and start model warm-up in the background"""
     logger.info("Server starting up...")
-    
-    # Load AI models synchronously to ensure they're ready
-    try:
-        from app.core.ai_models import load_models
-        logger.info("Pre-loading AI models...")
-        load_models()
-        logger.info("AI models pre-loaded successfully")
-    except Exception as e:
-        logger.warning(f"AI models will be loaded on-demand: {e}")
-        # Don't fail startup, models will load on first use
-    
-    # Load vector store
+
+    # Load vector store first so no write can race the segment replay
     load_vector_store()
-    logger.info("Server startup complete")
+
+    # Models load and warm up off the startup path; /ready reports 503 until
+    # they are done and requests that need them wait on the readiness event
+    from app.core.ai_models import start_model_loading
+    start_model_loading()
+    logger.info("Server startup complete, AI models loading in the background")
+
+
+@app.on_event("shutdown")
+def shutdown():
+    """Shutdown event - commit any vectors still waiting for a group commit"""
+    save_vector_store()
+
+
+@app.on_event("shutdown")
+async def close_database():
+    """Close the async engine's pooled connections"""
+    await async_engine.dispose()
 
 
 
@@ -67,6 +76,36 @@ def metrics():
 app.middleware("http")(add_trace_id)
 app.middleware("http")(add_timing)
 app.middleware("http")(metrics_middleware)
+# Multipart framing adds a little on top of the file itself
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    max_bytes=settings.UPLOAD_MAX_SIZE_MB * 1024 * 1024 + 64 * 1024,
+    paths=(f"{settings.API_V1_STR}/documents/upload",),
+)
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    max_bytes=settings.BULK_MAX_SIZE_MB * 1024 * 1024,
+    paths=(f"{settings.API_V1_STR}/documents/bulk",),
+)
+# Outermost: refuse uploads before any body is read when workers or memory are saturated
+app.add_middleware(
+    AdmissionControlMiddleware,
+    controller=AdmissionController(
+        budget_bytes=settings.UPLOAD_INFLIGHT_BUDGET_MB * 1024 * 1024,
+        drain_window=settings.ADMISSION_DRAIN_WINDOW_SECONDS,
+        stats_ttl=settings.ADMISSION_STATS_TTL_SECONDS,
+        max_retry_after=settings.ADMISSION_MAX_RETRY_AFTER,
+    ),
+    limits={
+        # Interactive jobs run ahead of bulk work, so only their own backlog delays an upload
+        f"{settings.API_V1_STR}/documents/upload": (
+            settings.ADMISSION_MAX_QUEUED_JOBS, settings.UPLOAD_MAX_SIZE_MB * 1024 * 1024, (INTERACTIVE,)
+        ),
+        f"{settings.API_V1_STR}/documents/bulk": (
+            settings.ADMISSION_MAX_QUEUED_BULK_JOBS, settings.BULK_MAX_SIZE_MB * 1024 * 1024, None
+        ),
+    },
+)
 
 app.include_router(api_router, prefix=settings.API_V1_STR)
 app.include_router(documents.router, prefix=settings.API_V1_STR)
@@ -1,5 +1,5 @@
 # Metrics collection
-from prometheus_client import Counter, Histogram, generate_latest
+from prometheus_client import Counter, Gauge, Histogram, generate_latest
 
 REQUEST_COUNT = Counter(
     "http_requests_total",
@@ -12,3 +12,101 @@ REQUEST_LATENCY = Histogram(
     "Request latency",
     ["endpoint"]
 )
+
+
+CACHE_HITS = Counter(
+    "cache_hits_total",
+    "Cache hits",
+    ["cache"]
+)
+
+CACHE_MISSES = Counter(
+    "cache_misses_total",
+    "Cache misses",
+    ["cache"]
+)
+
+CACHE_EVICTIONS = Counter(
+    "cache_evictions_total",
+    "Entries evicted to stay within the cache size limit",
+    ["cache"]
+)
+
+CACHE_SIZE = Gauge(
+    "cache_entries",
+    "Entries currently held in the cache",
+    ["cache"]
+)
+
+INFERENCE_BATCH_SIZE = Histogram(
+    "inference_batch_size",
+    "Inputs per model inference batch",
+    ["executor"],
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256)
+)
+
+INFERENCE_QUEUE_WAIT = Histogram(
+    "inference_queue_wait_seconds",
+    "Time a request waited to join an inference batch",
+    ["executor"]
+)
+
+OCR_STAGE_SECONDS = Histogram(
+    "ocr_stage_seconds",
+    "Time per page spent in each OCR stage (render, preprocessing steps, recognition)",
+    ["stage"]
+)
+
+PIPELINE_QUEUE_DEPTH = Gauge(
+    "pipeline_queue_depth",
+    "Items waiting in the input queue of each ingestion stage",
+    ["stage"]
+)
+
+PIPELINE_BUSY_WORKERS = Gauge(
+    "pipeline_busy_workers",
+    "Stage workers currently processing an item",
+    ["stage"]
+)
+
+PIPELINE_STAGE_SECONDS = Histogram(
+    "pipeline_stage_seconds",
+    "Time one item spent in each ingestion stage",
+    ["stage"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+)
+
+PIPELINE_ITEMS = Counter(
+    "pipeline_items_total",
+    "Items that left each ingestion stage",
+    ["stage", "outcome"]
+)
+
+JOB_QUEUE_WAIT = Histogram(
+    "job_queue_wait_seconds",
+    "Time a job waited between becoming due and being claimed, per priority class",
+    ["priority"],
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600, 7200, 14400)
+)
+
+JOB_QUEUE_DEPTH = Gauge(
+    "job_queue_depth",
+    "Due jobs waiting to be claimed, per priority class (as last seen by this worker)",
+    ["priority"]
+)
+
+ADMISSION_REJECTIONS = Counter(
+    "admission_rejections_total",
+    "Uploads turned away by admission control",
+    ["reason"]
+)
+
+UPLOAD_INFLIGHT_BYTES = Gauge(
+    "upload_inflight_bytes",
+    "Upload bytes reserved by requests currently being received"
+)
+
+STATUS_STREAM_SUBSCRIBERS = Gauge(
+    "status_stream_subscribers",
+    "Open document status streams in this API process"
+)
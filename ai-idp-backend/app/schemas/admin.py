@@ -0,0 +1,24 @@
+# Admin schemas
+from pydantic import BaseModel, Field
+from typing import Literal, Optional
+
+StageName = Literal["extract", "embed", "classify"]
+
+
+class ReprocessRequest(BaseModel):
+    # Re-running a stage also re-runs the stages that consume its output
+    stages: list[StageName] = Field(..., min_length=1)
+    document_ids: Optional[list[int]] = None
+    status: Optional[str] = None
+    owner_id: Optional[int] = None
+    # Only documents where a chosen stage failed, never ran or used another model
+    stale_only: bool = False
+    limit: Optional[int] = Field(None, ge=1)
+
+
+class ReprocessResponse(BaseModel):
+    batch_id: str
+    stages: list[str]
+    queued: int
+    skipped: int  # documents that already had a queued or running job
+
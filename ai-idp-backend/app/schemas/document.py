@@ -10,8 +10,41 @@ class DocumentResponse(BaseModel):
     status: str
     embedding_status: Optional[str] = None
     classification: Optional[Any] = None
+    extraction_stats: Optional[Any] = None
+    stages: Optional[Any] = None  # checkpoint per ingestion stage
     content_type: str
     created_at: datetime
 
     class Config:
         from_attributes = True
+
+
+class StreamToken(BaseModel):
+    token: str  # pass as ?token= to GET /documents/events
+    expires_in: int  # seconds left to open the stream
+
+
+class DocumentListResponse(BaseModel):
+    documents: list[DocumentResponse]
+    next_cursor: Optional[str] = None  # pass as ?cursor= for the next page; None on the last page
+
+
+class BulkRejected(BaseModel):
+    filename: str
+    reason: str
+
+
+class BulkUploadResponse(BaseModel):
+    batch_id: str
+    document_ids: list[int]
+    rejected: list[BulkRejected]
+
+
+class BatchProgress(BaseModel):
+    batch_id: str
+    total: int
+    queued: int
+    running: int
+    succeeded: int
+    failed: int
+    done: bool
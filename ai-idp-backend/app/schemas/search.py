@@ -4,6 +4,8 @@ from pydantic import BaseModel, Field
 class SearchRequest(BaseModel):
 	query: str = Field(..., min_length=1)
 	limit: int = Field(5, ge=1, le=50)
+	# IVF lists to scan; higher trades latency for recall (ignored for flat search)
+	nprobe: int | None = Field(None, ge=1, le=4096)
 
 
 class SearchResult(BaseModel):
@@ -0,0 +1,58 @@
+# Text chunking for embeddings
+import re
+from typing import NamedTuple
+
+from app.core.config import settings
+
+_WORD_RE = re.compile(r"\S+")
+
+
+class TextChunk(NamedTuple):
+    text: str
+    start: int
+    end: int
+
+
+def _token_offsets(text: str, tokenizer=None) -> list[tuple[int, int]]:
+    """Character (start, end) of every token, using the model tokenizer when possible"""
+    if tokenizer is not None and getattr(tokenizer, "is_fast", False):
+        encoding = tokenizer(
+            text,
+            add_special_tokens=False,
+            return_offsets_mapping=True,
+            return_attention_mask=False,
+            verbose=False,
+        )
+        return [(start, end) for start, end in encoding["offset_mapping"] if end > start]
+
+    # Whitespace words approximate tokens when no fast tokenizer is available
+    return [match.span() for match in _WORD_RE.finditer(text)]
+
+
+def chunk_text(
+    text: str,
+    tokenizer=None,
+    max_tokens: int = settings.EMBEDDING_CHUNK_TOKENS,
+    overlap: int = settings.EMBEDDING_CHUNK_OVERLAP,
+) -> list[TextChunk]:
+    """
+    Split text into overlapping chunks of at most max_tokens tokens.
+
+    Each chunk records its character offsets in the original text, so a
+    search hit can point back at the passage that matched.
+    """
+    if not text or not text.strip():
+        return []
+    if overlap >= max_tokens:
+        raise ValueError("Chunk overlap must be smaller than the chunk size")
+
+    offsets = _token_offsets(text, tokenizer)
+    chunks = []
+    step = max_tokens - overlap
+    for first in range(0, len(offsets), step):
+        window = offsets[first:first + max_tokens]
+        start, end = window[0][0], window[-1][1]
+        chunks.append(TextChunk(text[start:end], start, end))
+        if first + max_tokens >= len(offsets):
+            break
+    return chunks
@@ -1,34 +1,49 @@
 import logging
 
+from app.core.batching import BatchingExecutor
+from app.core.config import settings
+
 logger = logging.getLogger(__name__)
 
+def _classify_batch(texts: list[str]):
+    from app.core.ai_models import get_classifier
+
+    # Waits on the shared readiness event while the background warm-up runs
+    clf = get_classifier()
+    if clf is None:
+        return [None] * len(texts)
+    return clf(texts, batch_size=len(texts))
+
+# Concurrent documents in the classification stage share model calls
+classification_executor = BatchingExecutor(
+    _classify_batch,
+    max_batch_size=settings.CLASSIFIER_BATCH_SIZE,
+    max_wait_ms=settings.CLASSIFIER_MAX_WAIT_MS,
+    name="classifier",
+)
+
+def classifier_model_id() -> str:
+    if settings.INFERENCE_BACKEND == "onnx":
+        return f"{settings.CLASSIFIER_MODEL}|onnx|{'int8' if settings.ONNX_QUANTIZE else 'fp32'}"
+    return f"{settings.CLASSIFIER_MODEL}|{settings.INFERENCE_BACKEND}"
+
+def classify(text: str):
+    """{label, score} for text, or None when no classifier is loaded; raises on model errors"""
+    # limit text length (huggingface safety)
+    result = classification_executor.submit([text[:512]]).result()[0]
+    if result is None:
+        logger.warning("Classifier is not available")
+    return result
+
 def classify_text(text: str):
     if not text:
         return None
-    
+
     try:
-        from app.core.ai_models import classifier, load_models
-        
-        # Ensure model is loaded with retry logic
-        clf = classifier
-        if clf is None:
-            logger.info("Classifier not loaded, loading now...")
-            try:
-                load_models()
-                from app.core.ai_models import classifier as loaded_clf
-                clf = loaded_clf
-                if clf is None:
-                    logger.warning("Classifier could not be loaded after calling load_models()")
-                    return None
-            except Exception as load_err:
-                logger.error(f"Failed to load classifier model: {load_err}")
-                return None
-        else:
-            logger.debug("Classifier model already loaded")
-        
-        # limit text length (huggingface safety)
-        result = clf(text[:512])
-        return result[0]  # {label, score}
+        return classify(text)
+    except RuntimeError as load_err:
+        logger.error(f"Failed to load classifier model: {load_err}")
+        return None
     except Exception as e:
         logger.error(f"Error classifying text: {e}")
         return None
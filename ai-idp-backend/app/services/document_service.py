@@ -1,35 +1,197 @@
 from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.core.storage import save_file
+from app.core.config import settings
+from app.core.storage import StoredFile, iter_archive, save_stream, sniff_archive_type
 from app.db.models import Document
+from app.workers.job_queue import BULK, INTERACTIVE, enqueue_job
+from datetime import datetime
+import base64
+import json
+import logging
+import uuid
+
+logger = logging.getLogger(__name__)
 
 ALLOWED_TYPES = {"application/pdf", "image/png", "image/jpeg"}
-MAX_SIZE_MB = 10
+MAX_SIZE_MB = settings.UPLOAD_MAX_SIZE_MB
 
 async def upload_document(
-    db: Session,
+    db: AsyncSession,
     user_id: int,
     file: UploadFile
 ):
     if file.content_type not in ALLOWED_TYPES:
         raise ValueError("Unsupported file type")
 
-    content = await file.read()
-
-    if len(content) > MAX_SIZE_MB * 1024 * 1024:
-        raise ValueError("File too large")
-
-    path = save_file(content, file.filename)
+    # Chunked copy, sniffing and hashing run in a worker thread, so large
+    # uploads take constant memory and never block the event loop
+    stored = await run_in_threadpool(
+        save_stream, file.file, MAX_SIZE_MB * 1024 * 1024, settings.UPLOAD_CHUNK_SIZE
+    )
 
     doc = Document(
         owner_id=user_id,
         filename=file.filename,
-        content_type=file.content_type,
-        storage_path=path,
+        content_type=stored.content_type,
+        storage_path=stored.path,
+        content_hash=stored.content_hash,
+        size_bytes=stored.size,
+        page_count=stored.page_count,
     )
 
+    # Document and its processing job commit together, so no upload is lost
     db.add(doc)
-    db.commit()
-    db.refresh(doc)
+    await db.flush()
+    enqueue_job(db, doc.id, priority=INTERACTIVE)
+    await db.commit()
+    await db.refresh(doc)
 
     return doc
+
+def store_bulk_files(files: list[UploadFile], max_documents: int = settings.BULK_MAX_DOCUMENTS):
+    """
+    Stream every upload, and every entry of uploaded zip/tar archives, into
+    storage. Returns (stored, rejected): (filename, StoredFile) pairs and
+    (filename, reason) pairs. A bad entry is rejected on its own; it does
+    not fail the batch. Blocking: call it off the event loop.
+    """
+    max_bytes = MAX_SIZE_MB * 1024 * 1024
+    stored: list[tuple[str, StoredFile]] = []
+    rejected: list[tuple[str, str]] = []
+
+    def store(name: str, stream) -> None:
+        if len(stored) >= max_documents:
+            rejected.append((name, f"Over the limit of {max_documents} documents per batch"))
+            return
+        try:
+            stored.append((name, save_stream(stream, max_bytes, settings.UPLOAD_CHUNK_SIZE)))
+        except ValueError as e:  # unsupported type, empty or too large
+            rejected.append((name, str(e)))
+
+    for file in files:
+        kind = sniff_archive_type(file.file)
+        if kind is None:
+            store(file.filename, file.file)
+            continue
+        try:
+            for name, entry in iter_archive(file.file, kind):
+                store(f"{file.filename}/{name}", entry)
+        except Exception as e:  # corrupt or truncated archive: keep the entries read so far
+            logger.warning(f"Could not read archive {file.filename}: {e}")
+            rejected.append((file.filename, f"Unreadable archive: {e}"))
+    return stored, rejected
+
+async def bulk_upload_documents(db: AsyncSession, user_id: int, files: list[UploadFile]) -> dict:
+    """Store a batch of uploads and queue them under one batch id, in one transaction"""
+    stored, rejected = await run_in_threadpool(store_bulk_files, files)
+
+    batch_id = str(uuid.uuid4()) if stored else None
+    documents = [
+        Document(
+            owner_id=user_id,
+            filename=filename,
+            content_type=file.content_type,
+            storage_path=file.path,
+            content_hash=file.content_hash,
+            size_bytes=file.size,
+            page_count=file.page_count,
+        )
+        for filename, file in stored
+    ]
+    if documents:
+        db.add_all(documents)
+        await db.flush()
+        # Bulk priority: interactive uploads are claimed ahead of the batch
+        for doc in documents:
+            enqueue_job(db, doc.id, batch_id=batch_id, priority=BULK)
+        await db.commit()
+    logger.info(f"Bulk upload {batch_id}: {len(documents)} documents queued, {len(rejected)} rejected")
+
+    return {
+        "batch_id": batch_id,
+        "document_ids": [doc.id for doc in documents],
+        "rejected": [{"filename": name, "reason": reason} for name, reason in rejected],
+    }
+
+def find_completed_duplicate(db: Session, document: Document):
+    """Latest fully processed document with the same content, if any"""
+    if not document.content_hash:
+        return None
+    return (
+        db.query(Document)
+        .filter(
+            Document.content_hash == document.content_hash,
+            Document.id != document.id,
+            Document.status == "completed",
+            Document.embedding_status.in_(("completed", "skipped")),
+        )
+        .order_by(Document.id.desc())
+        .first()
+    )
+
+TERMINAL_STATUSES = ("completed", "failed")
+
+def document_states(db: Session, document_ids, owner_id: int = None) -> dict[int, dict]:
+    """Processing status of each document, as streamed to clients; the text columns are not loaded"""
+    ids = sorted(document_ids)
+    states = {}
+    for start in range(0, len(ids), 500):
+        query = db.query(
+            Document.id, Document.status, Document.embedding_status, Document.classification, Document.stages
+        ).filter(Document.id.in_(ids[start:start + 500]))
+        if owner_id is not None:
+            query = query.filter(Document.owner_id == owner_id)
+        for document_id, status, embedding_status, classification, stages in query:
+            states[document_id] = {
+                "document_id": document_id,
+                "status": status,
+                "embedding_status": embedding_status,
+                "classification": classification,
+                "stages": {stage: (checkpoint or {}).get("status") for stage, checkpoint in (stages or {}).items()},
+            }
+    return states
+
+def encode_cursor(document: Document) -> str:
+    """Opaque position after document in the newest-first listing"""
+    position = json.dumps([document.created_at.isoformat(), document.id])
+    return base64.urlsafe_b64encode(position.encode()).decode()
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """(created_at, id) of the last document of the previous page; ValueError if malformed"""
+    try:
+        created_at, document_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(created_at), int(document_id)
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+def list_documents(
+    db: Session,
+    owner_id: int,
+    limit: int,
+    cursor: str = None,
+    status: str = None,
+    classification: str = None,
+) -> tuple[list[Document], str]:
+    """
+    One page of an owner's documents, newest first, and the cursor of the next
+    page (None on the last page).
+
+    Pages are found by seeking past (created_at, id) of the previous page on
+    the owner indexes instead of OFFSET, so the latency of a page does not
+    grow with its depth.
+    """
+    query = db.query(Document).filter(Document.owner_id == owner_id)
+    if status:
+        query = query.filter(Document.status == status)
+    if classification:
+        query = query.filter(Document.classification["label"].as_string() == classification)
+    if cursor:
+        created_at, document_id = decode_cursor(cursor)
+        query = query.filter(tuple_(Document.created_at, Document.id) < tuple_(created_at, document_id))
+
+    documents = query.order_by(Document.created_at.desc(), Document.id.desc()).limit(limit + 1).all()
+    next_cursor = encode_cursor(documents[limit - 1]) if len(documents) > limit else None
+    return documents[:limit], next_cursor
@@ -1,57 +1,141 @@
-import faiss
-import numpy as np
+import io
 import logging
+import os
 import time
 
+import numpy as np
+
+from app.core.batching import BatchingExecutor
+from app.core.config import settings
+from app.core.disk_cache import DiskCache, content_key
+from app.core.vector_store import normalize_vectors
+from app.services.chunking import chunk_text
+
 logger = logging.getLogger(__name__)
 
-dimension = 384
-index = faiss.IndexFlatL2(dimension)
+def _get_embedding_model():
+    # Import here to avoid circular dependency at module load time
+    from app.core.ai_models import get_embedding_model
+
+    # Waits on the shared readiness event while the background warm-up runs
+    try:
+        return get_embedding_model()
+    except RuntimeError as e:
+        logger.error(f"Failed to load embedding model: {e}")
+        raise RuntimeError(f"Cannot load embedding model: {e}")
+
+def _encode_batch(texts: list[str]):
+    model = _get_embedding_model()
+    return model.encode(texts, batch_size=len(texts))
+
+# Shared by ingestion and search so concurrent callers share model calls
+embedding_executor = BatchingExecutor(
+    _encode_batch,
+    max_batch_size=settings.EMBEDDING_BATCH_SIZE,
+    max_wait_ms=settings.EMBEDDING_MAX_WAIT_MS,
+    name="embedding",
+)
+
+# Document chunk vectors by (model id, text hash); queries use the in-memory cache instead
+embedding_cache = DiskCache(
+    "embedding",
+    os.path.join(settings.RESULT_CACHE_DIR, "embeddings"),
+    settings.EMBEDDING_CACHE_MAX_MB * 1024 * 1024,
+)
+
+_lowercases = None
+
+def lowercases_input() -> bool:
+    """
+    Whether the embedding model lowercases text before encoding it (an uncased
+    tokenizer). Worked out once the model is loaded; never waits for it, and
+    says False until then, which only costs some query cache hits.
+    """
+    global _lowercases
+    if _lowercases is None:
+        from app.core import ai_models
+
+        if not ai_models.models_ready.is_set():
+            return False
+        model = ai_models.embedding_model
+        # sentence-transformers can also lowercase in its Transformer module
+        first_module = getattr(model, "_first_module", None)
+        _lowercases = bool(
+            getattr(getattr(model, "tokenizer", None), "do_lower_case", False)
+            or (first_module and getattr(first_module(), "do_lower_case", False))
+        )
+    return _lowercases
 
-doc_id_map = []
+def embedding_model_id() -> str:
+    # int8 and fp32 models give slightly different vectors
+    if settings.INFERENCE_BACKEND == "onnx":
+        return f"{settings.EMBEDDING_MODEL}|onnx|{'int8' if settings.ONNX_QUANTIZE else 'fp32'}"
+    return f"{settings.EMBEDDING_MODEL}|{settings.INFERENCE_BACKEND}"
 
-def generate_embeddings(text: str, document_id: int = None):
+def encode_texts(texts: list[str]) -> np.ndarray:
+    """Encode texts through the batching executor into normalized vectors"""
+    return normalize_vectors(embedding_executor.submit(texts).result())
+
+def encode_texts_cached(texts: list[str]) -> np.ndarray:
+    """encode_texts() that only runs the model for texts missing from the disk cache"""
+    model_id = embedding_model_id()
+    keys = [content_key(model_id, text) for text in texts]
+    vectors = [None] * len(texts)
+    missing = []
+    for i, key in enumerate(keys):
+        data = embedding_cache.get(key)
+        if data is None:
+            missing.append(i)
+        else:
+            vectors[i] = np.load(io.BytesIO(data))
+
+    if missing:
+        encoded = encode_texts([texts[i] for i in missing])
+        for i, vector in zip(missing, encoded):
+            vectors[i] = vector
+            buffer = io.BytesIO()
+            np.save(buffer, vector, allow_pickle=False)
+            embedding_cache.set(keys[i], buffer.getvalue())
+
+    if len(missing) < len(texts):
+        logger.info(f"Reused {len(texts) - len(missing)}/{len(texts)} cached chunk embeddings")
+    return np.vstack(vectors).astype("float32")
+
+def generate_embeddings(text: str):
+    """Encode text into a normalized (1, DIMENSION) float32 vector"""
     if not text or not text.strip():
         logger.warning("Empty text provided for embedding generation")
         return None
-    
+
     try:
-        # Import here to avoid circular dependency at module load time
-        from app.core.ai_models import embedding_model, load_models
-        
-        # Ensure model is loaded with retry logic
-        model = embedding_model
-        if model is None:
-            logger.info("Embedding model not loaded, loading now...")
-            try:
-                load_models()
-                # Re-import to get the loaded model
-                from app.core.ai_models import embedding_model as loaded_model
-                model = loaded_model
-                if model is None:
-                    raise RuntimeError("Failed to load embedding model after calling load_models()")
-            except Exception as load_err:
-                logger.error(f"Failed to load embedding model: {load_err}")
-                raise RuntimeError(f"Cannot load embedding model: {load_err}")
-        else:
-            logger.debug("Embedding model already loaded")
-        
         logger.info(f"Generating embeddings for text of length {len(text)}...")
         start = time.time()
-        vector = model.encode([text])
-        vector = np.asarray(vector, dtype="float32")
+        vector = encode_texts([text])
         duration = time.time() - start
         logger.info(f"Embeddings generated in {duration:.2f}s")
-        
-        # Only add to index if document_id is provided (during document processing)
-        if document_id is not None:
-            index.add(vector)
-            doc_id_map.append(document_id)
-            logger.info(f"Added embedding to index for document {document_id}")
-        
+
         return vector
-    
+
     except Exception as e:
         logger.error(f"Error generating embeddings: {e}")
         raise
 
+def embed_document(text: str):
+    """
+    Split a document into token-bounded, overlapping chunks and embed them
+    in batches.
+
+    Returns (vectors, spans): normalized (n, DIMENSION) vectors and the
+    (start, end) character offsets of each chunk in text.
+    """
+    model = _get_embedding_model()
+    chunks = chunk_text(text, tokenizer=getattr(model, "tokenizer", None))
+    if not chunks:
+        return None, None
+
+    logger.info(f"Embedding {len(chunks)} chunks for text of length {len(text)}...")
+    start = time.time()
+    vectors = encode_texts_cached([chunk.text for chunk in chunks])
+    spans = np.array([(chunk.start, chunk.end) for chunk in chunks], dtype="int64")
+    logger.info(f"Chunk embeddings generated in {time.time() - start:.2f}s")
+    return vectors, spans
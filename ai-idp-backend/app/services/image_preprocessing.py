@@ -0,0 +1,138 @@
+"""
+Image preprocessing for OCR
+
+Tesseract's cost grows with pixel count. Pages are rendered and scaled so
+the text is about OCR_TARGET_TEXT_PX tall, which Tesseract reads reliably,
+instead of at a fixed DPI or the camera's native resolution.
+"""
+from typing import Callable
+import logging
+import time
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+POINTS_PER_INCH = 72
+MIN_GLYPHS = 20  # components needed for a text height estimate
+
+
+def add_timing(timings: dict, stage: str, seconds: float) -> None:
+    """Accumulate seconds spent in a stage (timings may be None)"""
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+def to_grayscale(img: np.ndarray) -> np.ndarray:
+    if img.ndim == 2:
+        return img
+    if img.shape[2] == 4:
+        return cv2.cvtColor(img, cv2.COLOR_BGRA2GRAY)
+    return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+
+
+def estimate_text_height(gray: np.ndarray) -> float | None:
+    """
+    Median glyph height in pixels, from the connected components of the
+    dark pixels. Returns None when there are too few glyph-like components.
+    """
+    ink = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)[1]
+    _, _, stats, _ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+    heights = stats[1:, cv2.CC_STAT_HEIGHT]
+    widths = stats[1:, cv2.CC_STAT_WIDTH]
+    # Drop specks, rules, images and runs of touching glyphs
+    glyphs = (heights >= 3) & (heights <= gray.shape[0] * 0.05) & (widths <= heights * 3)
+    if glyphs.sum() < MIN_GLYPHS:
+        return None
+    return float(np.median(heights[glyphs]))
+
+
+def choose_render_dpi(
+    width_pt: float,
+    height_pt: float,
+    text_height_pt: float | None = None,
+) -> int:
+    """
+    Render DPI for a page: enough to make the text OCR_TARGET_TEXT_PX tall,
+    clamped to [OCR_MIN_DPI, OCR_MAX_DPI] and to the OCR_MAX_PIXELS budget.
+    Uses OCR_DPI when the text height is unknown.
+    """
+    if text_height_pt:
+        dpi = settings.OCR_TARGET_TEXT_PX * POINTS_PER_INCH / text_height_pt
+        dpi = min(max(dpi, settings.OCR_MIN_DPI), settings.OCR_MAX_DPI)
+    else:
+        dpi = settings.OCR_DPI
+
+    page_inches = (width_pt / POINTS_PER_INCH) * (height_pt / POINTS_PER_INCH)
+    if page_inches > 0:
+        dpi = min(dpi, (settings.OCR_MAX_PIXELS / page_inches) ** 0.5)
+    return max(int(dpi), 1)
+
+
+def probe_render_dpi(probe: np.ndarray, probe_dpi: int = settings.OCR_PROBE_DPI) -> tuple[int, float | None]:
+    """
+    Render DPI for a page, from a low-resolution grayscale render of it,
+    and the text height in pixels at that DPI (None when unknown)
+    """
+    height_px, width_px = probe.shape[:2]
+    scale = POINTS_PER_INCH / probe_dpi
+    text_height = estimate_text_height(probe)
+    dpi = choose_render_dpi(
+        width_px * scale, height_px * scale, text_height * scale if text_height else None
+    )
+    return dpi, text_height * dpi / probe_dpi if text_height else None
+
+
+def downscale(img: np.ndarray, text_height: float | None = None) -> np.ndarray:
+    """
+    Shrink images whose text is much larger than needed, or that exceed
+    OCR_MAX_PIXELS. This mostly applies to camera photos. text_height, when
+    known (pages rendered at probe_render_dpi), skips estimating it again.
+    """
+    height, width = img.shape[:2]
+    scale = min(1.0, (settings.OCR_MAX_PIXELS / (height * width)) ** 0.5)
+    if text_height is None:
+        text_height = estimate_text_height(to_grayscale(img))
+    if text_height and text_height > 2 * settings.OCR_TARGET_TEXT_PX:
+        scale = min(scale, settings.OCR_TARGET_TEXT_PX / text_height)
+    if scale >= 1.0:
+        return img
+    size = (max(int(width * scale), 1), max(int(height * scale), 1))
+    return cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+
+
+def binarize(img: np.ndarray, method: str = settings.OCR_BINARIZE) -> np.ndarray:
+    gray = to_grayscale(img)
+    if method == "adaptive":
+        # Handles uneven lighting in photos better than one global threshold
+        return cv2.adaptiveThreshold(
+            gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 31, 15
+        )
+    return cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
+
+
+STAGES: dict[str, Callable[[np.ndarray], np.ndarray]] = {
+    "grayscale": to_grayscale,
+    "downscale": downscale,
+    "binarize": binarize,
+}
+
+
+def preprocess(
+    img: np.ndarray,
+    stages: str = settings.OCR_PREPROCESS,
+    timings: dict = None,
+    text_height: float | None = None,
+) -> np.ndarray:
+    """
+    Run the configured stages in order, recording the seconds spent in each.
+    text_height (pixels), when already known, is passed to downscale.
+    """
+    for stage in filter(None, (name.strip() for name in stages.split(","))):
+        start = time.perf_counter()
+        img = downscale(img, text_height) if stage == "downscale" else STAGES[stage](img)
+        add_timing(timings, stage, time.perf_counter() - start)
+    return img
@@ -1,25 +1,371 @@
 # OCR service
 import pytesseract
 import cv2
-from pdf2image import convert_from_path
+from pdf2image import convert_from_path, pdfinfo_from_path
 from PIL import Image
+import numpy as np
+from abc import ABC, abstractmethod
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import NamedTuple
+import logging
+import multiprocessing
 import os
+import subprocess
+import tempfile
+import threading
+import time
 
-def preprocess_image(img):
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    return cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
+from app.core.config import settings
+from app.core.disk_cache import DiskCache, content_key
+from app.metrics import OCR_STAGE_SECONDS
+from app.services.image_preprocessing import add_timing, preprocess, probe_render_dpi
 
-def extract_text_from_image(image_path: str) -> str:
+logger = logging.getLogger(__name__)
+
+_ocr_pool = None
+_ocr_pool_lock = threading.Lock()
+
+# OCR text by page-image hash, shared by the API process and the pool workers
+ocr_cache = DiskCache(
+    "ocr",
+    os.path.join(settings.RESULT_CACHE_DIR, "ocr"),
+    settings.OCR_CACHE_MAX_MB * 1024 * 1024,
+)
+
+TEXT_LAYER = "text_layer"
+OCR = "ocr"
+
+class PageText(NamedTuple):
+    page: int  # 1-based
+    text: str
+    method: str  # TEXT_LAYER or OCR
+
+class OcrEngine(ABC):
+    """Turns a page image (PIL image or uint8 numpy array) into text"""
+
+    name = "base"
+
+    @abstractmethod
+    def image_to_string(self, image) -> str:
+        ...
+
+class PytesseractEngine(OcrEngine):
+    """Runs the tesseract CLI once per image (process start and model load each time)"""
+
+    name = "pytesseract"
+
+    def __init__(self, lang: str = settings.OCR_LANG):
+        self.lang = lang
+
+    def image_to_string(self, image) -> str:
+        return pytesseract.image_to_string(image, lang=self.lang)
+
+class TesserocrEngine(OcrEngine):
+    """
+    Keeps one Tesseract API handle, with its language model loaded, per
+    thread. Pages are passed as in-memory pixel buffers, with no temp file
+    or subprocess.
+    """
+
+    name = "tesserocr"
+
+    def __init__(self, lang: str = settings.OCR_LANG):
+        import tesserocr
+
+        self._tesserocr = tesserocr
+        self.lang = lang
+        self._local = threading.local()
+        self._api()  # fail fast when the language data is missing
+
+    def _api(self):
+        api = getattr(self._local, "api", None)
+        if api is None:
+            api = self._local.api = self._tesserocr.PyTessBaseAPI(lang=self.lang)
+        return api
+
+    def image_to_string(self, image) -> str:
+        pixels = np.ascontiguousarray(image)
+        if pixels.dtype != np.uint8 or pixels.ndim not in (2, 3):
+            pixels = np.ascontiguousarray(Image.fromarray(pixels).convert("L"))
+        height, width = pixels.shape[:2]
+        channels = 1 if pixels.ndim == 2 else pixels.shape[2]
+
+        api = self._api()
+        api.SetImageBytes(pixels.tobytes(), width, height, channels, width * channels)
+        try:
+            return api.GetUTF8Text()
+        finally:
+            api.Clear()
+
+_ocr_engine = None
+_ocr_engine_lock = threading.Lock()
+
+OCR_ENGINES = ("auto", "tesserocr", "pytesseract")
+
+def create_ocr_engine(name: str = settings.OCR_ENGINE) -> OcrEngine:
+    if name not in OCR_ENGINES:
+        raise ValueError(f"Unknown OCR_ENGINE {name!r}, expected one of {', '.join(OCR_ENGINES)}")
+    if name == "pytesseract":
+        return PytesseractEngine()
+    try:
+        return TesserocrEngine()
+    except Exception as e:
+        if name == "tesserocr":
+            raise
+        logger.info(f"tesserocr unavailable ({e}), using pytesseract")
+        return PytesseractEngine()
+
+def get_ocr_engine() -> OcrEngine:
+    """This process's OCR engine, created on first use"""
+    global _ocr_engine
+    with _ocr_engine_lock:
+        if _ocr_engine is None:
+            _ocr_engine = create_ocr_engine()
+        return _ocr_engine
+
+def _ocr_cache_key(img: np.ndarray, text_height: float | None = None) -> str:
+    # Everything that changes the text for the same pixels is part of the key
+    config = "|".join(map(str, (
+        get_ocr_engine().name, settings.OCR_LANG, settings.OCR_PREPROCESS, settings.OCR_BINARIZE,
+        settings.OCR_TARGET_TEXT_PX, settings.OCR_MAX_PIXELS, text_height,
+    )))
+    return content_key(config, str(img.shape), np.ascontiguousarray(img))
+
+def _ocr_image(img: np.ndarray, timings: dict, text_height: float | None = None) -> str:
+    start = time.perf_counter()
+    key = _ocr_cache_key(img, text_height)
+    cached = ocr_cache.get(key)
+    add_timing(timings, "cache_lookup", time.perf_counter() - start)
+    if cached is not None:
+        return cached.decode("utf-8")
+
+    processed = preprocess(img, timings=timings, text_height=text_height)
+    start = time.perf_counter()
+    text = get_ocr_engine().image_to_string(processed)
+    add_timing(timings, "recognize", time.perf_counter() - start)
+    ocr_cache.set(key, text.encode("utf-8"))
+    return text
+
+def _observe(timings: dict) -> None:
+    for stage, seconds in timings.items():
+        OCR_STAGE_SECONDS.labels(stage).observe(seconds)
+
+def extract_text_from_image(image_path: str, timings: dict = None) -> str:
+    page_timings = {}
+    start = time.perf_counter()
     img = cv2.imread(image_path)
-    processed = preprocess_image(img)
-    return pytesseract.image_to_string(processed)
+    add_timing(page_timings, "decode", time.perf_counter() - start)
+    text = _ocr_image(img, page_timings)
+
+    _observe(page_timings)
+    for stage, seconds in page_timings.items():
+        add_timing(timings, stage, seconds)
+    return text
+
+def available_cores() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+def _init_ocr_worker():
+    # One core per worker: stop tesseract's OpenMP threads from oversubscribing
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+    # Load the language model once per worker, not per page
+    get_ocr_engine()
+
+def _get_ocr_pool() -> ProcessPoolExecutor:
+    """Process pool shared by all documents, so concurrent PDFs share the cores"""
+    global _ocr_pool
+    with _ocr_pool_lock:
+        if _ocr_pool is None:
+            workers = settings.OCR_WORKERS or available_cores()
+            logger.info(f"Starting OCR process pool with {workers} workers")
+            # spawn: forking a process that already runs model threads is unsafe
+            _ocr_pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_ocr_worker,
+            )
+        return _ocr_pool
+
+def _ocr_page_file(image_path: str, text_height: float | None = None) -> tuple[str, dict]:
+    """
+    OCR one rendered page and delete it, so each page is freed once done.
+    text_height is the page's text height at the render DPI, when known.
+    """
+    timings = {}
+    try:
+        start = time.perf_counter()
+        with Image.open(image_path) as img:
+            pixels = np.asarray(img.convert("L"))
+        add_timing(timings, "decode", time.perf_counter() - start)
+        return _ocr_image(pixels, timings, text_height), timings
+    finally:
+        os.remove(image_path)
+
+def _collect(pending: dict, pages: dict, keep: int, timings: dict = None) -> None:
+    """Wait until at most keep pages are still being OCR'd"""
+    while len(pending) > keep:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            text, page_timings = future.result()
+            pages[pending.pop(future)] = text
+            # Worker processes have their own metric registries; observe here
+            _observe(page_timings)
+            for stage, seconds in page_timings.items():
+                add_timing(timings, stage, seconds)
+
+def choose_pdf_dpi(path: str, page: int, timings: dict = None) -> tuple[int, float | None]:
+    """
+    Render DPI for a PDF's scanned pages, from a low-resolution probe of one
+    page, and the text height in pixels at that DPI (None when unknown)
+    """
+    start = time.perf_counter()
+    probe = convert_from_path(
+        path, dpi=settings.OCR_PROBE_DPI, first_page=page, last_page=page, grayscale=True
+    )[0]
+    dpi, text_height = probe_render_dpi(np.asarray(probe.convert("L")))
+    seconds = time.perf_counter() - start
+    add_timing(timings, "probe", seconds)
+    OCR_STAGE_SECONDS.labels("probe").observe(seconds)
+    return dpi, text_height
+
+def _page_windows(page_numbers: list[int], window: int):
+    """Split sorted page numbers into (first, last) runs of consecutive pages, at most window long"""
+    first = last = None
+    for page in page_numbers:
+        if first is not None and page == last + 1 and page - first < window:
+            last = page
+            continue
+        if first is not None:
+            yield first, last
+        first = last = page
+    if first is not None:
+        yield first, last
+
+def ocr_pdf_pages(path: str, page_numbers: list[int], stats: dict = None) -> dict[int, str]:
+    """
+    OCR the given pages of a PDF with bounded memory.
+
+    The render DPI is chosen once per document from the text height of the
+    first page to OCR (see image_preprocessing), so the downscale stage
+    reuses that height instead of measuring every page again. Pages are
+    rendered to temporary files OCR_PAGE_WINDOW at a time, using
+    OCR_RENDER_THREADS pdftoppm processes. Each page is OCR'd in the shared
+    process pool and deleted right after. The next window is rendered while
+    the previous one is OCR'd, and at most two windows exist at once.
+
+    When stats is given, it receives the DPI and the seconds spent per stage.
+    """
+    window = max(1, settings.OCR_PAGE_WINDOW)
+    pool = _get_ocr_pool()
+    pages = {}
+    pending = {}
+    timings = {}
+    start = time.time()
+    page_numbers = sorted(page_numbers)
+    dpi, text_height = choose_pdf_dpi(path, page_numbers[0], timings)
+
+    with tempfile.TemporaryDirectory(prefix="ocr-") as output_folder:
+        try:
+            for first, last in _page_windows(page_numbers, window):
+                render_start = time.perf_counter()
+                paths = convert_from_path(
+                    path,
+                    dpi=dpi,
+                    first_page=first,
+                    last_page=last,
+                    thread_count=settings.OCR_RENDER_THREADS,
+                    output_folder=output_folder,
+                    paths_only=True,
+                )
+                render_seconds = time.perf_counter() - render_start
+                add_timing(timings, "render", render_seconds)
+                for page, image_path in enumerate(paths, start=first):
+                    OCR_STAGE_SECONDS.labels("render").observe(render_seconds / len(paths))
+                    pending[pool.submit(_ocr_page_file, image_path, text_height)] = page
+                _collect(pending, pages, keep=window, timings=timings)
+            _collect(pending, pages, keep=0, timings=timings)
+        except BaseException:
+            for future in pending:
+                future.cancel()
+            raise
+
+    logger.info(f"OCR'd {len(pages)} pages at {dpi} DPI in {time.time() - start:.2f}s")
+    if stats is not None:
+        stats["dpi"] = dpi
+        stats["timings"] = timings
+    return pages
+
+def extract_text_layer(path: str) -> list[str]:
+    """Embedded text of each page via poppler's pdftotext; [] if it cannot be read"""
+    try:
+        result = subprocess.run(
+            ["pdftotext", "-layout", "-enc", "UTF-8", path, "-"],
+            capture_output=True, check=True, timeout=120,
+        )
+    except (OSError, subprocess.SubprocessError) as e:
+        logger.warning(f"Could not read the text layer of {path}: {e}")
+        return []
+    # Every page ends with a form feed
+    return result.stdout.decode("utf-8", "replace").split("\f")[:-1]
+
+def is_usable_text(text: str) -> bool:
+    """Whether a page's text layer is real text rather than empty or garbled"""
+    chars = [c for c in text if not c.isspace()]
+    if len(chars) < settings.TEXT_LAYER_MIN_CHARS:
+        return False
+    printable = sum(c.isprintable() and c != "\ufffd" for c in chars)
+    return printable / len(chars) >= settings.TEXT_LAYER_MIN_PRINTABLE
+
+def extract_pages(path: str, stats: dict = None) -> list[PageText]:
+    """
+    Text of every page. PDF pages with a usable text layer use it directly;
+    only image-only pages are rendered and OCR'd.
+    """
+    if not path.endswith(".pdf"):
+        timings = {}
+        text = extract_text_from_image(path, timings)
+        if stats is not None:
+            stats["timings"] = timings
+        return [PageText(1, text, OCR)]
+
+    layer = extract_text_layer(path) if settings.PDF_TEXT_LAYER else []
+    page_count = len(layer) or pdfinfo_from_path(path)["Pages"]
+    native = {page: text for page, text in enumerate(layer, start=1) if is_usable_text(text)}
+
+    missing = [page for page in range(1, page_count + 1) if page not in native]
+    ocr = ocr_pdf_pages(path, missing, stats) if missing else {}
+    logger.info(f"{path}: {len(native)} pages from the text layer, {len(missing)} OCR'd")
+
+    return [
+        PageText(page, native[page], TEXT_LAYER) if page in native else PageText(page, ocr[page], OCR)
+        for page in range(1, page_count + 1)
+    ]
+
+def extract_document(path: str) -> tuple[list[PageText], dict]:
+    """Text of every page plus stats on which pages took which extraction path"""
+    start = time.time()
+    ocr_stats = {}
+    pages = extract_pages(path, ocr_stats)
+    stats = {
+        "pages": len(pages),
+        TEXT_LAYER: [p.page for p in pages if p.method == TEXT_LAYER],
+        OCR: [p.page for p in pages if p.method == OCR],
+        "seconds": round(time.time() - start, 3),
+    }
+    if "dpi" in ocr_stats:
+        stats["dpi"] = ocr_stats["dpi"]
+    if ocr_stats.get("timings"):
+        # Summed over pages, so stages in the pool can exceed wall time
+        stats["stage_seconds"] = {
+            stage: round(seconds, 3) for stage, seconds in ocr_stats["timings"].items()
+        }
+    return pages, stats
+
+def join_pages(pages: list[PageText]) -> str:
+    return "\n".join(p.text for p in pages)
 
 def extract_text(path: str) -> str:
-    if path.endswith(".pdf"):
-        images = convert_from_path(path)
-        text = ""
-        for img in images:
-            text += pytesseract.image_to_string(img)
-        return text
-    else:
-        return extract_text_from_image(path)
+    return join_pages(extract_document(path)[0])
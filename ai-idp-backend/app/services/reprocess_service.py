@@ -0,0 +1,77 @@
+"""
+Selective reprocessing: re-run chosen ingestion stages over a filtered set
+of documents
+
+Each selected document gets a job tagged with a batch id. The ingestion
+workers run the jobs in parallel like any other; job_queue.batch_progress()
+reports on the batch.
+"""
+import logging
+import uuid
+
+from sqlalchemy.orm import Session
+
+from app.db.models import Document, Job
+from app.workers.checkpoints import document_checkpoints, expand_stages, is_current
+from app.workers.job_queue import BULK, QUEUED, RUNNING, enqueue_job
+
+logger = logging.getLogger(__name__)
+
+
+def select_documents(
+    db: Session,
+    stages: list[str],
+    document_ids: list[int] = None,
+    status: str = None,
+    owner_id: int = None,
+    stale_only: bool = False,
+    limit: int = None,
+) -> list[int]:
+    """
+    Ids of the documents to reprocess, oldest first.
+
+    stale_only keeps documents where one of the stages is not current:
+    failed, never run, or run with a different model than the configured one.
+    A completed document from before checkpoints counts as extracted, as in
+    the ingestion pipeline.
+    """
+    query = db.query(
+        Document.id, Document.stages, Document.status, Document.cleaned_text.isnot(None)
+    ).order_by(Document.id)
+    if document_ids:
+        query = query.filter(Document.id.in_(document_ids))
+    if status:
+        query = query.filter(Document.status == status)
+    if owner_id is not None:
+        query = query.filter(Document.owner_id == owner_id)
+
+    selected = []
+    for document_id, stages_done, document_status, has_text in query.yield_per(1000):
+        checkpoints = document_checkpoints(stages_done, document_status, has_text)
+        if stale_only and all(is_current(checkpoints.get(stage), stage) for stage in stages):
+            continue
+        selected.append(document_id)
+        if limit and len(selected) >= limit:
+            break
+    return selected
+
+
+def start_reprocessing(db: Session, stages: list[str], **filters) -> dict:
+    """Queue a job per selected document; documents with a queued or running job are skipped"""
+    expand_stages(stages)  # ValueError on unknown stages
+    document_ids = select_documents(db, stages, **filters)
+    busy = {
+        document_id for (document_id,) in
+        db.query(Job.document_id).filter(Job.status.in_((QUEUED, RUNNING))).distinct()
+    }
+
+    batch_id = str(uuid.uuid4())
+    queued = [document_id for document_id in document_ids if document_id not in busy]
+    for document_id in queued:
+        enqueue_job(db, document_id, stages=list(stages), batch_id=batch_id, priority=BULK)
+    db.commit()
+    logger.info(
+        f"Reprocessing batch {batch_id}: stages {', '.join(stages)} queued for {len(queued)} documents "
+        f"({len(document_ids) - len(queued)} skipped, already queued)"
+    )
+    return {"batch_id": batch_id, "stages": list(stages), "queued": len(queued), "skipped": len(document_ids) - len(queued)}
@@ -1,24 +1,85 @@
 # Search service
-from app.services.embedding_service import index, doc_id_map
-import numpy as np
 import logging
 
-from app.services.embedding_service import generate_embeddings
+from sqlalchemy import case, func
+
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.core.vector_store import ChunkHit, vector_store
+from app.services.embedding_service import generate_embeddings, lowercases_input
 from app.db.session import get_db
 from app.db.models import Document
 
 logger = logging.getLogger(__name__)
 
-def semantic_search(query: str, limit: int):
+# Query vectors, keyed by (model id, normalized query)
+query_embedding_cache = LRUCache("query_embedding", settings.QUERY_EMBEDDING_CACHE_SIZE)
+# Final result lists, keyed by (normalized query, limit, nprobe, index version)
+search_result_cache = LRUCache(
+    "search_result", settings.SEARCH_RESULT_CACHE_SIZE, ttl=settings.SEARCH_RESULT_CACHE_TTL
+)
+
+def normalize_query(query: str) -> str:
+    # Spacing never changes the query vector, and case only with a cased tokenizer
+    if lowercases_input():
+        query = query.lower()
+    return " ".join(query.split())
+
+def embed_query(query: str):
+    """Return the query vector, encoding it only on a cache miss"""
+    normalized = normalize_query(query)
+    key = (settings.EMBEDDING_MODEL, normalized)
+    vector = query_embedding_cache.get(key)
+    if vector is None:
+        vector = generate_embeddings(normalized)
+        if vector is not None:
+            query_embedding_cache.set(key, vector)
+    return vector
+
+def aggregate_hits(
+    hits: list[ChunkHit],
+    limit: int,
+    method: str = settings.SEARCH_AGGREGATION,
+    top_n: int = settings.SEARCH_AGGREGATION_TOP_N,
+) -> list[ChunkHit]:
+    """
+    Group chunk hits per document and rank the documents.
+
+    "max" scores a document by its best chunk; "mean_top_n" by the mean of
+    its best top_n chunks among the hits. Each result carries the best chunk
+    of its document, with the document score.
+    """
+    by_document: dict[int, list[ChunkHit]] = {}
+    for hit in hits:  # already best first
+        by_document.setdefault(hit.document_id, []).append(hit)
+
+    ranked = []
+    for document_hits in by_document.values():
+        if method == "mean_top_n":
+            best = document_hits[:top_n]
+            score = sum(hit.score for hit in best) / len(best)
+        else:
+            score = document_hits[0].score
+        ranked.append(document_hits[0]._replace(score=score))
+
+    ranked.sort(key=lambda hit: hit.score, reverse=True)
+    return ranked[:limit]
+
+def semantic_search(query: str, limit: int, nprobe: int = None):
     """Perform semantic search on indexed documents."""
-    # Use the same index that embeddings are added to during document processing
-    if index.ntotal == 0:
+    # Use the same store that document processing writes to
+    if vector_store.ntotal == 0:
         logger.warning("No documents indexed yet")
         return []
 
-    # 1. Embed query (pass document_id=None to only get vector, don't add to index)
+    # 1. Embed query
     try:
-        query_vector = generate_embeddings(query, document_id=None)
+        # Any vector added or removed since moves the version and misses the cache
+        cache_key = (normalize_query(query), limit, nprobe, vector_store.version)
+        results = search_result_cache.get(cache_key)
+        if results is not None:
+            return results
+        query_vector = embed_query(query)
     except Exception as e:
         logger.error(f"Failed to embed query: {e}")
         return []
@@ -26,50 +87,76 @@ def semantic_search(query: str, limit: int):
     if query_vector is None:
         return []
     
-    query_vector = query_vector.reshape(1, -1)
-
-    # 2. FAISS search (using the same index as document processing)
+    # 2. FAISS search over chunks, grouped back into documents
     try:
-        scores, indices = index.search(query_vector, limit)
+        chunk_hits = vector_store.search(
+            query_vector, limit * settings.SEARCH_CHUNK_CANDIDATES, nprobe=nprobe
+        )
+        hits = aggregate_hits(chunk_hits, limit)
     except Exception as e:
         logger.error(f"FAISS search failed: {e}")
         return []
 
-    results = []
-    db = next(get_db())
+    # 3. One bulk query for the result rows
+    results = hydrate_hits(hits)
+    search_result_cache.set(cache_key, results)
+    return results
+
+def hydrate_hits(hits: list[ChunkHit]) -> list[dict]:
+    """
+    Turn ranked hits into search results with one bulk query.
+
+    Only id, classification and the snippet are read; the snippet is cut
+    SQL-side, so the large text columns never leave the database.
+    """
+    if not hits:
+        return []
+
+    # substr() is 1-based; hits without offsets fall back to the first 200 chars
+    snippet_start = case(
+        {hit.document_id: hit.start + 1 for hit in hits},
+        value=Document.id,
+        else_=1,
+    )
+    snippet_length = case(
+        {hit.document_id: hit.end - hit.start if hit.end > hit.start else 200 for hit in hits},
+        value=Document.id,
+        else_=200,
+    )
 
+    db = next(get_db())
     try:
-        for score, idx in zip(scores[0], indices[0]):
-            if idx == -1:
-                continue
-
-            if idx >= len(doc_id_map):
-                logger.warning(f"Index {idx} out of range for doc_id_map")
-                continue
-
-            doc_id = doc_id_map[idx]
-            document = db.query(Document).filter(Document.id == doc_id).first()
-
-            if not document:
-                logger.warning(f"Document {doc_id} not found in database")
-                continue
-
-            # Extract classification label safely
-            classification_label = None
-            if document.classification:
-                if isinstance(document.classification, dict):
-                    classification_label = document.classification.get("label")
-                else:
-                    # If it's stored as string, try to parse it
-                    classification_label = str(document.classification)
-
-            results.append({
-                "document_id": doc_id,
-                "score": float(score),
-                "snippet": document.cleaned_text[:200] if document.cleaned_text else "",
-                "classification": classification_label
-            })
+        rows = db.query(
+            Document.id,
+            Document.classification,
+            func.substr(Document.cleaned_text, snippet_start, snippet_length).label("snippet"),
+        ).filter(Document.id.in_([hit.document_id for hit in hits])).all()
     finally:
         db.close()
 
-    return results
\ No newline at end of file
+    rows_by_id = {row.id: row for row in rows}
+    results = []
+    # Keep the FAISS rank order
+    for hit in hits:
+        row = rows_by_id.get(hit.document_id)
+        if row is None:
+            logger.warning(f"Document {hit.document_id} not found in database")
+            continue
+
+        # Extract classification label safely
+        classification_label = None
+        if row.classification:
+            if isinstance(row.classification, dict):
+                classification_label = row.classification.get("label")
+            else:
+                # If it's stored as string, try to parse it
+                classification_label = str(row.classification)
+
+        results.append({
+            "document_id": hit.document_id,
+            "score": hit.score,
+            "snippet": row.snippet or "",
+            "classification": classification_label
+        })
+
+    return results
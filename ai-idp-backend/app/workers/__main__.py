@@ -0,0 +1,69 @@
+"""
+Run the ingestion workers: python -m app.workers [--processes N]
+
+Starts N worker processes that claim document jobs from the database queue,
+and restarts any that die. SIGINT/SIGTERM stop them once their in-flight
+jobs are done.
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+import time
+
+from app.core.config import settings
+from app.core.logging import setup_logging
+from app.services.ocr_service import available_cores
+
+logger = logging.getLogger(__name__)
+
+SHUTDOWN_TIMEOUT = 60  # seconds a worker gets to finish its in-flight jobs on shutdown
+
+
+def _worker_main(stop, slot: int) -> None:
+    from app.workers.worker import run_worker
+
+    run_worker(stop, slot)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=settings.WORKER_PROCESSES)
+    args = parser.parse_args()
+
+    setup_logging()
+    # Split the cores between the workers' OCR pools instead of giving each all of them
+    os.environ.setdefault("OCR_WORKERS", str(max(1, available_cores() // args.processes)))
+
+    context = multiprocessing.get_context("spawn")
+    stop = context.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+
+    def start(slot: int):
+        process = context.Process(target=_worker_main, args=(stop, slot), name=f"ingest-worker-{slot}")
+        process.start()
+        return process
+
+    processes = [start(slot) for slot in range(args.processes)]
+    logger.info(f"Started {args.processes} ingestion workers")
+
+    while not stop.is_set():
+        stop.wait(1)
+        for slot, process in enumerate(processes):
+            if not process.is_alive() and not stop.is_set():
+                logger.warning(f"Worker {process.name} exited with {process.exitcode}, restarting")
+                processes[slot] = start(slot)
+
+    logger.info("Stopping ingestion workers...")
+    deadline = time.monotonic() + SHUTDOWN_TIMEOUT
+    for process in processes:
+        process.join(max(0.0, deadline - time.monotonic()))
+        if process.is_alive():
+            logger.warning(f"Worker {process.name} did not stop in time, killing it")
+            process.kill()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Ingestion stage checkpoints
+
+Document.stages maps each checkpointed stage to its last outcome, e.g.
+{"embed": {"status": "completed", "model": "all-MiniLM-L6-v2|torch",
+"finished_at": "...", "chunks": 12}}. A stage is current when it completed
+(or had nothing to do) with the model that is configured now.
+"""
+from app.services.classification_service import classifier_model_id
+from app.services.embedding_service import embedding_model_id
+
+EXTRACT = "extract"
+EMBED = "embed"
+CLASSIFY = "classify"
+CHECKPOINTED_STAGES = (EXTRACT, EMBED, CLASSIFY)
+# Stages whose input another stage produces, and so must re-run after it
+DOWNSTREAM = {EXTRACT: (EMBED, CLASSIFY), EMBED: (), CLASSIFY: ()}
+DONE = ("completed", "skipped")
+
+
+def stage_model(stage: str):
+    """The model a stage's checkpoint must match to count as current"""
+    if stage == EMBED:
+        return embedding_model_id()
+    if stage == CLASSIFY:
+        return classifier_model_id()
+    return None
+
+
+def expand_stages(stages) -> set[str]:
+    """stages plus every stage that consumes their output"""
+    expanded = set()
+    for stage in stages or ():
+        if stage not in DOWNSTREAM:
+            raise ValueError(f"Unknown stage: {stage}")
+        expanded.add(stage)
+        expanded.update(DOWNSTREAM[stage])
+    return expanded
+
+
+def document_checkpoints(stages: dict, status: str, has_text: bool) -> dict:
+    """
+    A document's checkpoints. Documents processed before checkpoints existed
+    have none; when such a document completed, its text counts as extracted.
+    """
+    checkpoints = dict(stages or {})
+    if not checkpoints and status == "completed" and has_text:
+        checkpoints[EXTRACT] = {"status": "completed"}
+    return checkpoints
+
+
+def is_current(checkpoint: dict, stage: str) -> bool:
+    """Whether a stage's checkpoint is complete and made with the configured model"""
+    if not checkpoint or checkpoint.get("status") not in DONE:
+        return False
+    model = stage_model(stage)
+    return model is None or checkpoint.get("model") == model
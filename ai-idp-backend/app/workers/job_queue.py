@@ -0,0 +1,307 @@
+"""
+Durable job queue on the application database
+
+Jobs are claimed atomically: on Postgres the candidate row is locked with
+FOR UPDATE SKIP LOCKED, so concurrent workers never wait on each other.
+SQLite has no row locks, so the claim is a compare-and-set UPDATE that
+re-checks claimability and only succeeds for one worker. The same code
+path runs on both.
+
+A claimed job holds a lease that the worker renews with heartbeats. A job
+whose lease lapses (crashed or stuck worker) becomes claimable again.
+Failed jobs are retried with exponential backoff until max_attempts.
+
+Scheduling: the highest priority class with due jobs goes first
+(interactive uploads before bulk backfills). Within it, the document owner
+with the fewest running jobs is served next (fair share), so one user's
+bulk load cannot starve another's single upload; ties go to whoever has
+waited longest. An owner's own jobs run oldest first, or cheapest first
+(page count, else file size) with SCHEDULER_SHORTEST_JOB_FIRST.
+
+The summary the scheduling reads (due jobs per class and owner, running
+jobs per owner) is an aggregate over the whole queue, so each worker
+reuses it for SCHEDULER_REFRESH_SECONDS between claims and counts its own
+claims into it; the claim itself is a single indexed lookup.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+import logging
+import random
+import time
+
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.models import Document, Job
+from app.metrics import JOB_QUEUE_DEPTH, JOB_QUEUE_WAIT
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+PROCESS_DOCUMENT = "process_document"
+
+# Priority classes, in claim order
+INTERACTIVE = "interactive"
+BULK = "bulk"
+PRIORITIES = (INTERACTIVE, BULK)
+
+CLAIM_ATTEMPTS = 5  # compare-and-set races lost before giving up for this poll
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def enqueue_job(
+    db: Session,
+    document_id: int,
+    kind: str = PROCESS_DOCUMENT,
+    stages: list[str] = None,
+    batch_id: str = None,
+    priority: str = INTERACTIVE,
+) -> Job:
+    """
+    Add a job to the session (sync or async); it becomes visible when the
+    caller commits.
+
+    stages are re-run even if their checkpoint is complete; without them
+    the job resumes at the first incomplete stage.
+    """
+    job = Job(
+        document_id=document_id,
+        kind=kind,
+        stages=stages,
+        batch_id=batch_id,
+        priority=priority,
+        status=QUEUED,
+        attempts=0,
+        max_attempts=settings.JOB_MAX_ATTEMPTS,
+        run_after=utcnow(),
+    )
+    db.add(job)
+    return job
+
+
+def _lapsed(now: datetime):
+    return and_(Job.status == RUNNING, Job.lease_expires_at < now)
+
+
+def _due(now: datetime):
+    return and_(Job.status == QUEUED, Job.run_after <= now)
+
+
+def _claimable(now: datetime):
+    return or_(_lapsed(now), _due(now))
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite returns naive datetimes (stored as UTC)
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def estimated_cost():
+    """SQL expression for a job's expected work in pages, from the upload's page count or size"""
+    return func.coalesce(Document.page_count, Document.size_bytes / settings.SCHEDULER_BYTES_PER_PAGE, 1)
+
+
+class _QueueSummary:
+    """
+    Due jobs per (priority, owner_id) and running jobs per owner, as last
+    read from the database by this worker
+    """
+
+    def __init__(self):
+        self.groups: dict[tuple[str, int], datetime] = {}  # oldest due run_after
+        self.running: dict[int, int] = {}
+        self.expires_at = 0.0
+
+    def invalidate(self) -> None:
+        self.expires_at = 0.0
+
+    def refresh(self, db: Session, now: datetime) -> None:
+        groups = db.execute(
+            select(Job.priority, Document.owner_id, func.min(Job.run_after), func.count(Job.id))
+            .join(Document, Document.id == Job.document_id)
+            .where(_claimable(now))
+            .group_by(Job.priority, Document.owner_id)
+        ).all()
+        depth = dict.fromkeys(PRIORITIES, 0)
+        for priority, _, _, count in groups:
+            depth[priority] = depth.get(priority, 0) + count
+        for priority, count in depth.items():
+            JOB_QUEUE_DEPTH.labels(priority).set(count)
+
+        self.groups = {(priority, owner_id): _as_utc(run_after) for priority, owner_id, run_after, _ in groups}
+        self.running = dict(db.execute(
+            select(Document.owner_id, func.count(Job.id))
+            .join(Document, Document.id == Job.document_id)
+            .where(Job.status == RUNNING, Job.lease_expires_at >= now)
+            .group_by(Document.owner_id)
+        ).all()) if groups else {}
+        self.expires_at = time.monotonic() + settings.SCHEDULER_REFRESH_SECONDS
+
+    def next_group(self, db: Session, now: datetime) -> Optional[tuple[str, int]]:
+        """(priority, owner_id) to claim from: highest class, then fewest running jobs, then longest wait"""
+        # An empty queue is re-read on every poll, so new work is never held back
+        if not self.groups or time.monotonic() >= self.expires_at:
+            self.refresh(db, now)
+        if not self.groups:
+            return None
+        rank = {priority: i for i, priority in enumerate(PRIORITIES)}
+        return min(
+            self.groups,
+            key=lambda group: (
+                rank.get(group[0], len(PRIORITIES)), self.running.get(group[1], 0), self.groups[group],
+            ),
+        )
+
+    def claimed(self, owner_id: int) -> None:
+        self.running[owner_id] = self.running.get(owner_id, 0) + 1
+
+
+_summary = _QueueSummary()
+
+
+def claim_job(db: Session, worker_id: str, lease_seconds: int = settings.JOB_LEASE_SECONDS) -> Optional[Job]:
+    """Take the next due job (or one with a lapsed lease) for worker_id, in scheduling order"""
+    for _ in range(CLAIM_ATTEMPTS):
+        now = utcnow()
+        group = _summary.next_group(db, now)
+        if group is None:
+            db.rollback()
+            return None
+
+        priority, owner_id = group
+        order = [Job.run_after, Job.id]
+        if settings.SCHEDULER_SHORTEST_JOB_FIRST:
+            order.insert(0, estimated_cost())
+        # Lapsed leases first, then due jobs: one status per query, so the
+        # (status, run_after) index yields them in order instead of a sort
+        for claimable in (_lapsed(now), _due(now)):
+            candidate = db.execute(
+                select(Job.id, Job.status, Job.run_after)
+                .join(Document, Document.id == Job.document_id)
+                .where(claimable, Job.priority == priority, Document.owner_id == owner_id)
+                .order_by(*order)
+                .limit(1)
+                .with_for_update(skip_locked=True, of=Job)
+            ).first()
+            if candidate is not None:
+                break
+        if candidate is None:
+            # The group drained since the summary was read
+            _summary.invalidate()
+            db.rollback()
+            continue
+        job_id, previous_status, run_after = candidate
+
+        claimed = db.execute(
+            update(Job)
+            .where(Job.id == job_id, _claimable(now))
+            .values(
+                status=RUNNING,
+                locked_by=worker_id,
+                lease_expires_at=now + timedelta(seconds=lease_seconds),
+                attempts=Job.attempts + 1,
+                updated_at=now,
+            )
+        ).rowcount
+        db.commit()
+        if claimed == 1:
+            _summary.claimed(owner_id)
+            if previous_status == QUEUED:
+                # Reclaimed leases are not counted: their wait is the dead worker's run time
+                JOB_QUEUE_WAIT.labels(priority).observe(max(0.0, (now - _as_utc(run_after)).total_seconds()))
+            return db.get(Job, job_id)
+    return None
+
+
+def heartbeat(db: Session, job_id: int, worker_id: str, lease_seconds: int = settings.JOB_LEASE_SECONDS) -> bool:
+    """Extend the lease; False means the job was reclaimed by another worker"""
+    now = utcnow()
+    renewed = db.execute(
+        update(Job)
+        .where(Job.id == job_id, Job.locked_by == worker_id, Job.status == RUNNING)
+        .values(lease_expires_at=now + timedelta(seconds=lease_seconds), updated_at=now)
+    ).rowcount
+    db.commit()
+    return renewed == 1
+
+
+def complete_job(db: Session, job_id: int, worker_id: str) -> bool:
+    done = db.execute(
+        update(Job)
+        .where(Job.id == job_id, Job.locked_by == worker_id, Job.status == RUNNING)
+        .values(status=SUCCEEDED, lease_expires_at=None, last_error=None, updated_at=utcnow())
+    ).rowcount
+    db.commit()
+    return done == 1
+
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff with jitter, in seconds"""
+    delay = settings.JOB_RETRY_BACKOFF_SECONDS * 2 ** max(attempts - 1, 0)
+    return min(delay, settings.JOB_RETRY_BACKOFF_MAX_SECONDS) * random.uniform(0.8, 1.2)
+
+
+def fail_job(db: Session, job: Job, worker_id: str, error: str) -> str:
+    """Schedule a retry, or mark the job failed once it is out of attempts; returns the new status"""
+    now = utcnow()
+    if job.attempts >= job.max_attempts:
+        values = {"status": FAILED, "lease_expires_at": None}
+    else:
+        values = {
+            "status": QUEUED,
+            "locked_by": None,
+            "lease_expires_at": None,
+            "run_after": now + timedelta(seconds=retry_delay(job.attempts)),
+        }
+    updated = db.execute(
+        update(Job)
+        .where(Job.id == job.id, Job.locked_by == worker_id, Job.status == RUNNING)
+        .values(last_error=error[:2000], updated_at=now, **values)
+    ).rowcount
+    db.commit()
+    if not updated:
+        logger.warning(f"Job {job.id} was reclaimed before worker {worker_id} could record its failure")
+    return values["status"]
+
+
+def batch_progress(db: Session, batch_id: str, owner_id: int = None) -> Optional[dict]:
+    """Job counts per status for a batch, or None if it has no jobs (visible to owner_id)"""
+    query = db.query(Job.status, func.count(Job.id)).filter(Job.batch_id == batch_id)
+    if owner_id is not None:
+        query = query.join(Document, Document.id == Job.document_id).filter(Document.owner_id == owner_id)
+    counts = dict(query.group_by(Job.status).all())
+    if not counts:
+        return None
+    total = sum(counts.values())
+    return {
+        "batch_id": batch_id,
+        "total": total,
+        "queued": counts.get(QUEUED, 0),
+        "running": counts.get(RUNNING, 0),
+        "succeeded": counts.get(SUCCEEDED, 0),
+        "failed": counts.get(FAILED, 0),
+        "done": counts.get(SUCCEEDED, 0) + counts.get(FAILED, 0) == total,
+    }
+
+
+def queue_stats(db: Session, window_seconds: int) -> dict[str, tuple[int, int]]:
+    """{priority: (queued jobs, jobs finished in the last window_seconds)} for admission control"""
+    since = utcnow() - timedelta(seconds=window_seconds)
+    queued = dict(
+        db.query(Job.priority, func.count(Job.id)).filter(Job.status == QUEUED).group_by(Job.priority).all()
+    )
+    finished = dict(
+        db.query(Job.priority, func.count(Job.id))
+        .filter(Job.status.in_((SUCCEEDED, FAILED)), Job.updated_at >= since)
+        .group_by(Job.priority)
+        .all()
+    )
+    return {priority: (queued.get(priority, 0), finished.get(priority, 0)) for priority in queued.keys() | finished.keys()}
@@ -1,111 +1,302 @@
 # Background tasks
+#
+# Ingestion is split into stages (prepare -> extract -> embed -> classify ->
+# persist) that work on a DocumentWork. The worker runs them as a pipeline
+# with a thread pool per stage; process_document() runs them back to back.
+# save_results() then writes the document, once its vectors are durable.
+#
+# extract, embed and classify are checkpointed in Document.stages (and the
+# page texts in document_pages), so a retry resumes at the first incomplete
+# stage and reprocessing can re-run single stages.
+from concurrent.futures import Future
+from datetime import datetime, timezone
 from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.pipeline import Stage
 from app.db.session import SessionLocal
-from app.db.models import Document
-from app.services.classification_service import classify_text
-from app.services.ocr_service import extract_text
+from app.db.models import Document, DocumentPage
+from app.services.classification_service import classify
+from app.services.ocr_service import extract_document, join_pages
 from app.services.nlp_service import clean_text_nlp
 from app.services.text_cleaning import clean_text
-from app.services.embedding_service import generate_embeddings
-from app.core.vector_store import save_vector_store
+from app.services.embedding_service import embed_document
+from app.services.document_service import find_completed_duplicate
+from app.core.vector_store import vector_store
+from app.workers.checkpoints import (
+    CHECKPOINTED_STAGES, CLASSIFY, EMBED, EXTRACT, document_checkpoints, expand_stages, is_current, stage_model
+)
 import logging
 import time
 import uuid
 logger = logging.getLogger(__name__)
 
-def process_document(document_id: int):
-    trace_id = str(uuid.uuid4())
-    start_time = time.perf_counter()
-    db: Session = SessionLocal()
+class DocumentWork:
+    """A document moving through the ingestion stages, with the results gathered so far"""
+
+    def __init__(self, document_id: int, job=None, rerun=None, rerun_since: datetime = None):
+        self.document_id = document_id
+        self.job = job
+        self.rerun = expand_stages(rerun)  # run even when checkpointed...
+        self.rerun_since = rerun_since  # ...unless the checkpoint is newer than this (a retry)
+        self.trace_id = str(uuid.uuid4())
+        self.start_time = time.perf_counter()
+        self.storage_path = None
+        self.stages = {}  # checkpoints, as stored in Document.stages
+        self.ran = set()  # stages run in this pass
+        self.raw_text = None
+        self.cleaned_text = None
+        self.vectors = None
+        self.spans = None
+        self.classification = None
+        self.vector_write = None  # Future of the vector store change queued by persist_stage
+        self.reused_embedding_status = None  # set when prepare_stage copied a duplicate's results
+        self.finished = False  # nothing left to do (missing document, reused or checkpointed results)
+        self.failed = False  # the document is marked failed by save_results()
+        self.error = None
+
+    @property
+    def active(self) -> bool:
+        return not (self.finished or self.failed)
+
+    @property
+    def has_text(self) -> bool:
+        return bool(self.cleaned_text and self.cleaned_text.strip())
+
+    def pending(self, stage: str) -> bool:
+        checkpoint = self.stages.get(stage)
+        if not is_current(checkpoint, stage):
+            return True
+        if stage not in self.rerun:
+            return False
+        if self.rerun_since is None or "finished_at" not in checkpoint:
+            return True
+        since = self.rerun_since
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)  # SQLite returns naive UTC
+        return datetime.fromisoformat(checkpoint["finished_at"]) < since
+
+    def should_run(self, stage: str) -> bool:
+        return self.active and self.pending(stage)
+
+    def record(self, stage: str, status: str, **info) -> None:
+        """Checkpoint a stage's outcome (saved with the document)"""
+        self.stages[stage] = {
+            "status": status,
+            "finished_at": datetime.now(timezone.utc).isoformat(),
+            **({"model": stage_model(stage)} if stage_model(stage) else {}),
+            **info,
+        }
+        self.ran.add(stage)
+
+
+def prepare_stage(work: DocumentWork):
+    """Load the checkpoints, mark the document as processing, or finish it from an identical upload"""
+    trace_id, document_id = work.trace_id, work.document_id
     logger.info(f"Started processing document {document_id}")
-    document = None
+    db: Session = SessionLocal()
     try:
         document = db.query(Document).filter(Document.id == document_id).first()
         if not document:
             logger.error(f"Document {document_id} not found")
+            work.finished = True
+            work.error = f"Document {document_id} not found"
+            return
+
+        work.storage_path = document.storage_path
+        work.stages = document_checkpoints(document.stages, document.status, document.cleaned_text is not None)
+        if not work.pending(EXTRACT):
+            work.raw_text = document.raw_text
+            work.cleaned_text = document.cleaned_text
+        remaining = [stage for stage in CHECKPOINTED_STAGES if work.pending(stage)]
+        if not remaining:
+            logger.info(f"[TRACE {trace_id}] Document {document_id} has every stage checkpointed")
+            work.finished = True
             return
 
         document.status = "processing"
-        document.embedding_status = "processing"
+        if EMBED in remaining:
+            document.embedding_status = "processing"
         db.commit()
-        logger.info(f"[TRACE {trace_id}]Document {document_id} status set to processing")
+        logger.info(f"[TRACE {trace_id}]Document {document_id} status set to processing (stages: {', '.join(remaining)})")
 
-        # 1️⃣ OCR / Text extraction
-        logger.info(f"[TRACE {trace_id}]Extracting text from document {document_id}...")
-        try:
-            raw_text = extract_text(document.storage_path)
-            if not raw_text or not raw_text.strip():
-                logger.warning(f"No text extracted from document {document_id}")
-                raw_text = ""
-            
-            logger.info(f"[TRACE {trace_id}]Extracted {len(raw_text)} characters from document {document_id}")
-            cleaned = clean_text(raw_text)
-            document.raw_text = raw_text
-            document.cleaned_text = cleaned
-            db.commit()
-            logger.info(f"[TRACE {trace_id}]Text saved to database for document {document_id}")
-        except Exception as e:
-            logger.error(f"[TRACE {trace_id}]Text extraction failed for document {document_id}: {e}")
-            document.status = "failed"
-            document.embedding_status = "failed"
+        # 0️⃣ Identical file already processed: reuse its results
+        source = None if work.stages or work.rerun else find_completed_duplicate(db, document)
+        if source is not None:
+            work.vector_write, work.reused_embedding_status = reuse_results(document, source)
+            work.stages = dict(source.stages or {})
             db.commit()
+            work.finished = True
+            duration = time.perf_counter() - work.start_time
+            logger.info(
+                f"[TRACE {trace_id}] Document {document_id} reused the results of document "
+                f"{source.id} (same content) in {duration:.2f}s"
+            )
+    finally:
+        db.close()
+
+
+def extract_stage(work: DocumentWork):
+    # 1️⃣ OCR / Text extraction, checkpointed right away so retries skip it
+    if not work.should_run(EXTRACT):
+        return
+    trace_id, document_id = work.trace_id, work.document_id
+    logger.info(f"[TRACE {trace_id}]Extracting text from document {document_id}...")
+    try:
+        pages, extraction_stats = extract_document(work.storage_path)
+        raw_text = join_pages(pages)
+        if not raw_text.strip():
+            logger.warning(f"No text extracted from document {document_id}")
+            raw_text = ""
+
+        logger.info(
+            f"[TRACE {trace_id}]Extracted {len(raw_text)} characters from document {document_id} "
+            f"({len(extraction_stats['text_layer'])} text-layer pages, {len(extraction_stats['ocr'])} OCR'd)"
+        )
+        work.raw_text = raw_text
+        work.cleaned_text = clean_text(raw_text)
+        work.record(EXTRACT, "completed", pages=len(pages))
+        save_extraction(work, pages, extraction_stats)
+        logger.info(f"[TRACE {trace_id}]Text saved to database for document {document_id}")
+    except Exception as e:
+        logger.error(f"[TRACE {trace_id}]Text extraction failed for document {document_id}: {e}")
+        work.record(EXTRACT, "failed", error=str(e)[:500])
+        work.failed = True
+        work.error = f"Text extraction failed: {e}"
+
+
+def save_extraction(work: DocumentWork, pages, extraction_stats: dict):
+    """Store the page texts and the extraction checkpoint"""
+    db: Session = SessionLocal()
+    try:
+        document = db.query(Document).filter(Document.id == work.document_id).one()
+        db.query(DocumentPage).filter(DocumentPage.document_id == work.document_id).delete()
+        db.add_all(
+            DocumentPage(document_id=work.document_id, page_number=p.page, text=p.text, method=p.method)
+            for p in pages
+        )
+        document.raw_text = work.raw_text
+        document.cleaned_text = work.cleaned_text
+        document.extraction_stats = extraction_stats
+        document.page_count = len(pages)
+        document.stages = {**(document.stages or {}), EXTRACT: work.stages[EXTRACT]}
+        db.commit()
+    finally:
+        db.close()
+
+
+def embed_stage(work: DocumentWork):
+    # 2️⃣ Embeddings (stored by the persist stage)
+    if not work.should_run(EMBED):
+        return
+    trace_id, document_id = work.trace_id, work.document_id
+    if not work.has_text:
+        logger.warning(f"[TRACE {trace_id}]Skipping embeddings for document {document_id} - no cleaned text")
+        work.record(EMBED, "skipped", chunks=0)
+        return
+
+    logger.info(f"[TRACE {trace_id}] Generating embeddings for document {document_id}...")
+    try:
+        work.vectors, work.spans = embed_document(work.cleaned_text)
+        chunks = 0 if work.vectors is None else len(work.vectors)
+        work.record(EMBED, "completed" if chunks else "skipped", chunks=chunks)
+        logger.info(f"[TRACE {trace_id}] Embeddings generated successfully for document {document_id}")
+    except Exception as e:
+        # Keep going with classification; the job is retried from this stage
+        logger.error(f"[TRACE {trace_id}] Embedding generation failed for document {document_id}: {e}", exc_info=True)
+        work.record(EMBED, "failed", error=str(e)[:500])
+        work.error = f"Embedding failed: {e}"
+
+
+def classify_stage(work: DocumentWork):
+    # 3️⃣ Classification
+    if not work.should_run(CLASSIFY):
+        return
+    trace_id, document_id = work.trace_id, work.document_id
+    if not work.has_text:
+        logger.warning(f"[TRACE {trace_id}] Skipping classification for document {document_id} - no cleaned text")
+        work.classification = None
+        work.record(CLASSIFY, "skipped")
+        return
+
+    logger.info(f"[TRACE {trace_id}] Classifying document {document_id}...")
+    try:
+        work.classification = classify(work.cleaned_text)
+    except Exception as e:
+        logger.error(f"[TRACE {trace_id}] Classification failed for document {document_id}: {e}", exc_info=True)
+        work.record(CLASSIFY, "failed", error=str(e)[:500])
+        work.error = work.error or f"Classification failed: {e}"
+        return
+    if work.classification:
+        work.record(CLASSIFY, "completed")
+        logger.info(f"[TRACE {trace_id}] Classification completed for document {document_id}: {work.classification}")
+    else:
+        work.record(CLASSIFY, "skipped")
+        logger.warning(f"[TRACE {trace_id}] Classification returned None for document {document_id}")
+
+
+def persist_stage(work: DocumentWork):
+    """
+    Queue the embedding change on the vector store without waiting for it.
+
+    Waiting here would leave one document per group commit, so every document
+    would wait out VECTOR_COMMIT_INTERVAL_MS on its own. save_results() writes
+    the document once work.vector_write is done, so the database never says
+    completed for vectors that are not durable.
+    """
+    if work.finished or EMBED not in work.ran:
+        return
+    status = work.stages[EMBED]["status"]
+    try:
+        if status == "completed":
+            work.vector_write = vector_store.add(work.document_id, work.vectors, work.spans, wait=False)
+        elif status == "skipped":
+            work.vector_write = vector_store.remove(work.document_id, wait=False)
+    except Exception as e:  # rejected before queueing (e.g. too many chunks)
+        work.vector_write = Future()
+        work.vector_write.set_exception(e)
+
+
+def save_results(work: DocumentWork):
+    """Store the results and final statuses, once the vector store change is durable"""
+    if work.finished and work.reused_embedding_status is None:
+        return
+    trace_id, document_id = work.trace_id, work.document_id
+    db: Session = SessionLocal()
+    document = None
+    try:
+        document = db.query(Document).filter(Document.id == document_id).first()
+        if not document:
+            logger.error(f"Document {document_id} disappeared while processing")
+            work.error = f"Document {document_id} not found"
             return
-        
-        # 2️⃣ Embeddings
-        logger.info(f"[TRACE {trace_id}] Generating embeddings for document {document_id}...")
-        try:
-            if document.cleaned_text and document.cleaned_text.strip():
-                try:
-                    generate_embeddings(document.cleaned_text, document_id=document.id)
-                    save_vector_store()
-                    document.embedding_status = "completed"
-                    logger.info(f"[TRACE {trace_id}] Embeddings generated successfully for document {document_id}")
-                except Exception as e:
-                    logger.error(f"[TRACE {trace_id}] Embedding generation failed for document {document_id}: {e}", exc_info=True)
-                    document.embedding_status = "failed"
-                    db.commit()
-                    raise  # Re-raise to be caught by outer exception handler
-            else:
-                logger.warning(f"[TRACE {trace_id}]Skipping embeddings for document {document_id} - no cleaned text")
-                document.embedding_status = "skipped"
-            db.commit()
-        except Exception as e:
-            logger.error(f"[TRACE {trace_id}]Embedding step failed for document {document_id}: {e}")
+
+        if work.vector_write is not None:
+            work.vector_write.result()  # blocks only on the sequential path
+        if work.reused_embedding_status is not None:
+            document.embedding_status = work.reused_embedding_status
+        elif EMBED in work.ran:
+            document.embedding_status = work.stages[EMBED]["status"]
+        elif work.failed:
             document.embedding_status = "failed"
-            db.commit()
-            # Don't return - continue to classification attempt
-        
-        # 3️⃣ Classification
-        logger.info(f"[TRACE {trace_id}] Classifying document {document_id}...")
-        try:
-            if document.cleaned_text and document.cleaned_text.strip():
-                try:
-                    classification = classify_text(document.cleaned_text)
-                    if classification:
-                        document.classification = classification
-                        logger.info(f"[TRACE {trace_id}] Classification completed for document {document_id}: {classification}")
-                    else:
-                        logger.warning(f"[TRACE {trace_id}] Classification returned None for document {document_id}")
-                        document.classification = None
-                except Exception as e:
-                    logger.error(f"[TRACE {trace_id}] Classification failed for document {document_id}: {e}", exc_info=True)
-                    document.classification = None
-            else:
-                logger.warning(f"[TRACE {trace_id}] Skipping classification for document {document_id} - no cleaned text")
-                document.classification = None
-        except Exception as e:
-            logger.error(f"[TRACE {trace_id}] Unexpected error during classification for document {document_id}: {e}", exc_info=True)
-            document.classification = None
+        if CLASSIFY in work.ran:
+            document.classification = work.classification
+        document.stages = work.stages
 
-        document.status = "completed"
+        failed = [stage for stage in CHECKPOINTED_STAGES if work.stages.get(stage, {}).get("status") == "failed"]
+        document.status = "failed" if work.failed or failed else "completed"
         db.commit()
-        duration = time.perf_counter() - start_time
-
-        logger.info(f"[TRACE {trace_id}] Document {document_id} processed successfully in {duration:.2f}s") 
+        duration = time.perf_counter() - work.start_time
+        if document.status == "completed":
+            logger.info(f"[TRACE {trace_id}] Document {document_id} processed successfully in {duration:.2f}s")
+        else:
+            logger.warning(f"[TRACE {trace_id}] Document {document_id} failed at {', '.join(failed) or 'an early stage'} after {duration:.2f}s")
 
     except Exception as e:
         logger.exception(f"[TRACE {trace_id}] Unexpected error processing document {document_id}: {e}")
+        work.failed = True
+        work.error = str(e)
         if document:
+            db.rollback()
             document.status = "failed"
             document.embedding_status = "failed"
             try:
@@ -118,3 +309,54 @@ def process_document(document_id: int):
             db.close()
         except Exception as e:
             logger.error(f"[TRACE {trace_id}] Error closing database session: {e}")
+
+
+def stage_failed(work: DocumentWork, error: Exception):
+    """A stage raised: skip the remaining work and let save_results() mark the document failed"""
+    logger.error(f"[TRACE {work.trace_id}] Unexpected error processing document {work.document_id}: {error}")
+    work.failed = True
+    work.error = str(error)
+
+
+def ingestion_stages() -> list[Stage]:
+    """The ingestion stages in order, with the threads each one gets in the worker pipeline"""
+    return [
+        Stage("prepare", prepare_stage, 1),
+        Stage("extract", extract_stage, settings.PIPELINE_EXTRACT_WORKERS),
+        Stage("embed", embed_stage, settings.PIPELINE_EMBED_WORKERS),
+        Stage("classify", classify_stage, settings.PIPELINE_CLASSIFY_WORKERS),
+        Stage("persist", persist_stage, 1),  # queues vector store writes; save_results() follows
+    ]
+
+
+def process_document(document_id: int, stages: list[str] = None) -> DocumentWork:
+    """Run the ingestion stages for one document on the calling thread (see DocumentWork.rerun)"""
+    work = DocumentWork(document_id, rerun=stages)
+    for stage in ingestion_stages():
+        try:
+            stage.handler(work)
+        except Exception as e:
+            stage_failed(work, e)
+    save_results(work)
+    return work
+
+
+def reuse_results(document: Document, source: Document) -> tuple[Future, str]:
+    """
+    Copy text, classification and vectors from a processed document with the
+    same content. The vector change is queued without waiting, like in
+    persist_stage; returns its Future and the embedding status that
+    save_results() stores with the checkpoints once it is durable.
+    """
+    document.raw_text = source.raw_text
+    document.cleaned_text = source.cleaned_text
+    document.classification = source.classification
+    document.extraction_stats = {**(source.extraction_stats or {}), "reused_from": source.id}
+
+    vectors, spans = vector_store.get(source.id)
+    if vectors is None and document.cleaned_text and document.cleaned_text.strip():
+        # ANN index (no exact vectors): the chunks hit the embedding cache
+        vectors, spans = embed_document(document.cleaned_text)
+    if vectors is not None:
+        return vector_store.add(document.id, vectors, spans, wait=False), "completed"
+    return vector_store.remove(document.id, wait=False), "skipped"
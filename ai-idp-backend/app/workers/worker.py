@@ -0,0 +1,171 @@
+"""
+Ingestion worker: claims jobs from the queue and feeds them through the
+staged ingestion pipeline
+"""
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import os
+import random
+import signal
+import socket
+import threading
+
+from app.core.config import settings
+from app.core.logging import setup_logging
+from app.db.models import Document
+from app.db.session import SessionLocal
+from app.workers.job_queue import (
+    PROCESS_DOCUMENT, claim_job, complete_job, fail_job, heartbeat
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _heartbeat_loop(in_flight: dict, lock: threading.Lock, worker_id: str, done: threading.Event) -> None:
+    """Renew the leases of every job in the pipeline"""
+    while not done.wait(settings.JOB_HEARTBEAT_SECONDS):
+        with lock:
+            job_ids = list(in_flight)
+        if not job_ids:
+            continue
+        db = SessionLocal()
+        try:
+            for job_id in job_ids:
+                if not heartbeat(db, job_id, worker_id):
+                    logger.warning(f"Worker {worker_id} lost the lease on job {job_id}")
+        except Exception as e:
+            logger.error(f"Heartbeat for jobs {job_ids} failed: {e}")
+        finally:
+            db.close()
+
+
+def finish_job(work, worker_id: str) -> None:
+    """Complete or fail the job of a document that left the pipeline"""
+    job = work.job
+    error = work.error
+    db = SessionLocal()
+    try:
+        if error is None:
+            # The stages record failures on the document instead of raising
+            status = db.query(Document.status).filter(Document.id == job.document_id).scalar()
+            if status != "completed":
+                error = f"Document {job.document_id} ended in status {status!r}"
+        if error is None:
+            complete_job(db, job.id, worker_id)
+            logger.info(f"Job {job.id} (document {job.document_id}) succeeded on attempt {job.attempts}")
+        else:
+            outcome = fail_job(db, job, worker_id, error)
+            logger.warning(f"Job {job.id} attempt {job.attempts}/{job.max_attempts} failed, now {outcome}: {error}")
+    finally:
+        db.close()
+
+
+def _fail_claimed(job, worker_id: str, error: str) -> None:
+    db = SessionLocal()
+    try:
+        fail_job(db, job, worker_id, error)
+    finally:
+        db.close()
+
+
+def run_worker(stop: threading.Event = None, slot: int = 0) -> None:
+    """Claim and run jobs until stop is set (SIGTERM sets it; in-flight jobs still finish)"""
+    from prometheus_client import start_http_server
+
+    from app.core.ai_models import start_model_loading
+    from app.core.pipeline import Pipeline
+    from app.core.vector_store import load_vector_store, save_vector_store
+    from app.workers.tasks import DocumentWork, ingestion_stages, save_results, stage_failed
+
+    setup_logging()
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    stop = stop or threading.Event()
+    # Finish the in-flight jobs on SIGTERM; SIGINT goes to the supervisor only
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    if settings.WORKER_METRICS_PORT:
+        start_http_server(settings.WORKER_METRICS_PORT + slot)
+
+    load_vector_store(refresh=False)
+    start_model_loading()
+
+    # A slot is held from claim until the job's results are saved
+    slots = threading.BoundedSemaphore(settings.PIPELINE_MAX_IN_FLIGHT)
+    in_flight = {}
+    in_flight_lock = threading.Lock()
+    # Saves results once their vectors are durable, so the persist stage never
+    # waits on a group commit; one thread keeps the database writes serial
+    finisher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="finish")
+
+    def finish(work) -> None:
+        try:
+            save_results(work)
+            finish_job(work, worker_id)
+        except Exception as e:
+            logger.exception(f"Could not finish job {work.job.id}: {e}")
+        finally:
+            with in_flight_lock:
+                in_flight.pop(work.job.id, None)
+            slots.release()
+
+    def on_done(work) -> None:
+        if work.vector_write is None:
+            finisher.submit(finish, work)
+        else:
+            work.vector_write.add_done_callback(lambda _: finisher.submit(finish, work))
+
+    pipeline = Pipeline(ingestion_stages(), settings.PIPELINE_QUEUE_SIZE, on_done=on_done, on_error=stage_failed)
+    pipeline.start()
+    heartbeats_done = threading.Event()
+    heartbeats = threading.Thread(
+        target=_heartbeat_loop, args=(in_flight, in_flight_lock, worker_id, heartbeats_done),
+        name="heartbeat", daemon=True,
+    )
+    heartbeats.start()
+    logger.info(f"Worker {worker_id} started")
+
+    poll_interval = settings.WORKER_POLL_INTERVAL_MS / 1000
+    try:
+        while not stop.is_set():
+            # Backpressure: no new claims while the pipeline is full
+            if not slots.acquire(timeout=poll_interval):
+                continue
+
+            db = SessionLocal()
+            try:
+                job = claim_job(db, worker_id)
+            except Exception as e:
+                logger.error(f"Worker {worker_id} could not claim a job: {e}")
+                job = None
+            finally:
+                db.close()
+
+            if job is None:
+                slots.release()
+                # Jitter keeps idle workers from polling in lockstep
+                stop.wait(poll_interval * random.uniform(0.5, 1.5))
+                continue
+            if job.attempts > job.max_attempts:
+                # Reclaimed after its worker died on the final attempt
+                _fail_claimed(job, worker_id, job.last_error or "Lease lapsed on the final attempt")
+                slots.release()
+                continue
+            if job.kind != PROCESS_DOCUMENT:
+                _fail_claimed(job, worker_id, f"Unknown job kind: {job.kind}")
+                slots.release()
+                continue
+
+            with in_flight_lock:
+                in_flight[job.id] = job
+            # A retried reprocessing job skips the stages its earlier attempts finished
+            pipeline.submit(DocumentWork(job.document_id, job, rerun=job.stages, rerun_since=job.created_at))
+    finally:
+        logger.info(f"Worker {worker_id} draining {len(in_flight)} in-flight jobs...")
+        pipeline.close()
+        # Commits the last vector writes, which hands their jobs to the finisher
+        save_vector_store()
+        finisher.shutdown(wait=True)
+        heartbeats_done.set()
+        heartbeats.join()
+        logger.info(f"Worker {worker_id} stopped")
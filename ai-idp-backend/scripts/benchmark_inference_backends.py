@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Parity, latency and memory comparison of the inference backends.
+
+Each backend (torch, onnx, onnx int8) is loaded in its own process through
+app.core.ai_models.load_models(), so resident memory is measured per
+backend. The embeddings of every backend are compared with the torch
+embeddings by cosine similarity, and classifier labels by agreement.
+
+Usage (from ai-idp-backend/):
+    python scripts/benchmark_inference_backends.py --runs 50
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BACKENDS = {
+    "torch": {"INFERENCE_BACKEND": "torch"},
+    "onnx": {"INFERENCE_BACKEND": "onnx", "ONNX_QUANTIZE": "false"},
+    "onnx-int8": {"INFERENCE_BACKEND": "onnx", "ONNX_QUANTIZE": "true"},
+}
+
+SAMPLE_TEXTS = [
+    "invoice number 4821 total amount due 1250 usd payment terms net 30",
+    "this employment agreement is entered into between the company and the employee",
+    "patient presented with acute chest pain and shortness of breath",
+    "quarterly report revenue increased by twelve percent year over year",
+    "please find attached the signed purchase order for the requested equipment",
+    "the tenant shall pay rent on the first day of each calendar month",
+    "shipping manifest container 7 pallets 14 gross weight 2300 kg",
+    "meeting minutes action items were assigned to the engineering team",
+] * 4
+
+
+def rss_mb() -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_worker(out_path: str, runs: int) -> None:
+    sys.path.insert(0, BACKEND_DIR)
+    from app.core import ai_models
+
+    start = time.perf_counter()
+    ai_models.load_models()
+    load_s = time.perf_counter() - start
+    model, classifier = ai_models.embedding_model, ai_models.classifier
+
+    # Warm up allocator and graph optimizations before timing
+    model.encode(SAMPLE_TEXTS[:2])
+    single = []
+    for i in range(runs):
+        start = time.perf_counter()
+        model.encode([SAMPLE_TEXTS[i % len(SAMPLE_TEXTS)]])
+        single.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    embeddings = model.encode(SAMPLE_TEXTS, batch_size=len(SAMPLE_TEXTS))
+    batch_ms = (time.perf_counter() - start) * 1000
+
+    labels, classify = [], []
+    if classifier is not None:
+        for text in SAMPLE_TEXTS:
+            start = time.perf_counter()
+            labels.append(classifier(text)[0]["label"])
+            classify.append((time.perf_counter() - start) * 1000)
+
+    np.save(out_path + ".npy", np.asarray(embeddings, dtype="float32"))
+    with open(out_path + ".json", "w") as f:
+        json.dump({
+            "load_s": load_s,
+            "rss_mb": rss_mb(),
+            "encode_p50_ms": float(np.percentile(single, 50)),
+            "encode_p99_ms": float(np.percentile(single, 99)),
+            "batch_ms": batch_ms,
+            "classify_p50_ms": float(np.percentile(classify, 50)) if classify else None,
+            "labels": labels,
+        }, f)
+
+
+def cosine(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    return (a * b).sum(axis=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=50, help="single-text encode calls to time")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=list(BACKENDS))
+    parser.add_argument("--min-cosine", type=float, default=0.99, help="parity threshold vs torch")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.runs)
+        return
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in args.backends:
+            out_path = os.path.join(tmp, name)
+            env = {**os.environ, **BACKENDS[name]}
+            subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--worker", out_path, "--runs", str(args.runs)],
+                cwd=BACKEND_DIR, env=env, check=True,
+            )
+            with open(out_path + ".json") as f:
+                results[name] = json.load(f)
+            results[name]["embeddings"] = np.load(out_path + ".npy")
+
+    reference = results.get("torch")
+    print(f"\n{'backend':<10} {'load s':>7} {'RSS MB':>7} {'enc p50':>8} {'enc p99':>8} "
+          f"{'batch ms':>9} {'cls p50':>8} {'cos min':>8} {'cos mean':>9} {'labels':>7}")
+    failed = False
+    for name, r in results.items():
+        cos_min = cos_mean = agreement = float("nan")
+        if reference is not None:
+            sims = cosine(r["embeddings"], reference["embeddings"])
+            cos_min, cos_mean = float(sims.min()), float(sims.mean())
+            if r["labels"] and reference["labels"]:
+                agreement = np.mean([a == b for a, b in zip(r["labels"], reference["labels"])])
+            failed |= cos_min < args.min_cosine
+        classify = f"{r['classify_p50_ms']:.2f}" if r["classify_p50_ms"] is not None else "-"
+        print(f"{name:<10} {r['load_s']:>7.1f} {r['rss_mb']:>7.0f} {r['encode_p50_ms']:>8.2f} "
+              f"{r['encode_p99_ms']:>8.2f} {r['batch_ms']:>9.1f} {classify:>8} "
+              f"{cos_min:>8.4f} {cos_mean:>9.4f} {agreement:>7.2f}")
+
+    if failed:
+        print(f"\nParity check FAILED: some embeddings are below cosine {args.min_cosine} vs torch")
+        sys.exit(1)
+    print(f"\nParity check passed (cosine >= {args.min_cosine} vs torch)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Per-page OCR latency of the tesserocr and pytesseract engines.
+
+Pages come from a directory of scanned page images and PDFs (--pages,
+default scripts/fixtures/scanned_pages, whose README records the numbers
+measured on it). With --synthetic N, scanned pages are generated instead:
+rendered text at a few sizes, uneven lighting, a slight rotation, blur and
+noise. --save writes them out as JPEG scans, which is how the fixtures were
+made. Every engine OCRs every page --runs times in this process. The
+script reports per-page latency, the speedup over pytesseract, and the
+character-level agreement between the engines' outputs.
+
+Usage (from ai-idp-backend/):
+    python scripts/benchmark_ocr_engines.py --runs 3
+    python scripts/benchmark_ocr_engines.py --pages /path/to/scans
+    python scripts/benchmark_ocr_engines.py --synthetic 20 --lines 12
+"""
+import argparse
+import difflib
+import os
+import random
+import sys
+import time
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "scanned_pages")
+
+from app.services.ocr_service import PytesseractEngine, TesserocrEngine  # noqa: E402
+
+WORDS = (
+    "invoice total amount due payment terms agreement tenant shall pay rent "
+    "quarterly report revenue increased shipping manifest container pallets "
+    "meeting minutes action items assigned engineering patient presented"
+).split()
+
+
+def synthetic_pages(count: int, lines: int, seed: int = 0) -> list[np.ndarray]:
+    rng = random.Random(seed)
+    noise = np.random.default_rng(seed)
+
+    pages = []
+    for _ in range(count):
+        size = rng.choice((22, 28, 34))  # about 8, 10 and 12 pt at 200 DPI
+        try:
+            font = ImageFont.truetype("DejaVuSans.ttf", size)
+        except OSError:
+            font = ImageFont.load_default()
+        page = Image.new("L", (1700, 2200), 255)
+        draw = ImageDraw.Draw(page)
+        for line in range(min(lines, 1900 // (size * 2))):
+            words = " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 12)))
+            draw.text((120, 120 + line * size * 7 // 4), words, fill=0, font=font)
+        page = page.rotate(rng.uniform(-1, 1), fillcolor=255).filter(ImageFilter.GaussianBlur(0.6))
+        # Uneven lighting across the page, then sensor noise
+        lighting = np.linspace(rng.uniform(-40, 0), 0, 1700)[None, :]
+        pixels = np.asarray(page, dtype="int16") + lighting + noise.normal(0, 5, (2200, 1700))
+        pages.append(np.clip(pixels, 0, 255).astype("uint8"))
+    return pages
+
+
+def save_pages(pages: list[np.ndarray], path: str) -> None:
+    os.makedirs(path, exist_ok=True)
+    for i, page in enumerate(pages, start=1):
+        Image.fromarray(page).save(os.path.join(path, f"page_{i:02d}.jpg"), quality=75, dpi=(200, 200))
+
+
+def fixture_pages(path: str) -> list[np.ndarray]:
+    from pdf2image import convert_from_path
+
+    pages = []
+    for name in sorted(os.listdir(path)):
+        file_path = os.path.join(path, name)
+        if name.lower().endswith(".pdf"):
+            pages += [np.asarray(img.convert("L")) for img in convert_from_path(file_path)]
+        elif name.lower().endswith((".png", ".jpg", ".jpeg", ".tif", ".tiff", ".bmp")):
+            with Image.open(file_path) as img:
+                pages.append(np.asarray(img.convert("L")))
+    return pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", default=FIXTURES, help="directory of scanned page images / PDFs")
+    parser.add_argument("--synthetic", type=int, help="generate this many scanned pages instead of --pages")
+    parser.add_argument("--lines", type=int, default=40, help="text lines per synthetic page")
+    parser.add_argument("--save", help="write the synthetic pages to this directory and exit")
+    parser.add_argument("--runs", type=int, default=3, help="passes over the page set per engine")
+    args = parser.parse_args()
+
+    pages = synthetic_pages(args.synthetic, args.lines) if args.synthetic else fixture_pages(args.pages)
+    if args.save:
+        save_pages(pages, args.save)
+        return
+    print(f"{len(pages)} pages, {args.runs} runs per engine")
+
+    # Single-threaded, as in an OCR pool worker
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+    engines = {"tesserocr": TesserocrEngine, "pytesseract": PytesseractEngine}
+
+    results = {}
+    for name, engine_class in engines.items():
+        start = time.perf_counter()
+        try:
+            engine = engine_class()
+            init_s = time.perf_counter() - start
+            engine.image_to_string(pages[0][:64])  # pytesseract only finds a missing binary here
+        except Exception as e:
+            print(f"{name}: unavailable ({e})")
+            continue
+
+        texts, latencies = [], []
+        for _ in range(args.runs):
+            texts = []
+            for page in pages:
+                start = time.perf_counter()
+                texts.append(engine.image_to_string(page))
+                latencies.append((time.perf_counter() - start) * 1000)
+        results[name] = (init_s, latencies, texts)
+
+    baseline = results.get("pytesseract")
+    print(f"\n{'engine':<12} {'init s':>7} {'p50 ms':>8} {'p95 ms':>8} {'mean ms':>8} {'speedup':>8} {'agree':>6}")
+    for name, (init_s, latencies, texts) in results.items():
+        mean = float(np.mean(latencies))
+        speedup = agreement = float("nan")
+        if baseline is not None:
+            speedup = float(np.mean(baseline[1])) / mean
+            agreement = float(np.mean([
+                difflib.SequenceMatcher(None, a, b).ratio() for a, b in zip(texts, baseline[2])
+            ]))
+        print(f"{name:<12} {init_s:>7.2f} {np.percentile(latencies, 50):>8.1f} "
+              f"{np.percentile(latencies, 95):>8.1f} {mean:>8.1f} {speedup:>7.2f}x {agreement:>6.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Recall@k and latency report for the vector store index tiers.
+
+Builds every index type over the same corpus and compares it with exact
+(flat) search. By default the corpus is synthetic: clustered, normalized
+384-d vectors, which behave much more like sentence embeddings than uniform
+noise does. Pass --store to benchmark the vectors currently in the store.
+
+Usage (from ai-idp-backend/):
+    python scripts/benchmark_vector_index.py --vectors 100000 --queries 500
+    python scripts/benchmark_vector_index.py --store app/storage/vector_store
+"""
+import argparse
+import os
+import sys
+import time
+
+import faiss
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.vector_store import DIMENSION, VectorStore, build_index  # noqa: E402
+
+
+def synthetic_corpus(n: int, clusters: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, DIMENSION)).astype("float32")
+    labels = rng.integers(0, clusters, n)
+    vectors = centers[labels] + rng.standard_normal((n, DIMENSION)).astype("float32")
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def store_corpus(path: str) -> np.ndarray:
+    store = VectorStore(path=path, index_type="flat")
+    store.load()
+    inner = faiss.downcast_index(store.index.index)
+    if not isinstance(inner, faiss.IndexFlat):
+        sys.exit("The store has already been promoted; its exact vectors are not available")
+    return inner.reconstruct_n(0, store.ntotal)
+
+
+def timed_search(index, queries: np.ndarray, k: int, params=None):
+    latencies = []
+    results = np.empty((len(queries), k), dtype="int64")
+    for i, query in enumerate(queries):
+        start = time.perf_counter()
+        _, ids = index.search(query.reshape(1, -1), k, params=params)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results[i] = ids[0]
+    return results, np.array(latencies)
+
+
+def recall_at_k(results: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(r) & set(t)) for r, t in zip(results, truth))
+    return hits / truth.size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=100_000)
+    parser.add_argument("--clusters", type=int, default=1_000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--store", help="benchmark the vectors in this vector store directory")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.store:
+        corpus = store_corpus(args.store)
+        rng = np.random.default_rng(args.seed)
+        queries = corpus[rng.integers(0, len(corpus), args.queries)].copy()
+        queries += 0.05 * rng.standard_normal(queries.shape).astype("float32")
+        faiss.normalize_L2(queries)
+    else:
+        data = synthetic_corpus(args.vectors + args.queries, args.clusters, args.seed)
+        corpus, queries = data[:args.vectors], data[args.vectors:]
+
+    ids = np.arange(len(corpus), dtype="int64")
+    print(f"Corpus: {len(corpus)} vectors, {len(queries)} queries, k={args.k}")
+    print(f"{'index':<10} {'nprobe':>6} {'build s':>8} {'recall@k':>9} {'p50 ms':>8} {'p99 ms':>8}")
+
+    flat = build_index("flat", corpus, ids)
+    truth, latencies = timed_search(flat, queries, args.k)
+    print(f"{'flat':<10} {'-':>6} {'-':>8} {1.0:>9.3f} "
+          f"{np.percentile(latencies, 50):>8.3f} {np.percentile(latencies, 99):>8.3f}")
+
+    for index_type in ("ivf_flat", "ivf_pq"):
+        start = time.perf_counter()
+        index = build_index(index_type, corpus, ids)
+        build_time = time.perf_counter() - start
+        for nprobe in args.nprobe:
+            params = faiss.SearchParametersIVF(nprobe=nprobe)
+            results, latencies = timed_search(index, queries, args.k, params)
+            print(f"{index_type:<10} {nprobe:>6} {build_time:>8.2f} {recall_at_k(results, truth):>9.3f} "
+                  f"{np.percentile(latencies, 50):>8.3f} {np.percentile(latencies, 99):>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Re-run ingestion stages over a filtered set of documents.
+
+Queues one job per matching document (see app.services.reprocess_service);
+the running workers (python -m app.workers) process them in parallel.
+Re-running a stage also re-runs the stages that consume its output:
+extract implies embed and classify.
+
+Usage (from ai-idp-backend/):
+    # re-embed everything embedded with another model than EMBEDDING_MODEL
+    python scripts/reprocess.py --stages embed --stale-only --wait
+    python scripts/reprocess.py --stages classify --ids 12 15 --wait
+    python scripts/reprocess.py --batch <batch id>   # progress of an earlier run
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db.session import SessionLocal  # noqa: E402
+from app.services.reprocess_service import start_reprocessing  # noqa: E402
+from app.workers.checkpoints import CHECKPOINTED_STAGES  # noqa: E402
+from app.workers.job_queue import batch_progress  # noqa: E402
+
+
+def print_progress(progress: dict) -> None:
+    finished = progress["succeeded"] + progress["failed"]
+    print(
+        f"{progress['batch_id']}: {finished}/{progress['total']} done "
+        f"({progress['succeeded']} succeeded, {progress['failed']} failed, "
+        f"{progress['running']} running, {progress['queued']} queued)",
+        flush=True,
+    )
+
+
+def fetch_progress(batch_id: str):
+    db = SessionLocal()
+    try:
+        return batch_progress(db, batch_id)
+    finally:
+        db.close()
+
+
+def wait(batch_id: str, interval: float) -> dict:
+    while True:
+        progress = fetch_progress(batch_id)
+        print_progress(progress)
+        if progress["done"]:
+            return progress
+        time.sleep(interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stages", nargs="+", choices=CHECKPOINTED_STAGES)
+    parser.add_argument("--ids", nargs="+", type=int, help="only these document ids")
+    parser.add_argument("--status", help="only documents in this status (e.g. failed)")
+    parser.add_argument("--owner", type=int, help="only documents of this user id")
+    parser.add_argument("--stale-only", action="store_true",
+                        help="only documents where a chosen stage failed, never ran or used another model")
+    parser.add_argument("--limit", type=int)
+    parser.add_argument("--batch", help="report on an existing batch instead of starting one")
+    parser.add_argument("--wait", action="store_true", help="print progress until the batch is done")
+    parser.add_argument("--interval", type=float, default=5.0, help="seconds between progress lines")
+    args = parser.parse_args()
+
+    if args.batch:
+        batch_id = args.batch
+    elif args.stages:
+        db = SessionLocal()
+        try:
+            result = start_reprocessing(
+                db, args.stages, document_ids=args.ids, status=args.status, owner_id=args.owner,
+                stale_only=args.stale_only, limit=args.limit,
+            )
+        finally:
+            db.close()
+        print(f"Batch {result['batch_id']}: {result['queued']} documents queued, "
+              f"{result['skipped']} skipped (already queued)")
+        if not result["queued"]:
+            return
+        batch_id = result["batch_id"]
+    else:
+        parser.error("--stages or --batch is required")
+
+    progress = fetch_progress(batch_id)
+    if progress is None:
+        sys.exit(f"Batch {batch_id} not found")
+    if args.wait:
+        progress = wait(batch_id, args.interval)
+    elif args.batch:
+        print_progress(progress)
+    if progress["done"] and progress["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
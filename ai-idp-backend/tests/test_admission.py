@@ -0,0 +1,79 @@
+"""
+Tests for upload admission control
+"""
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.core.admission import AdmissionController
+from app.core.middleware import AdmissionControlMiddleware
+
+
+def _controller(queued: int = 0, finished: int = 0, budget_bytes: int = 1000) -> AdmissionController:
+    return AdmissionController(
+        budget_bytes=budget_bytes, drain_window=100, stats_ttl=60, max_retry_after=600,
+        queue_stats=lambda window: {"interactive": (queued, finished)},
+    )
+
+
+def test_backlog_retry_after_follows_the_drain_rate():
+    """150 jobs over the limit at 0.5 jobs/s drain in 302s"""
+    controller = _controller(queued=250, finished=50)
+    assert controller.check_backlog(max_queued=500) is None
+    assert controller.check_backlog(max_queued=100) == 302
+    # Nothing finishing: wait the maximum
+    assert _controller(queued=250).check_backlog(max_queued=100) == 600
+
+
+def test_inflight_bytes_budget():
+    controller = _controller(budget_bytes=1000)
+    assert controller.reserve(800) is None
+    assert controller.reserve(300) == 600  # no throughput measured yet
+
+    controller.release(800, received=6000)  # 100 bytes/s over the last minute
+    assert controller.reserve(900) is None
+    assert controller.reserve(300) == 2
+    controller.release(900, received=900)
+    # A lone upload larger than the budget is still admitted
+    assert controller.reserve(5000) is None
+
+
+def test_backlog_per_priority_class():
+    """A bulk backlog does not hold up interactive uploads"""
+    controller = AdmissionController(
+        budget_bytes=0, drain_window=100, stats_ttl=60, max_retry_after=600,
+        queue_stats=lambda window: {"interactive": (10, 100), "bulk": (10000, 50)},
+    )
+    assert controller.check_backlog(max_queued=5000, priorities=("interactive",)) is None
+    assert controller.backlog() == (10010, 1.5)
+    assert controller.check_backlog(max_queued=1000) == 600  # 9011 over at 1.5 jobs/s, clamped
+
+
+def _client(controller: AdmissionController, seen: list) -> TestClient:
+    app = FastAPI()
+
+    @app.post("/upload")
+    async def upload(request: Request):
+        seen.append(len(await request.body()))
+        return {}
+
+    app.add_middleware(AdmissionControlMiddleware, controller=controller, limits={"/upload": (20, 100, None)})
+    return TestClient(app)
+
+
+def test_middleware_rejects_before_reading_the_body():
+    """Backlog gets 503 and the byte budget 429, both with Retry-After"""
+    seen = []
+    controller = _controller(queued=10, finished=100, budget_bytes=100)
+    client = _client(controller, seen)
+    assert client.post("/upload", content=b"x" * 50).status_code == 200
+    assert controller.inflight_bytes == 0
+
+    controller.inflight_bytes = 80  # another upload in progress
+    response = client.post("/upload", content=b"x" * 50)
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+
+    # 11 jobs over the limit at 1 job/s
+    response = _client(_controller(queued=30, finished=100), seen).post("/upload", content=b"x" * 50)
+    assert (response.status_code, response.headers["Retry-After"]) == (503, "11")
+    assert seen == [50]
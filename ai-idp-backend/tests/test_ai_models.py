@@ -0,0 +1,89 @@
+"""
+Tests for background model loading
+"""
+import threading
+
+import pytest
+
+from app.core import ai_models
+
+
+class FakeModel:
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, texts):
+        self.calls += 1
+        return [[0.0] for _ in texts]
+
+
+@pytest.fixture
+def fresh_models(monkeypatch):
+    """Reset the module-level loader state around each test"""
+    monkeypatch.setattr(ai_models, "models_ready", threading.Event())
+    monkeypatch.setattr(ai_models, "_loader", None)
+    monkeypatch.setattr(ai_models, "_load_error", None)
+    monkeypatch.setattr(ai_models, "embedding_model", None)
+    monkeypatch.setattr(ai_models, "classifier", None)
+    return ai_models
+
+
+def test_requests_wait_for_a_single_background_load(fresh_models, monkeypatch):
+    """Concurrent callers share one load and the warm-up runs before readiness"""
+    release = threading.Event()
+    loads = []
+    model = FakeModel()
+
+    def load_models():
+        loads.append(1)
+        release.wait(5)
+        fresh_models.embedding_model = model
+
+    monkeypatch.setattr(fresh_models, "load_models", load_models)
+    fresh_models.start_model_loading()
+    assert not fresh_models.models_ready.is_set()
+
+    results = []
+    callers = [
+        threading.Thread(target=lambda: results.append(fresh_models.get_embedding_model()))
+        for _ in range(4)
+    ]
+    for caller in callers:
+        caller.start()
+    release.set()
+    for caller in callers:
+        caller.join(5)
+
+    assert results == [model] * 4
+    assert loads == [1]
+    assert model.calls == 1  # warm-up
+    assert fresh_models.models_ready.is_set()
+
+
+def test_failed_load_is_reported_and_retried(fresh_models, monkeypatch):
+    """A failed load surfaces its error and the next caller starts a new attempt"""
+    attempts = []
+
+    def load_models():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise OSError("no artifacts")
+        fresh_models.embedding_model = FakeModel()
+
+    monkeypatch.setattr(fresh_models, "load_models", load_models)
+    with pytest.raises(RuntimeError, match="no artifacts"):
+        fresh_models.wait_for_models(timeout=5)
+    assert isinstance(fresh_models.model_load_error(), OSError)
+
+    fresh_models.wait_for_models(timeout=5)
+    assert attempts == [1, 1]
+    assert fresh_models.model_load_error() is None
+
+
+def test_onnx_exports_are_kept_per_model():
+    """A different configured model gets its own export instead of reusing the old one"""
+    first = ai_models._onnx_model_dir("onnx", "sentence-transformers/all-MiniLM-L6-v2")
+    second = ai_models._onnx_model_dir("onnx", "BAAI/bge-small-en-v1.5")
+    assert first == "onnx/sentence-transformers--all-MiniLM-L6-v2"
+    assert second != first
+    assert ai_models._onnx_model_dir("onnx", "../../etc").startswith("onnx/")
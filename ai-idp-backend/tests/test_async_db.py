@@ -0,0 +1,42 @@
+"""
+Tests for the async database layer
+"""
+import asyncio
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.db.base import Base
+from app.db.models import Document, User
+from app.db.session import async_database_url
+from app.services.document_service import list_documents
+
+
+def test_async_database_url():
+    assert async_database_url("postgresql://u:p@db:5432/docai") == "postgresql+asyncpg://u:p@db:5432/docai"
+    assert async_database_url("postgresql+psycopg2://u@db/docai") == "postgresql+asyncpg://u@db/docai"
+    assert async_database_url("sqlite:///./docai.db") == "sqlite+aiosqlite:///./docai.db"
+
+
+def test_sync_services_run_on_an_async_session(tmp_path):
+    """The endpoints share the sync query code through AsyncSession.run_sync"""
+    url = f"sqlite:///{tmp_path / 'docs.db'}"
+    Base.metadata.create_all(bind=create_engine(url))
+
+    async def scenario():
+        engine = create_async_engine(async_database_url(url))
+        async with async_sessionmaker(bind=engine, expire_on_commit=False)() as db:
+            db.add(User(id=1, email="a@example.com", hashed_password="x"))
+            db.add_all([
+                Document(owner_id=1, filename=f"{i}.pdf", content_type="application/pdf", storage_path=f"{i}.pdf")
+                for i in range(3)
+            ])
+            await db.commit()
+
+            documents, next_cursor = await db.run_sync(list_documents, 1, 2)
+            assert len(documents) == 2 and next_cursor is not None
+            document = await db.scalar(select(Document).where(Document.id == documents[0].id))
+            assert document.filename == documents[0].filename
+        await engine.dispose()
+
+    asyncio.run(scenario())
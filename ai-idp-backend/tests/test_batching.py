@@ -0,0 +1,48 @@
+"""
+Tests for the dynamic micro-batching executor
+"""
+import pytest
+
+from app.core.batching import BatchingExecutor
+
+
+def test_concurrent_requests_share_a_sorted_batch():
+    """Requests arriving together run as one length-sorted batch"""
+    batches = []
+
+    def process(items):
+        batches.append(list(items))
+        return [item.upper() for item in items]
+
+    executor = BatchingExecutor(process, max_batch_size=16, max_wait_ms=200, name="test_batch")
+    futures = [executor.submit(["ccc", "a"]), executor.submit(["bb"])]
+
+    assert futures[0].result() == ["CCC", "A"]
+    assert futures[1].result() == ["BB"]
+    assert batches == [["a", "bb", "ccc"]]
+
+
+def test_large_requests_are_split_into_batches():
+    """No model call sees more than max_batch_size inputs"""
+    sizes = []
+
+    def process(items):
+        sizes.append(len(items))
+        return items
+
+    executor = BatchingExecutor(process, max_batch_size=4, max_wait_ms=0, name="test_split")
+    items = [str(i) * (i % 5 + 1) for i in range(10)]
+
+    assert executor.submit(items).result() == items
+    assert max(sizes) == 4 and sum(sizes) == 10
+
+
+def test_errors_reach_every_caller():
+    """A failed batch fails the futures of all requests in it"""
+    def process(items):
+        raise RuntimeError("model unavailable")
+
+    executor = BatchingExecutor(process, max_batch_size=4, max_wait_ms=0, name="test_error")
+
+    with pytest.raises(RuntimeError, match="model unavailable"):
+        executor.submit(["a"]).result()
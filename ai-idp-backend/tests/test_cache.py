@@ -0,0 +1,39 @@
+"""
+Tests for the bounded LRU cache
+"""
+from app.core.cache import LRUCache
+from app.metrics import CACHE_EVICTIONS
+
+
+def test_evicts_least_recently_used():
+    """The oldest untouched entry is evicted first"""
+    cache = LRUCache("test_lru", max_size=2)
+    evictions = CACHE_EVICTIONS.labels("test_lru")._value.get()
+
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "b" is now least recently used
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+    assert CACHE_EVICTIONS.labels("test_lru")._value.get() == evictions + 1
+
+
+def test_entries_expire_after_ttl():
+    """Entries older than ttl are treated as misses"""
+    cache = LRUCache("test_ttl", max_size=10, ttl=0)
+    cache.set("a", 1)
+
+    assert cache.get("a", "expired") == "expired"
+    assert len(cache) == 0
+
+
+def test_zero_size_disables_cache():
+    """A cache sized 0 never stores anything"""
+    cache = LRUCache("test_disabled", max_size=0)
+    cache.set("a", 1)
+
+    assert cache.get("a") is None
@@ -0,0 +1,23 @@
+"""
+Tests for token-bounded text chunking
+"""
+from app.services.chunking import chunk_text
+
+
+def test_chunks_are_bounded_and_overlap():
+    """Chunks hold at most max_tokens words and share overlap words"""
+    text = " ".join(f"word{i}" for i in range(25))
+
+    chunks = chunk_text(text, max_tokens=10, overlap=2)
+
+    assert [len(chunk.text.split()) for chunk in chunks] == [10, 10, 9]
+    assert chunks[0].text.split()[-2:] == chunks[1].text.split()[:2]
+    for chunk in chunks:
+        assert text[chunk.start:chunk.end] == chunk.text
+
+
+def test_short_and_empty_text():
+    """Short text is one chunk; blank text has none"""
+    assert chunk_text("   ") == []
+    assert chunk_text("hello world", max_tokens=10, overlap=2) == [("hello world", 0, 11)]
+
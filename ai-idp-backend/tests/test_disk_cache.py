@@ -0,0 +1,54 @@
+"""
+Tests for the on-disk result cache
+"""
+import os
+import time
+
+from app.core.disk_cache import DiskCache, content_key
+
+
+def test_content_key_separates_parts():
+    """Keys are stable and part boundaries matter"""
+    assert content_key("model", "text") == content_key("model", "text")
+    assert content_key("ab", "c") != content_key("a", "bc")
+    assert content_key("model", b"\x00\x01") != content_key("model", b"\x00\x02")
+
+
+def test_round_trip_and_miss(tmp_path):
+    """Stored bytes come back, unknown keys miss"""
+    cache = DiskCache("test-disk", str(tmp_path), max_bytes=1024)
+    key = content_key("text")
+
+    assert cache.get(key) is None
+    cache.set(key, b"payload")
+    assert cache.get(key) == b"payload"
+    assert DiskCache("test-disk", str(tmp_path), max_bytes=1024).get(key) == b"payload"
+
+
+def test_evicts_least_recently_used(tmp_path):
+    """Once over max_bytes, the entries used longest ago are deleted first"""
+    cache = DiskCache("test-disk", str(tmp_path), max_bytes=300, low_water=0.7)
+    keys = [content_key(str(i)) for i in range(3)]
+    for i, key in enumerate(keys):
+        cache.set(key, b"x" * 100)
+        path = cache._path(key)
+        os.utime(path, (time.time() - 100 + i, time.time() - 100 + i))
+
+    # Reading the oldest entry makes it the most recently used
+    assert cache.get(keys[0]) is not None
+    cache.set(content_key("new"), b"y" * 100)
+
+    assert cache.get(keys[0]) is not None
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[2]) is None
+    assert cache.get(content_key("new")) == b"y" * 100
+
+
+def test_overwrite_does_not_grow_the_size(tmp_path):
+    """Rewriting a key replaces its bytes in the size estimate instead of adding to them"""
+    cache = DiskCache("test-disk", str(tmp_path), max_bytes=1024)
+    key = content_key("text")
+    cache.set(content_key("other"), b"x" * 10)
+    for _ in range(3):
+        cache.set(key, b"y" * 100)
+    assert cache._size == 110
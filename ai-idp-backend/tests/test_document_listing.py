@@ -0,0 +1,99 @@
+"""
+Tests for keyset-paginated document listing
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.orm import sessionmaker
+
+from app.db.base import Base
+from app.db.models import Document, User
+from app.services.document_service import decode_cursor, list_documents
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'documents.db'}")
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as db:
+        db.add_all([User(id=1, email="a@example.com", hashed_password="x"),
+                    User(id=2, email="b@example.com", hashed_password="x")])
+        start = datetime(2026, 1, 1)
+        for i in range(1, 8):
+            db.add(Document(
+                id=i, owner_id=1, filename=f"{i}.pdf", content_type="application/pdf", storage_path=f"{i}.pdf",
+                # 3 and 4 share a timestamp: id breaks the tie
+                created_at=start + timedelta(minutes=min(i, 3) if i <= 4 else i),
+                status="failed" if i % 2 else "completed",
+                classification={"label": "invoice" if i <= 3 else "contract", "score": 0.9},
+                raw_text="raw", cleaned_text="clean",
+            ))
+        db.add(Document(id=8, owner_id=2, filename="8.pdf", content_type="application/pdf", storage_path="8.pdf",
+                        created_at=start))
+        db.commit()
+        db.expunge_all()
+        yield db
+
+
+def _all_pages(db, limit, **filters) -> list[int]:
+    ids, cursor = [], None
+    for _ in range(100):
+        documents, cursor = list_documents(db, owner_id=1, limit=limit, cursor=cursor, **filters)
+        ids += [document.id for document in documents]
+        if cursor is None:
+            return ids
+    pytest.fail(f"Paging did not end: {ids[:20]}...")
+
+
+def test_pages_cover_every_document_once_newest_first(db):
+    assert _all_pages(db, limit=2) == [7, 6, 5, 4, 3, 2, 1]
+    assert _all_pages(db, limit=7) == [7, 6, 5, 4, 3, 2, 1]
+
+
+def test_documents_created_in_one_transaction(tmp_path):
+    """A bulk upload creates its documents together; they page newest first"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'bulk.db'}")
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as db:
+        db.add(User(id=1, email="a@example.com", hashed_password="x"))
+        db.add_all([
+            Document(owner_id=1, filename=f"{i}.pdf", content_type="application/pdf", storage_path=f"{i}.pdf")
+            for i in range(5)
+        ])
+        db.commit()
+        assert _all_pages(db, limit=2) == [5, 4, 3, 2, 1]
+
+
+def test_filters(db):
+    assert _all_pages(db, limit=2, status="failed") == [7, 5, 3, 1]
+    assert _all_pages(db, limit=2, classification="invoice") == [3, 2, 1]
+
+
+def test_text_columns_are_not_loaded(db):
+    documents, _ = list_documents(db, owner_id=1, limit=1)
+    assert {"raw_text", "cleaned_text"} <= inspect(documents[0]).unloaded
+
+
+def test_malformed_cursor():
+    with pytest.raises(ValueError):
+        decode_cursor("not a cursor")
+
+
+def test_pages_seek_on_the_owner_index(db):
+    """Pages are read in index order: no scan and sort of all the owner's documents"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, *args):
+        statements.append((statement, parameters))
+
+    event.listen(db.get_bind(), "before_cursor_execute", record)
+    _, cursor = list_documents(db, owner_id=1, limit=2)
+    list_documents(db, owner_id=1, limit=2, cursor=cursor)
+    event.remove(db.get_bind(), "before_cursor_execute", record)
+
+    for statement, parameters in statements:
+        plan = db.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+        details = " ".join(row[-1] for row in plan)
+        assert "ix_documents_owner_created_id" in details
+        assert "TEMP B-TREE" not in details
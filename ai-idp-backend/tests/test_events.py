@@ -0,0 +1,86 @@
+"""
+Tests for the document status broker
+"""
+import asyncio
+from datetime import timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.api.v1.auth import STREAM_SCOPE, user_from_token
+from app.core.events import StatusBroker
+from app.core.security import create_access_token
+from app.db.base import Base
+from app.db.models import User
+from app.db.session import async_database_url
+
+
+def _state(document_id: int, status: str) -> dict:
+    return {"document_id": document_id, "status": status}
+
+
+def test_changes_fan_out_to_the_subscriptions_watching_them():
+    """One fetch per interval serves every subscriber; unchanged states are not sent again"""
+    current = {1: _state(1, "processing"), 2: _state(2, "processing")}
+    fetches = []
+
+    def fetch(document_ids):
+        fetches.append(document_ids)
+        return {document_id: current[document_id] for document_id in document_ids}
+
+    async def scenario():
+        broker = StatusBroker(interval=0.01, fetch=fetch)
+        first = broker.subscribe([1, 2], known=current)
+        second = broker.subscribe([2], known={2: current[2]})
+        assert await first.next(timeout=0.1) == []  # the clients already have these states
+
+        current[2] = _state(2, "completed")
+        assert await first.next(timeout=1) == [_state(2, "completed")]
+        assert await second.next(timeout=1) == [_state(2, "completed")]
+
+        broker.unsubscribe(first)
+        broker.unsubscribe(second)
+        await asyncio.sleep(0.05)
+        assert broker._task.done()  # the poller stops with the last subscriber
+
+    asyncio.run(scenario())
+    assert fetches[0] == [1, 2]
+
+
+def test_slow_subscriber_only_gets_the_latest_state():
+    broker = StatusBroker(interval=60, fetch=lambda document_ids: {})
+
+    async def scenario():
+        subscription = broker.subscribe([1])
+        for status in ("processing", "failed", "completed"):
+            broker.publish({1: _state(1, status)})
+        assert await subscription.next(timeout=1) == [_state(1, "completed")]
+        broker.unsubscribe(subscription)
+
+    asyncio.run(scenario())
+
+
+def test_stream_tokens_only_open_streams(tmp_path):
+    """The stream token in the URL cannot be used as an access token, nor the access token in the URL"""
+    url = f"sqlite:///{tmp_path / 'users.db'}"
+    Base.metadata.create_all(bind=create_engine(url))
+    access = create_access_token("a@example.com")
+    stream = create_access_token("a@example.com", expires_delta=timedelta(seconds=60), scope=STREAM_SCOPE)
+
+    async def scenario():
+        engine = create_async_engine(async_database_url(url))
+        async with async_sessionmaker(bind=engine)() as db:
+            db.add(User(id=1, email="a@example.com", hashed_password="x"))
+            await db.commit()
+
+            assert (await user_from_token(access, db)).id == 1
+            assert (await user_from_token(stream, db, scope=STREAM_SCOPE)).id == 1
+            for token, scope in ((stream, None), (access, STREAM_SCOPE)):
+                with pytest.raises(HTTPException) as rejected:
+                    await user_from_token(token, db, scope=scope)
+                assert rejected.value.status_code == 401
+        await engine.dispose()
+
+    asyncio.run(scenario())
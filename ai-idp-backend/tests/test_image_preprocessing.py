@@ -0,0 +1,72 @@
+"""
+Tests for OCR image preprocessing
+"""
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+
+from app.core.config import settings  # noqa: E402
+from app.services import image_preprocessing  # noqa: E402
+from app.services.image_preprocessing import (  # noqa: E402
+    choose_render_dpi, estimate_text_height, preprocess, probe_render_dpi
+)
+
+
+def text_image(glyph_height: int, size=(1200, 1600)) -> np.ndarray:
+    """White page with rows of black glyph-sized boxes"""
+    img = np.full(size, 255, dtype=np.uint8)
+    width = max(glyph_height // 2, 2)
+    for top in range(50, size[0] - 50 - glyph_height, glyph_height * 2):
+        for left in range(50, size[1] - 50 - width, width * 2):
+            img[top:top + glyph_height, left:left + width] = 0
+    return img
+
+
+def test_estimate_text_height():
+    """The median glyph height is recovered from connected components"""
+    assert estimate_text_height(text_image(12)) == pytest.approx(12, abs=1)
+    assert estimate_text_height(np.full((400, 400), 255, dtype=np.uint8)) is None
+
+
+def test_render_dpi_follows_text_height_within_limits(monkeypatch):
+    """Small text renders at a higher DPI than large text, clamped and pixel-capped"""
+    monkeypatch.setattr(settings, "OCR_TARGET_TEXT_PX", 25)
+    monkeypatch.setattr(settings, "OCR_MIN_DPI", 150)
+    monkeypatch.setattr(settings, "OCR_MAX_DPI", 300)
+    monkeypatch.setattr(settings, "OCR_MAX_PIXELS", 10_000_000)
+
+    assert choose_render_dpi(612, 792, text_height_pt=12) == 150
+    assert choose_render_dpi(612, 792, text_height_pt=7.2) == 250
+    assert choose_render_dpi(612, 792, text_height_pt=2) == 300
+    # An A0 poster is capped by the pixel budget
+    assert choose_render_dpi(2384, 3370, text_height_pt=7.2) < 100
+
+
+def test_preprocess_downscales_and_binarizes(monkeypatch):
+    """Oversized text is shrunk, the result is binary, and each stage is timed"""
+    monkeypatch.setattr(settings, "OCR_TARGET_TEXT_PX", 25)
+    img = np.dstack([text_image(80, size=(2000, 2000))] * 3)
+    timings = {}
+
+    out = preprocess(img, stages="grayscale,downscale,binarize", timings=timings)
+
+    assert out.ndim == 2
+    assert out.shape[0] < 1000
+    assert set(np.unique(out)) <= {0, 255}
+    assert set(timings) == set(image_preprocessing.STAGES)
+
+
+def test_known_text_height_skips_the_estimate(monkeypatch):
+    """Pages rendered for the target text height are not measured again in downscale"""
+    monkeypatch.setattr(settings, "OCR_TARGET_TEXT_PX", 25)
+    probe = text_image(8)
+    dpi, text_height = probe_render_dpi(probe, probe_dpi=100)
+    assert text_height == pytest.approx(8 * dpi / 100)
+
+    def estimate(gray):
+        raise AssertionError("text height estimated again")
+
+    monkeypatch.setattr(image_preprocessing, "estimate_text_height", estimate)
+    img = text_image(25)
+    assert preprocess(img, stages="downscale", text_height=25).shape == img.shape
@@ -0,0 +1,172 @@
+"""
+Tests for the database job queue
+"""
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.db.base import Base
+from app.db.models import Document, Job, User
+from app.workers import job_queue
+from app.workers.job_queue import (
+    BULK, FAILED, INTERACTIVE, QUEUED, RUNNING, SUCCEEDED, claim_job, complete_job, enqueue_job,
+    fail_job, heartbeat
+)
+
+
+@pytest.fixture
+def Session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        db.add(User(id=1, email="owner@example.com", hashed_password="x"))
+        db.add(Document(id=1, owner_id=1, filename="a.pdf", content_type="application/pdf", storage_path="a.pdf"))
+        db.commit()
+    return Session
+
+
+@pytest.fixture(autouse=True)
+def queue_summary(monkeypatch):
+    """A fresh per-worker queue summary for each test"""
+    summary = job_queue._QueueSummary()
+    monkeypatch.setattr(job_queue, "_summary", summary)
+    return summary
+
+
+def _enqueue(Session) -> int:
+    with Session() as db:
+        job = enqueue_job(db, document_id=1)
+        db.commit()
+        return job.id
+
+
+def test_a_job_is_claimed_once(Session):
+    """Concurrent workers never both get the same job"""
+    job_id = _enqueue(Session)
+
+    with Session() as a, Session() as b:
+        claimed = claim_job(a, "worker-a")
+        assert claimed.id == job_id
+        assert (claimed.status, claimed.locked_by, claimed.attempts) == (RUNNING, "worker-a", 1)
+        assert claim_job(b, "worker-b") is None
+
+        assert heartbeat(a, job_id, "worker-a")
+        assert complete_job(a, job_id, "worker-a")
+        assert a.get(Job, job_id).status == SUCCEEDED
+
+
+def test_lapsed_lease_is_reclaimed(Session):
+    """A job whose worker stopped heartbeating goes to another worker"""
+    job_id = _enqueue(Session)
+
+    with Session() as a, Session() as b:
+        assert claim_job(a, "worker-a", lease_seconds=-1).id == job_id
+        reclaimed = claim_job(b, "worker-b")
+        assert (reclaimed.id, reclaimed.locked_by, reclaimed.attempts) == (job_id, "worker-b", 2)
+
+        # The first worker can no longer renew or finish it
+        assert not heartbeat(a, job_id, "worker-a")
+        assert not complete_job(a, job_id, "worker-a")
+
+
+def test_failures_back_off_then_fail(Session, monkeypatch):
+    """Failed attempts are retried after a growing delay until max_attempts"""
+    monkeypatch.setattr(settings, "JOB_RETRY_BACKOFF_SECONDS", 10)
+    monkeypatch.setattr(settings, "JOB_RETRY_BACKOFF_MAX_SECONDS", 1000)
+    monkeypatch.setattr(settings, "JOB_MAX_ATTEMPTS", 3)
+    job_id = _enqueue(Session)
+
+    with Session() as db:
+        delays = []
+        for attempt in range(1, 4):
+            job = claim_job(db, "worker")
+            assert job.attempts == attempt
+            status = fail_job(db, job, "worker", "boom")
+            job = db.get(Job, job_id)
+            db.refresh(job)
+            if status == QUEUED:
+                assert claim_job(db, "worker") is None  # still backing off
+                delays.append(job.run_after.replace(tzinfo=None) - job.updated_at.replace(tzinfo=None))
+                job.run_after = job_queue.utcnow() - timedelta(seconds=1)
+                db.commit()
+
+        assert job.status == FAILED
+        assert job.last_error == "boom"
+        assert [round(d.total_seconds() / 10) for d in delays] == [1, 2]
+
+
+def _enqueue_documents(Session, owner_id: int, count: int, priority: str = INTERACTIVE, pages=None) -> list[int]:
+    """Queue one job per new document of owner_id; returns the document ids"""
+    with Session() as db:
+        if db.get(User, owner_id) is None:
+            db.add(User(id=owner_id, email=f"user{owner_id}@example.com", hashed_password="x"))
+        documents = [
+            Document(owner_id=owner_id, filename=f"{i}.pdf", content_type="application/pdf",
+                     storage_path=f"{i}.pdf", page_count=pages[i] if pages else None)
+            for i in range(count)
+        ]
+        db.add_all(documents)
+        db.flush()
+        for document in documents:
+            enqueue_job(db, document.id, priority=priority)
+        db.commit()
+        return [document.id for document in documents]
+
+
+def test_owners_share_workers_fairly(Session):
+    """A user with a backlog does not delay another user's single upload"""
+    backlog = _enqueue_documents(Session, owner_id=2, count=3)
+    single = _enqueue_documents(Session, owner_id=3, count=1)
+
+    with Session() as db:
+        claimed = [claim_job(db, f"worker-{i}").document_id for i in range(3)]
+    assert claimed == [backlog[0], single[0], backlog[1]]
+
+
+def test_claims_reuse_the_queue_summary(Session, queue_summary, monkeypatch):
+    """The queue is aggregated once per refresh interval, not on every claim"""
+    monkeypatch.setattr(settings, "SCHEDULER_REFRESH_SECONDS", 60)
+    refreshes = []
+    refresh = queue_summary.refresh
+    monkeypatch.setattr(queue_summary, "refresh", lambda db, now: refreshes.append(1) or refresh(db, now))
+    backlog = _enqueue_documents(Session, owner_id=2, count=3)
+    single = _enqueue_documents(Session, owner_id=3, count=1)
+
+    with Session() as db:
+        claimed = [claim_job(db, f"worker-{i}").document_id for i in range(4)]
+        assert claimed == [backlog[0], single[0], backlog[1], backlog[2]]
+        assert len(refreshes) == 2  # the second one after owner 3's group drained
+        assert claim_job(db, "worker") is None
+
+
+def test_interactive_jobs_are_claimed_before_bulk(Session):
+    bulk = _enqueue_documents(Session, owner_id=2, count=2, priority=BULK)
+    interactive = _enqueue_documents(Session, owner_id=2, count=1)
+
+    with Session() as db:
+        first = claim_job(db, "worker")
+        assert (first.document_id, first.priority) == (interactive[0], INTERACTIVE)
+        assert claim_job(db, "worker").document_id == bulk[0]
+
+
+def test_shortest_job_first(Session, monkeypatch):
+    """With SJF on, an owner's small documents go before large ones"""
+    monkeypatch.setattr(settings, "SCHEDULER_SHORTEST_JOB_FIRST", True)
+    ids = _enqueue_documents(Session, owner_id=2, count=3, pages=[40, 1, 5])
+
+    with Session() as db:
+        claimed = [claim_job(db, "worker").document_id for _ in range(3)]
+    assert claimed == [ids[1], ids[2], ids[0]]
+
+
+def test_queue_stats_per_priority(Session):
+    with Session() as db:
+        enqueue_job(db, document_id=1, priority=INTERACTIVE)
+        for _ in range(3):
+            enqueue_job(db, document_id=1, priority=BULK)
+        db.commit()
+        assert job_queue.queue_stats(db, window_seconds=60) == {INTERACTIVE: (1, 0), BULK: (3, 0)}
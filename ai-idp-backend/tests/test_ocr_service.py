@@ -0,0 +1,46 @@
+"""
+Tests for the OCR service
+"""
+import numpy as np
+import pytest
+
+pytest.importorskip("cv2")
+pytest.importorskip("pytesseract")
+pytest.importorskip("pdf2image")
+
+from app.core.config import settings  # noqa: E402
+from app.services import ocr_service  # noqa: E402
+from app.services.ocr_service import OcrEngine, create_ocr_engine  # noqa: E402
+
+
+class NamedEngine(OcrEngine):
+    def __init__(self, name: str):
+        self.name = name
+
+    def image_to_string(self, image) -> str:
+        return ""
+
+
+def test_engines_implement_image_to_string():
+    class Incomplete(OcrEngine):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_unknown_engine_is_rejected():
+    """A typo in OCR_ENGINE fails loudly instead of silently using another engine"""
+    with pytest.raises(ValueError, match="tesseract"):
+        create_ocr_engine("tesseract")
+
+
+def test_cache_key_covers_engine_and_pixel_cap(monkeypatch):
+    """Text cached under one engine or pixel cap is not served for another"""
+    img = np.zeros((4, 4), dtype=np.uint8)
+    keys = set()
+    for engine, max_pixels in (("tesserocr", 10_000_000), ("tesserocr", 5_000_000), ("pytesseract", 5_000_000)):
+        monkeypatch.setattr(ocr_service, "_ocr_engine", NamedEngine(engine))
+        monkeypatch.setattr(settings, "OCR_MAX_PIXELS", max_pixels)
+        keys.add(ocr_service._ocr_cache_key(img))
+    assert len(keys) == 3
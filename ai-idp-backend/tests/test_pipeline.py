@@ -0,0 +1,72 @@
+"""
+Tests for the staged pipeline
+"""
+import threading
+
+from app.core.pipeline import Pipeline, Stage
+
+
+def _append(name):
+    def handler(item):
+        item.append(name)
+    return handler
+
+
+def test_items_pass_every_stage_in_order():
+    """Each item runs through the stages in sequence and reaches on_done"""
+    done = []
+    pipeline = Pipeline(
+        [Stage("a", _append("a"), 2), Stage("b", _append("b"), 3), Stage("c", _append("c"), 1)],
+        queue_size=2,
+        on_done=done.append,
+    )
+    pipeline.start()
+    for _ in range(20):
+        assert pipeline.submit([])
+    pipeline.close()
+
+    assert len(done) == 20
+    assert all(item == ["a", "b", "c"] for item in done)
+
+
+def test_a_full_stage_blocks_submit():
+    """A stuck stage fills the queues in front of it instead of buffering without bound"""
+    release = threading.Event()
+    started = threading.Event()
+
+    def slow(item):
+        started.set()
+        release.wait(5)
+
+    pipeline = Pipeline([Stage("fast", _append("fast"), 1), Stage("slow", slow, 1)], queue_size=1)
+    pipeline.start()
+    assert pipeline.submit([])
+    assert started.wait(5)
+    # One item in the slow queue, one held by the fast worker, one in the fast queue
+    accepted = sum(pipeline.submit([], timeout=0.2) for _ in range(5))
+    assert accepted == 3
+
+    release.set()
+    assert pipeline.submit([], timeout=5)
+    pipeline.close()
+
+
+def test_a_failing_stage_reports_and_forwards_the_item():
+    """on_error sees the exception and later stages still get the item"""
+    errors, done = [], []
+
+    def boom(item):
+        raise ValueError("bad page")
+
+    pipeline = Pipeline(
+        [Stage("boom", boom, 1), Stage("after", _append("after"), 1)],
+        queue_size=4,
+        on_done=done.append,
+        on_error=lambda item, e: errors.append(str(e)),
+    )
+    pipeline.start()
+    pipeline.submit([])
+    pipeline.close()
+
+    assert errors == ["bad page"]
+    assert done == [["after"]]
@@ -0,0 +1,124 @@
+"""
+Tests for stage checkpoints and selective reprocessing
+"""
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.vector_store import DIMENSION, VectorStore
+from app.db.base import Base
+from app.db.models import Document, Job, User
+from app.services.embedding_service import embedding_model_id
+from app.services.reprocess_service import select_documents, start_reprocessing
+from app.workers import tasks
+from app.workers.checkpoints import EMBED, EXTRACT, expand_stages, is_current
+from app.workers.job_queue import RUNNING, SUCCEEDED, batch_progress, enqueue_job
+
+
+def _document(document_id: int, stages: dict = None, status: str = "completed") -> Document:
+    return Document(
+        id=document_id, owner_id=1, filename=f"{document_id}.pdf", content_type="application/pdf",
+        storage_path=f"{document_id}.pdf", status=status, stages=stages,
+    )
+
+
+@pytest.fixture
+def Session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'reprocess.db'}")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    current = {"status": "completed", "model": embedding_model_id()}
+    with Session() as db:
+        db.add(User(id=1, email="owner@example.com", hashed_password="x"))
+        db.add_all([
+            _document(1, {EMBED: current}),
+            _document(2, {EMBED: {"status": "completed", "model": "old-model|torch"}}),
+            _document(3, {EMBED: {"status": "failed", "model": embedding_model_id()}}, status="failed"),
+            _document(4),
+        ])
+        db.commit()
+    return Session
+
+
+def test_rerunning_a_stage_reruns_its_consumers():
+    """New text from extraction has to be embedded and classified again"""
+    assert expand_stages([EXTRACT]) == {"extract", "embed", "classify"}
+    assert expand_stages([EMBED]) == {"embed"}
+    with pytest.raises(ValueError):
+        expand_stages(["ocr"])
+
+
+def test_a_checkpoint_from_another_model_is_not_current():
+    assert is_current({"status": "completed", "model": embedding_model_id()}, EMBED)
+    assert not is_current({"status": "completed", "model": "old-model|torch"}, EMBED)
+    assert not is_current({"status": "failed", "model": embedding_model_id()}, EMBED)
+    assert is_current({"status": "skipped"}, EXTRACT)
+
+
+def test_stale_only_selects_outdated_failed_and_missing(Session):
+    with Session() as db:
+        assert select_documents(db, [EMBED]) == [1, 2, 3, 4]
+        assert select_documents(db, [EMBED], stale_only=True) == [2, 3, 4]
+        assert select_documents(db, [EMBED], stale_only=True, status="completed", limit=1) == [2]
+
+
+def test_legacy_completed_documents_count_as_extracted(Session):
+    """Documents processed before checkpoints only need extraction if they have no text"""
+    with Session() as db:
+        legacy = _document(5)
+        legacy.cleaned_text = "text"
+        db.add_all([legacy, _document(6)])
+        db.commit()
+        assert select_documents(db, [EXTRACT], stale_only=True, document_ids=[5, 6]) == [6]
+
+
+def test_reprocessing_batch_skips_busy_documents_and_reports_progress(Session):
+    with Session() as db:
+        enqueue_job(db, 4)
+        db.commit()
+        result = start_reprocessing(db, [EMBED], stale_only=True)
+    assert (result["queued"], result["skipped"]) == (2, 1)
+
+    with Session() as db:
+        jobs = db.query(Job).filter(Job.batch_id == result["batch_id"]).order_by(Job.document_id).all()
+        assert [(job.document_id, job.stages) for job in jobs] == [(2, ["embed"]), (3, ["embed"])]
+        jobs[0].status = SUCCEEDED
+        jobs[1].status = RUNNING
+        db.commit()
+
+        progress = batch_progress(db, result["batch_id"])
+        assert (progress["total"], progress["succeeded"], progress["running"], progress["done"]) == (2, 1, 1, False)
+        assert batch_progress(db, "no-such-batch") is None
+
+
+def test_duplicates_reuse_results_without_waiting_for_the_vectors(Session, tmp_path, monkeypatch):
+    """prepare_stage only queues the copied vectors; save_results completes the document once they are durable"""
+    store = VectorStore(path=str(tmp_path / "vectors"), commit_interval_ms=60_000)
+    store.load()
+    monkeypatch.setattr(tasks, "vector_store", store)
+    monkeypatch.setattr(tasks, "SessionLocal", Session)
+    with Session() as db:
+        source = db.get(Document, 1)
+        source.content_hash = "same"
+        source.embedding_status = "completed"
+        source.cleaned_text = "clean"
+        db.add(_document(5, status="uploaded"))
+        db.get(Document, 5).content_hash = "same"
+        db.commit()
+    store.add(1, np.ones((1, DIMENSION), dtype="float32"), wait=False)
+    store.flush()
+
+    work = tasks.DocumentWork(5)
+    tasks.prepare_stage(work)
+    assert work.finished and not work.vector_write.done()
+    with Session() as db:
+        assert db.get(Document, 5).status == "processing"
+
+    store.flush()
+    tasks.save_results(work)
+    with Session() as db:
+        document = db.get(Document, 5)
+        assert (document.status, document.embedding_status) == ("completed", "completed")
+        assert document.stages == db.get(Document, 1).stages
+    assert store.get(5)[0] is not None
@@ -0,0 +1,123 @@
+"""
+Tests for search result ranking and hydration
+"""
+import threading
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.core.vector_store import ChunkHit
+from app.db.base import Base
+from app.db.models import Document, User
+from app.core import ai_models
+from app.services import embedding_service, search_service
+from app.services.search_service import aggregate_hits, hydrate_hits
+
+
+@pytest.fixture
+def db_session(monkeypatch):
+    """In-memory database wired into the search service"""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+
+    def get_test_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    monkeypatch.setattr(search_service, "get_db", get_test_db)
+    db = Session()
+    db.add(User(id=1, email="owner@example.com", hashed_password="x"))
+    db.commit()
+    yield engine, db
+    db.close()
+
+
+def test_aggregate_hits_groups_per_document():
+    """Each document appears once, with its best chunk as the snippet source"""
+    hits = [
+        ChunkHit(1, 0.9, 0, 10),
+        ChunkHit(2, 0.8, 20, 30),
+        ChunkHit(1, 0.1, 40, 50),
+        ChunkHit(2, 0.7, 60, 70),
+    ]
+
+    by_max = aggregate_hits(hits, limit=5, method="max")
+    assert [(hit.document_id, hit.start) for hit in by_max] == [(1, 0), (2, 20)]
+
+    by_mean = aggregate_hits(hits, limit=5, method="mean_top_n", top_n=2)
+    assert [hit.document_id for hit in by_mean] == [2, 1]
+    assert abs(by_mean[0].score - 0.75) < 1e-9
+
+
+def test_hydrate_hits_uses_one_query_and_keeps_rank(db_session):
+    """Hits are hydrated in a single statement, in FAISS rank order"""
+    engine, db = db_session
+    for doc_id, text in [(1, "alpha " * 100), (2, "bravo charlie delta"), (3, "echo")]:
+        db.add(Document(
+            id=doc_id, owner_id=1, filename=f"{doc_id}.pdf", content_type="application/pdf",
+            storage_path="x", cleaned_text=text, classification={"label": f"L{doc_id}"},
+        ))
+    db.commit()
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    results = hydrate_hits([
+        ChunkHit(2, 0.9, 6, 13),
+        ChunkHit(99, 0.8, 0, 5),  # deleted document
+        ChunkHit(1, 0.7, 0, 0),  # no offsets
+    ])
+
+    assert len(statements) == 1
+    assert "raw_text" not in statements[0]
+    assert [r["document_id"] for r in results] == [2, 1]
+    assert results[0]["snippet"] == "charlie"
+    assert results[0]["classification"] == "L2"
+    assert results[1]["snippet"] == ("alpha " * 100)[:200]
+
+
+def test_query_vectors_are_cached_by_normalized_text(monkeypatch):
+    """Repeated queries differing only in case or spacing are encoded once"""
+    calls = []
+    monkeypatch.setattr(search_service, "generate_embeddings", lambda text: calls.append(text) or [text])
+    monkeypatch.setattr(search_service, "lowercases_input", lambda: True)
+    search_service.query_embedding_cache.clear()
+
+    assert search_service.embed_query("Invoice  Total") == ["invoice total"]
+    assert search_service.embed_query("invoice total ") == ["invoice total"]
+    assert calls == ["invoice total"]
+
+
+def test_case_is_kept_for_cased_models(monkeypatch):
+    """With a cased tokenizer, queries differing in case have different vectors"""
+    calls = []
+    monkeypatch.setattr(search_service, "generate_embeddings", lambda text: calls.append(text) or [text])
+    monkeypatch.setattr(search_service, "lowercases_input", lambda: False)
+    search_service.query_embedding_cache.clear()
+
+    assert search_service.embed_query("Apple  pie") == ["Apple pie"]
+    assert search_service.embed_query("apple pie") == ["apple pie"]
+    assert calls == ["Apple pie", "apple pie"]
+
+
+def test_search_does_not_wait_for_the_model(monkeypatch):
+    """Until the model is ready queries keep their case instead of blocking on the load"""
+    def wait_for_models():
+        raise AssertionError("normalize_query waited for the model")
+
+    monkeypatch.setattr(ai_models, "models_ready", threading.Event())
+    monkeypatch.setattr(ai_models, "wait_for_models", wait_for_models)
+    monkeypatch.setattr(embedding_service, "_lowercases", None)
+
+    assert search_service.normalize_query("Invoice  Total") == "Invoice Total"
+
+    uncased = SimpleNamespace(tokenizer=SimpleNamespace(do_lower_case=True))
+    monkeypatch.setattr(ai_models, "embedding_model", uncased)
+    ai_models.models_ready.set()
+    assert search_service.normalize_query("Invoice  Total") == "invoice total"
@@ -0,0 +1,126 @@
+"""
+Tests for streamed upload storage and bulk archives
+"""
+import io
+import tarfile
+import zipfile
+
+import pytest
+from fastapi import FastAPI, Request, UploadFile
+from fastapi.testclient import TestClient
+
+from app.core import storage
+from app.core.middleware import BodySizeLimitMiddleware
+from app.core.storage import FileTooLargeError, save_stream
+from app.services import document_service
+
+PDF = b"%PDF-1.7\n" + b"x" * 5000
+
+
+@pytest.fixture
+def upload_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "UPLOAD_DIR", tmp_path)
+    return tmp_path
+
+
+def test_save_stream_hashes_sniffs_and_deduplicates(upload_dir):
+    """Identical uploads land on one content-addressed file"""
+    first = save_stream(io.BytesIO(PDF), max_bytes=10_000, chunk_size=1024)
+    second = save_stream(io.BytesIO(PDF), max_bytes=10_000, chunk_size=1024)
+
+    assert first == second
+    assert first.content_type == "application/pdf"
+    assert first.size == len(PDF)
+    assert first.path.endswith(f"{first.content_hash}.pdf")
+    assert [p.name for p in upload_dir.rglob("*") if p.is_file()] == [f"{first.content_hash}.pdf"]
+
+
+def test_save_stream_rejects_bad_type_and_oversized_files(upload_dir):
+    """Unknown magic bytes and files over the limit leave nothing behind"""
+    with pytest.raises(ValueError, match="Unsupported"):
+        save_stream(io.BytesIO(b"MZ\x90\x00 not a document"), max_bytes=10_000)
+    with pytest.raises(FileTooLargeError):
+        save_stream(io.BytesIO(PDF), max_bytes=2048, chunk_size=1024)
+
+    assert not any(p.is_file() for p in upload_dir.rglob("*"))
+
+
+def test_pdf_pages_are_counted_at_upload(upload_dir):
+    """Page objects are counted, the /Pages tree node is not"""
+    pdf = b"%PDF-1.4\n1 0 obj << /Type /Pages /Count 2 >> endobj\n" + b"<< /Type/Page >>\n" * 2
+    assert save_stream(io.BytesIO(pdf), max_bytes=10_000).page_count == 2
+    assert save_stream(io.BytesIO(PDF), max_bytes=10_000).page_count is None
+
+
+def test_body_size_limit_middleware():
+    """Oversized bodies get 413, whether announced by Content-Length or streamed"""
+    app = FastAPI()
+
+    @app.post("/upload")
+    async def upload(request: Request):
+        return {"size": len(await request.body())}
+
+    app.add_middleware(BodySizeLimitMiddleware, max_bytes=100, paths=("/upload",))
+    client = TestClient(app)
+
+    assert client.post("/upload", content=b"x" * 100).json() == {"size": 100}
+    assert client.post("/upload", content=b"x" * 101).status_code == 413
+
+    def chunks():
+        for _ in range(5):
+            yield b"x" * 40
+
+    assert client.post("/upload", content=chunks()).status_code == 413
+
+
+def _zip(entries: dict) -> io.BytesIO:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in entries.items():
+            archive.writestr(name, data)
+    buffer.seek(0)
+    return buffer
+
+
+def _tar_gz(entries: dict) -> io.BytesIO:
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+        for name, data in entries.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    buffer.seek(0)
+    return buffer
+
+
+def test_archives_are_sniffed_and_iterated():
+    """zip and compressed tar entries are listed, minus directories and OS metadata"""
+    entries = {"a/one.pdf": PDF, "__MACOSX/a/._one.pdf": b"junk", ".DS_Store": b"junk"}
+    for archive, kind in ((_zip(entries), storage.ZIP), (_tar_gz(entries), storage.TAR)):
+        assert storage.sniff_archive_type(archive) == kind
+        assert [(name, entry.read()) for name, entry in storage.iter_archive(archive, kind)] == [("a/one.pdf", PDF)]
+    assert storage.sniff_archive_type(io.BytesIO(PDF)) is None
+
+
+def test_store_bulk_files_accepts_documents_and_archive_entries(upload_dir, monkeypatch):
+    """Bad entries are rejected one by one; oversized archive entries stop at the size limit"""
+    monkeypatch.setattr(document_service, "MAX_SIZE_MB", 1)
+    png = b"\x89PNG\r\n\x1a\n" + b"p" * 100
+    bomb = b"%PDF-1.7\n" + b"\0" * (2 * 1024 * 1024)  # compresses to a few KB
+    files = [
+        UploadFile(io.BytesIO(PDF), filename="single.pdf"),
+        UploadFile(_zip({"scan.png": png, "notes.txt": b"plain text", "bomb.pdf": bomb}), filename="batch.zip"),
+    ]
+
+    stored, rejected = document_service.store_bulk_files(files)
+
+    assert [(name, item.content_type) for name, item in stored] == [
+        ("single.pdf", "application/pdf"), ("batch.zip/scan.png", "image/png")
+    ]
+    assert [name for name, _ in rejected] == ["batch.zip/notes.txt", "batch.zip/bomb.pdf"]
+    assert "too large" in rejected[1][1]
+
+    stored, rejected = document_service.store_bulk_files(
+        [UploadFile(_zip({f"{i}.pdf": PDF + bytes([i]) for i in range(3)}), filename="many.zip")], max_documents=2
+    )
+    assert len(stored) == 2 and [name for name, _ in rejected] == ["many.zip/2.pdf"]
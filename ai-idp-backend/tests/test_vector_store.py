@@ -0,0 +1,226 @@
+"""
+Tests for the shared, ID-mapped vector store
+"""
+import numpy as np
+
+from app.core.vector_store import DIMENSION, VectorStore
+
+
+def _vector(seed: int) -> np.ndarray:
+    return np.random.default_rng(seed).standard_normal((1, DIMENSION)).astype("float32")
+
+
+def test_search_returns_document_ids(tmp_path):
+    """Hits are keyed by Document.id, best cosine match first"""
+    store = VectorStore(path=str(tmp_path), commit_interval_ms=0)
+    store.add(7, _vector(1))
+    store.add(42, _vector(2))
+
+    hits = store.search(_vector(2), k=5)
+
+    assert [hit.document_id for hit in hits] == [42, 7]
+    assert abs(hits[0].score - 1.0) < 1e-5
+
+
+def test_add_replaces_existing_vectors(tmp_path):
+    """Re-adding a document replaces all of its chunk vectors"""
+    store = VectorStore(path=str(tmp_path), commit_interval_ms=0)
+    store.add(1, _vector(1))
+    store.add(1, _vector(2))
+
+    assert store.ntotal == 1
+    assert store.search(_vector(2), k=1)[0].document_id == 1
+
+    store.remove(1)
+    assert store.search(_vector(2), k=1) == []
+
+
+def test_chunk_hits_carry_offsets(tmp_path):
+    """Chunk vectors are stored with their document id and character offsets"""
+    store = VectorStore(path=str(tmp_path), commit_interval_ms=0)
+    vectors = np.concatenate([_vector(10), _vector(11), _vector(12)])
+    store.add(5, vectors, spans=[(0, 100), (80, 180), (160, 240)])
+    store.add(6, _vector(13), spans=[(0, 50)])
+
+    hit = store.search(_vector(11), k=1)[0]
+    assert (hit.document_id, hit.start, hit.end) == (5, 80, 180)
+
+    store.remove(5)
+    assert store.ntotal == 1
+    assert {hit.document_id for hit in store.search(_vector(11), k=4)} == {6}
+
+    restored = VectorStore(path=str(tmp_path))
+    restored.load()
+    hit = restored.search(_vector(13), k=1)[0]
+    assert (hit.document_id, hit.start, hit.end) == (6, 0, 50)
+
+
+def test_recovers_from_segments_after_crash(tmp_path):
+    """Committed segments are replayed when the writer never shut down cleanly"""
+    store = VectorStore(path=str(tmp_path), commit_interval_ms=0, merge_segments=1000)
+    for doc_id in range(1, 6):
+        store.add(doc_id, _vector(doc_id))
+    store.remove(2)
+
+    # No close(): the base index was never written
+    assert not (tmp_path / "faiss.index").exists()
+
+    restored = VectorStore(path=str(tmp_path), commit_interval_ms=0)
+    restored.load()
+
+    assert restored.ntotal == 4
+    assert restored.search(_vector(4), k=1)[0].document_id == 4
+    assert 2 not in [hit.document_id for hit in restored.search(_vector(2), k=5)]
+
+
+def test_group_commit_batches_concurrent_writes(tmp_path):
+    """Writes submitted together land in a single segment"""
+    store = VectorStore(path=str(tmp_path), commit_interval_ms=200, merge_segments=1000)
+    futures = [store.add(doc_id, _vector(doc_id), wait=False) for doc_id in range(20)]
+    for future in futures:
+        future.result()
+
+    assert len(list((tmp_path / "segments").iterdir())) == 1
+
+
+def test_replacements_within_one_group_commit(tmp_path):
+    """Replacements and removals batched into one commit end in each document's latest state"""
+    store = VectorStore(path=str(tmp_path), commit_interval_ms=200, merge_segments=1000)
+    futures = [
+        store.add(1, _vector(1), wait=False),
+        store.add(2, _vector(2), wait=False),
+        store.add(1, [_vector(3), _vector(4)], spans=[(0, 5), (5, 9)], wait=False),
+        store.remove(2, wait=False),
+        store.add(3, _vector(0), wait=False),
+    ]
+    for future in futures:
+        future.result()
+
+    assert store.ntotal == 3
+    assert [hit.start for hit in store.search(_vector(4), k=1)] == [5]
+    assert 2 not in [hit.document_id for hit in store.search(_vector(2), k=3)]
+    restored = VectorStore(path=str(tmp_path))
+    restored.load()
+    assert restored.ntotal == 3 and restored.get(1)[1].tolist() == [[0, 5], [5, 9]]
+
+
+def test_merge_folds_segments_into_base(tmp_path):
+    """Segments are merged into the base index and then deleted"""
+    store = VectorStore(path=str(tmp_path), commit_interval_ms=0, merge_segments=3)
+    for doc_id in range(3):
+        store.add(doc_id, _vector(doc_id))
+    store.close()
+    with store._merge_lock:
+        pass
+
+    assert (tmp_path / "faiss.index").exists()
+    assert (tmp_path / "spans.npz").exists()
+    assert list((tmp_path / "segments").iterdir()) == []
+
+    restored = VectorStore(path=str(tmp_path), commit_interval_ms=0)
+    restored.load()
+    assert restored.ntotal == 3
+
+
+def test_save_and_load_round_trip(tmp_path):
+    """A closed store is searchable again after a restart"""
+    store = VectorStore(path=str(tmp_path), commit_interval_ms=0)
+    store.add(3, _vector(3))
+    store.close()
+
+    restored = VectorStore(path=str(tmp_path), commit_interval_ms=0)
+    restored.load()
+
+    assert restored.ntotal == 1
+    assert restored.search(_vector(3), k=1)[0].document_id == 3
+
+
+def test_promotes_to_ivf_past_threshold(tmp_path):
+    """A flat store switches to IVF once it holds promote_at vectors"""
+    store = VectorStore(
+        path=str(tmp_path), commit_interval_ms=0, index_type="ivf_flat", promote_at=200
+    )
+    for doc_id in range(199):
+        store.add(doc_id, _vector(doc_id), wait=False)
+    store.flush()
+    assert not store.is_ann
+
+    store.add(199, _vector(199))
+    store.flush()  # promotion runs on the writer right after the commit
+    assert store.is_ann
+    assert store.ntotal == 200
+
+    # Scanning every list is exact search again
+    assert store.search(_vector(50), k=1, nprobe=4096)[0].document_id == 50
+    store.remove(50)
+    assert 50 not in [hit.document_id for hit in store.search(_vector(50), k=5, nprobe=4096)]
+
+
+def test_get_returns_stored_vectors(tmp_path):
+    """A document's vectors and spans can be read back to copy them to a duplicate"""
+    store = VectorStore(path=str(tmp_path), commit_interval_ms=0)
+    vectors = np.concatenate([_vector(20), _vector(21)])
+    store.add(3, vectors, spans=[(0, 10), (5, 20)])
+
+    stored, spans = store.get(3)
+    store.add(4, stored, spans)
+
+    assert np.allclose(stored, vectors / np.linalg.norm(vectors, axis=1, keepdims=True), atol=1e-6)
+    assert spans.tolist() == [[0, 10], [5, 20]]
+    hit = store.search(_vector(21), k=2)
+    assert {h.document_id for h in hit} == {3, 4}
+    assert store.get(99) == (None, None)
+
+
+def test_refresh_picks_up_other_writers(tmp_path):
+    """A store sharing the directory sees another process's commits and merges"""
+    writer = VectorStore(path=str(tmp_path), commit_interval_ms=0, merge_segments=1000)
+    reader = VectorStore(path=str(tmp_path), commit_interval_ms=0)
+    writer.load()
+    reader.load()
+
+    writer.add(1, _vector(1))
+    assert reader.refresh() == 1
+    assert reader.search(_vector(1), k=1)[0].document_id == 1
+
+    # A merge of segments the reader already applied needs no reload
+    writer._start_merge()
+    with writer._merge_lock:
+        pass
+    version = reader.version
+    assert reader.refresh() == 0
+    assert reader.version == version
+
+    # Segments merged and deleted before the reader saw them force a reload
+    writer.merge_segments = 1
+    writer.add(3, _vector(3))
+    writer.flush()
+    with writer._merge_lock:
+        pass
+    assert list((tmp_path / "segments").iterdir()) == []
+    reader.refresh()
+    assert reader.version > version
+    assert reader.ntotal == 2
+    assert reader.search(_vector(3), k=1)[0].document_id == 3
+
+
+def test_merge_applies_segments_in_commit_order(tmp_path):
+    """Another process's older segment never overrides a newer write when merging"""
+    first = VectorStore(path=str(tmp_path), commit_interval_ms=0, merge_segments=2)
+    second = VectorStore(path=str(tmp_path), commit_interval_ms=0, merge_segments=1000)
+    first.load()
+    second.load()
+
+    second.add(5, _vector(1))
+    first.add(5, _vector(2))
+    first.add(6, _vector(3))  # second segment: triggers the merge
+    with first._merge_lock:
+        pass
+    assert first.search(_vector(2), k=1)[0].document_id == 5
+    assert abs(first.search(_vector(2), k=1)[0].score - 1.0) < 1e-5
+
+    restored = VectorStore(path=str(tmp_path), commit_interval_ms=0)
+    restored.load()
+    assert restored.ntotal == 2
+    hit = restored.search(_vector(2), k=1)[0]
+    assert hit.document_id == 5 and abs(hit.score - 1.0) < 1e-5
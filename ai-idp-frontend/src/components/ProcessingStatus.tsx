@@ -1,5 +1,5 @@
 import React, { useEffect, useState } from 'react';
-import { fetchDocumentStatus } from '../services/documentService';
+import { subscribeToStatus } from '../services/statusStream';
 import { DocumentStatus } from '../types';
 
 interface ProcessingStatusProps {
@@ -14,55 +14,33 @@ const ProcessingStatus: React.FC<ProcessingStatusProps> = ({ documentId, onStatu
   const [error, setError] = useState<string | null>(null);
 
   useEffect(() => {
-    let intervalId: ReturnType<typeof setInterval>;
-    let isMounted = true;
+    setLoading(true);
+    setError(null);
 
-    const checkStatus = async () => {
-      try {
-        const response = await fetchDocumentStatus(documentId);
-        
-        if (!isMounted) return;
-
-        setStatus(response.embedding_status || 'uploaded');
+    // Pushed by the server as processing progresses; no polling
+    return subscribeToStatus(
+      documentId,
+      (event) => {
+        setStatus(event.embedding_status || 'uploaded');
         setClassification(
-          typeof response.classification === 'string'
-            ? response.classification
-            : response.classification
-              ? JSON.stringify(response.classification)
+          typeof event.classification === 'string'
+            ? event.classification
+            : event.classification
+              ? JSON.stringify(event.classification)
               : undefined
         );
         setLoading(false);
         setError(null);
 
         if (onStatusChange) {
-          onStatusChange(response.embedding_status);
-        }
-
-        // Stop polling if completed or failed
-        if (response.embedding_status === 'completed' || response.embedding_status === 'failed') {
-          if (intervalId) {
-            clearInterval(intervalId);
-          }
+          onStatusChange(event.embedding_status);
         }
-      } catch (err) {
-        if (!isMounted) return;
-        setError(err instanceof Error ? err.message : 'Failed to fetch status');
+      },
+      (err) => {
+        setError(err.message);
         setLoading(false);
       }
-    };
-
-    // Initial check
-    checkStatus();
-
-    // Poll every 3 seconds
-    intervalId = setInterval(checkStatus, 3000);
-
-    return () => {
-      isMounted = false;
-      if (intervalId) {
-        clearInterval(intervalId);
-      }
-    };
+    );
   }, [documentId, onStatusChange]);
 
   const getStatusDisplay = () => {
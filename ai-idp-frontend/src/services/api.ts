@@ -1,6 +1,6 @@
 import axios from 'axios';
 
-const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || 'http://localhost:8000/api/v1';
+export const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || 'http://localhost:8000/api/v1';
 
 export const api = axios.create({
   baseURL: API_BASE_URL,
@@ -34,6 +34,13 @@ api.interceptors.response.use(
       window.location.href = '/login';
     }
     
+    // Admission control: the node is saturated, the body says when to come back
+    if (error.response?.data?.retry_after) {
+      return Promise.reject(
+        new Error(`${error.response.data.detail}: please try again in ${error.response.data.retry_after}s`)
+      );
+    }
+
     if (error.response?.data?.detail) {
       return Promise.reject(new Error(error.response.data.detail));
     }
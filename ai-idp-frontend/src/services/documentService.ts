@@ -1,5 +1,11 @@
 import { api } from './api';
-import { Document, UploadResponse, DocumentStatusResponse } from '../types';
+import {
+  Document,
+  DocumentListResponse,
+  UploadResponse,
+  DocumentStatusResponse,
+  StreamTokenResponse,
+} from '../types';
 import type { AxiosProgressEvent } from 'axios';
 
 export const uploadDocument = async (
@@ -19,11 +25,24 @@ export const uploadDocument = async (
 };
 
 export const fetchDocuments = async (): Promise<Document[]> => {
-  const response = await api.get<Document[]>('/documents');
+  const response = await api.get<DocumentListResponse>('/documents');
+  return response.data.documents;
+};
+
+export const fetchDocumentPage = async (
+  params: { cursor?: string; limit?: number; status?: string; classification?: string } = {}
+): Promise<DocumentListResponse> => {
+  const response = await api.get<DocumentListResponse>('/documents', { params });
   return response.data;
 };
 
 export const fetchDocumentStatus = async (documentId: number): Promise<DocumentStatusResponse> => {
   const response = await api.get<DocumentStatusResponse>(`/documents/${documentId}`);
   return response.data;
-};
\ No newline at end of file
+};
+
+// Short-lived token for the status stream, which cannot send the Authorization header
+export const fetchStreamToken = async (): Promise<string> => {
+  const response = await api.post<StreamTokenResponse>('/documents/events/token');
+  return response.data.token;
+};
@@ -0,0 +1,126 @@
+import { API_BASE_URL } from './api';
+import { fetchStreamToken } from './documentService';
+import { DocumentStatusEvent } from '../types';
+
+// Document processing status pushed over Server-Sent Events. All components
+// share one connection, covering every document still being processed.
+
+type StatusListener = (event: DocumentStatusEvent) => void;
+type ErrorListener = (error: Error) => void;
+
+interface Subscriber {
+  onStatus: StatusListener;
+  onError?: ErrorListener;
+}
+
+const TERMINAL_STATUSES = ['completed', 'failed'];
+
+const subscribers = new Map<number, Set<Subscriber>>();
+const latest = new Map<number, DocumentStatusEvent>();
+let source: EventSource | null = null;
+let streamedIds = '';
+let reconnectTimer: ReturnType<typeof setTimeout> | undefined;
+
+const isTerminal = (event?: DocumentStatusEvent) =>
+  event !== undefined && TERMINAL_STATUSES.includes(event.status);
+
+const closeStream = () => {
+  source?.close();
+  source = null;
+  streamedIds = '';
+};
+
+const fail = (ids: number[], error: Error) => {
+  ids.forEach((id) => subscribers.get(id)?.forEach((subscriber) => subscriber.onError?.(error)));
+};
+
+const openStream = async () => {
+  reconnectTimer = undefined;
+  const ids = [...subscribers.keys()].filter((id) => !isTerminal(latest.get(id))).sort((a, b) => a - b);
+  const key = ids.join(',');
+  if (key === streamedIds) return;
+  closeStream();
+  if (ids.length === 0) return;
+  streamedIds = key;
+
+  // EventSource cannot send headers, so the token goes in the query string,
+  // where proxies log it: use a short-lived stream token, not the access token
+  let token: string;
+  try {
+    token = await fetchStreamToken();
+  } catch (error) {
+    if (streamedIds === key && source === null) {
+      streamedIds = '';
+      fail(ids, error instanceof Error ? error : new Error('Could not open the status stream'));
+    }
+    return;
+  }
+  // The subscriptions changed while the token was on its way
+  if (streamedIds !== key || source !== null) return;
+
+  const stream = new EventSource(`${API_BASE_URL}/documents/events?ids=${key}&token=${encodeURIComponent(token)}`);
+  source = stream;
+  let opened = false;
+  stream.onopen = () => {
+    opened = true;
+  };
+
+  stream.addEventListener('status', (message) => {
+    const event: DocumentStatusEvent = JSON.parse((message as MessageEvent).data);
+    latest.set(event.document_id, event);
+    subscribers.get(event.document_id)?.forEach((subscriber) => subscriber.onStatus(event));
+  });
+  stream.addEventListener('done', () => closeStream());
+  stream.onerror = () => {
+    // The browser reconnects by itself unless the server refused the stream
+    if (stream.readyState !== EventSource.CLOSED || source !== stream) return;
+    closeStream();
+    if (opened) {
+      // A reconnect reuses the URL, whose token may have expired: start over with a new one
+      scheduleStream();
+      return;
+    }
+    fail(ids, new Error('Lost the connection to the status stream'));
+  };
+};
+
+// Components mounting together share a single reconnect
+const scheduleStream = () => {
+  if (reconnectTimer === undefined) {
+    reconnectTimer = setTimeout(openStream, 50);
+  }
+};
+
+/**
+ * Calls onStatus with the current status of the document and every change
+ * after it. Returns the function that ends the subscription.
+ */
+export const subscribeToStatus = (
+  documentId: number,
+  onStatus: StatusListener,
+  onError?: ErrorListener
+): (() => void) => {
+  const subscriber: Subscriber = { onStatus, onError };
+  if (!subscribers.has(documentId)) {
+    subscribers.set(documentId, new Set());
+  }
+  subscribers.get(documentId)!.add(subscriber);
+
+  const known = latest.get(documentId);
+  if (known) {
+    onStatus(known);
+  }
+  if (!isTerminal(known)) {
+    scheduleStream();
+  }
+
+  return () => {
+    const documentSubscribers = subscribers.get(documentId);
+    documentSubscribers?.delete(subscriber);
+    if (documentSubscribers?.size === 0) {
+      subscribers.delete(documentId);
+      latest.delete(documentId);
+      scheduleStream();
+    }
+  };
+};
@@ -12,6 +12,24 @@ export interface Document {
   upload_date?: string;
 }
 
+export interface DocumentListResponse {
+  documents: Document[];
+  next_cursor: string | null;
+}
+
+export interface DocumentStatusEvent {
+  document_id: number;
+  status: string;
+  embedding_status: DocumentStatus;
+  classification?: unknown;
+  stages: Record<string, string | null>;
+}
+
+export interface StreamTokenResponse {
+  token: string;
+  expires_in: number;
+}
+
 export interface UploadResponse extends Document {}
 
 export interface DocumentStatusResponse extends Document {}